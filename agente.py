@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from cofre import ErroCofre, ARQUIVO_CONFIG
+from comandos import criar_cofre, ler_senha_mestre, conta_publica, COLUNAS_LISTAGEM, VARIAVEL_AGENTE
+from configuracao import Configuracao
+
+# === Agente de desbloqueio (como o ssh-agent) ===
+# Sem pedidos por este tempo (segundos) o agente tranca o cofre e esquece a chave
+TEMPO_OCIOSO_AGENTE = 900
+# Maior pedido aceito (uma linha JSON)
+TAMANHO_MAXIMO_PEDIDO = 64 * 1024
+LIMITE_BUSCA_AGENTE = 50
+
+class AgenteBloqueado(ErroCofre):
+    """O agente trancou o cofre (tempo ocioso ou pedido); é preciso desbloquear de novo"""
+
+def caminho_socket_padrao():
+    """Socket em uma pasta só do usuário, em XDG_RUNTIME_DIR ou na pasta temporária"""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"cofre-agente-{os.getuid()}", "agente.sock")
+
+def _preparar_pasta(caminho_socket):
+    """Cria a pasta do socket com permissão 0700 e recusa pastas de outro usuário ou abertas"""
+    pasta = os.path.dirname(os.path.abspath(caminho_socket))
+    os.makedirs(pasta, mode=0o700, exist_ok=True)
+    info = os.lstat(pasta)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"A pasta {pasta} precisa pertencer ao usuário e ter permissão 0700")
+
+def _uid_do_cliente(conexao):
+    """Uid do processo do outro lado do socket, ou None se o sistema não informar"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credenciais = conexao.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credenciais)[1]
+
+# === Protocolo ===
+# Uma requisição JSON por linha, uma resposta JSON por linha, na mesma conexão:
+#   {"op": "obter", "site": ..., "usuario": ...}      -> {"ok": true, "senha": ..., "conta": {...}}
+#   {"op": "listar", "ordenar": "site"}               -> {"ok": true, "contas": [...]}
+#   {"op": "buscar", "texto": ..., "limite": 50}      -> {"ok": true, "contas": [...], "total": N, "exato": bool}
+#   {"op": "estado"}                                  -> {"ok": true, "bloqueado": bool, "contas": N, "ocioso": s}
+#   {"op": "bloquear"} / {"op": "desbloquear", "senha": ...}
+# Erros: {"ok": false, "erro": "mensagem"}, com "bloqueado": true se o cofre está bloqueado
+
+class AgenteCofre:
+    """Mantém o cofre aberto e indexado em memória e atende pedidos pelo socket
+
+    O cofre é aberto sob demanda: nos modos SQLite e cifrado, "obter" lê só a
+    conta pedida no disco até um "listar" ou "buscar" carregar o cofre inteiro.
+
+    Cada pedido roda sob uma trava, então o cofre é usado por uma thread de
+    cada vez; as senhas reveladas ficam no cache do próprio cofre. Depois de
+    tempo_ocioso sem pedidos o cofre é fechado (chave e senhas saem da
+    memória) e só volta com "desbloquear". O prazo é adiado a cada pedido que lê
+    o cofre, com um único timer, como a gravação das configurações.
+    """
+    def __init__(self, cofre, caminho_socket=None, tempo_ocioso=TEMPO_OCIOSO_AGENTE):
+        self.cofre = cofre
+        self.caminho_socket = caminho_socket or caminho_socket_padrao()
+        self.tempo_ocioso = tempo_ocioso
+        self.pedidos = 0
+        self._trava = threading.Lock()
+        self._ultimo_pedido = time.monotonic()
+        self._timer = None
+        self._servidor = None
+        self._operacoes = {
+            'obter': self._obter,
+            'listar': self._listar,
+            'buscar': self._buscar,
+            'estado': self._estado,
+            'bloquear': self._bloquear,
+            'desbloquear': self._desbloquear,
+        }
+
+    # === Operações ===
+    def _exigir_desbloqueado(self):
+        if not self.cofre.aberto:
+            raise AgenteBloqueado("Cofre bloqueado no agente; use 'desbloquear'")
+        # Só pedidos que leem o cofre adiam o bloqueio; 'estado' não
+        self._ultimo_pedido = time.monotonic()
+
+    def _obter(self, pedido):
+        self._exigir_desbloqueado()
+        conta = self.cofre.obter(pedido['site'], pedido['usuario'])
+        if conta is None:
+            raise ErroCofre(f"Conta não encontrada: {pedido['site']} - {pedido['usuario']}")
+        return {'senha': self.cofre.revelar_senha(conta), 'conta': conta_publica(conta)}
+
+    def _listar(self, pedido):
+        self._exigir_desbloqueado()
+        if pedido.get('ordenar', 'site') not in COLUNAS_LISTAGEM:
+            raise ValueError(f"Coluna inválida: {pedido['ordenar']}")
+        contas = self.cofre.ordenadas(pedido.get('ordenar', 'site')).contas(bool(pedido.get('decrescente')))
+        return {'contas': [conta_publica(conta) for conta in contas]}
+
+    def _buscar(self, pedido):
+        self._exigir_desbloqueado()
+        contas, total, exato = self.cofre.buscar(pedido['texto'], pedido.get('limite', LIMITE_BUSCA_AGENTE))
+        return {'contas': [conta_publica(conta) for conta in contas], 'total': total, 'exato': exato}
+
+    def _estado(self, pedido):
+        return {'bloqueado': not self.cofre.aberto, 'contas': len(self.cofre.dados or ()),
+                'ocioso': round(time.monotonic() - self._ultimo_pedido, 1), 'pedidos': self.pedidos}
+
+    def _bloquear(self, pedido=None):
+        if self.cofre.aberto:
+            self.cofre.fechar()
+            logging.info("Agente: cofre bloqueado")
+        return {}
+
+    def _desbloquear(self, pedido):
+        if not self.cofre.aberto:
+            self.cofre.abrir(pedido['senha'], sob_demanda=True)
+            self._ultimo_pedido = time.monotonic()
+            logging.info("Agente: cofre desbloqueado")
+        return {}
+
+    def atender(self, pedido):
+        """Executa um pedido (dicionário) e retorna a resposta (dicionário)"""
+        with self._trava:
+            self.pedidos += 1
+            op = pedido.get('op') if isinstance(pedido, dict) else pedido
+            operacao = self._operacoes.get(op) if isinstance(op, str) else None
+            if operacao is None:
+                return {'ok': False, 'erro': f"Operação desconhecida: {op}"}
+            try:
+                return dict(operacao(pedido), ok=True)
+            except AgenteBloqueado as e:
+                return {'ok': False, 'erro': str(e), 'bloqueado': True}
+            except KeyError as e:
+                return {'ok': False, 'erro': f"Campo obrigatório ausente: {str(e)}"}
+            except (ErroCofre, ValueError, TypeError) as e:
+                return {'ok': False, 'erro': str(e)}
+            except Exception as e:
+                logging.error(f"Erro no agente ao atender '{op}': {str(e)}")
+                return {'ok': False, 'erro': "Erro interno no agente"}
+
+    # === Bloqueio por tempo ocioso ===
+    def _armar(self, espera):
+        self._timer = threading.Timer(espera, self._ao_vencer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _ao_vencer(self):
+        with self._trava:
+            restante = self._ultimo_pedido + self.tempo_ocioso - time.monotonic()
+            if restante > 0:
+                self._armar(restante)
+                return
+            if self.cofre.aberto:
+                logging.info(f"Agente: {self.tempo_ocioso}s sem pedidos, bloqueando o cofre")
+                self._bloquear()
+            self._armar(self.tempo_ocioso)
+
+    # === Servidor ===
+    def iniciar(self):
+        """Cria o socket (0600, em pasta 0700) e começa a atender em threads; retorna o caminho"""
+        _preparar_pasta(self.caminho_socket)
+        if os.path.lexists(self.caminho_socket):
+            if not stat.S_ISSOCK(os.lstat(self.caminho_socket).st_mode):
+                raise ErroCofre(f"{self.caminho_socket} existe e não é um socket")
+            cliente = ClienteAgente(self.caminho_socket)
+            try:
+                if cliente.disponivel():
+                    raise ErroCofre(f"Já existe um agente atendendo em {self.caminho_socket}")
+            finally:
+                cliente.fechar()
+            # Sobra de um agente que não encerrou direito
+            os.remove(self.caminho_socket)
+        agente = self
+
+        class Atendimento(socketserver.StreamRequestHandler):
+            def handle(self):
+                uid = _uid_do_cliente(self.connection)
+                if uid is not None and uid != os.getuid():
+                    logging.warning(f"Agente: conexão recusada do uid {uid}")
+                    return
+                while True:
+                    linha = self.rfile.readline(TAMANHO_MAXIMO_PEDIDO + 1)
+                    if not linha:
+                        return
+                    if len(linha) > TAMANHO_MAXIMO_PEDIDO:
+                        resposta = {'ok': False, 'erro': "Pedido grande demais"}
+                    else:
+                        try:
+                            resposta = agente.atender(json.loads(linha))
+                        except ValueError:
+                            resposta = {'ok': False, 'erro': "Pedido não é JSON válido"}
+                    self.wfile.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b"\n")
+
+        class Servidor(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        mascara = os.umask(0o177)
+        try:
+            self._servidor = Servidor(self.caminho_socket, Atendimento)
+        finally:
+            os.umask(mascara)
+        os.chmod(self.caminho_socket, 0o600)
+        self._armar(self.tempo_ocioso)
+        threading.Thread(target=self._servidor.serve_forever, name="agente", daemon=True).start()
+        logging.info(f"Agente atendendo em {self.caminho_socket} (bloqueio após {self.tempo_ocioso}s ocioso)")
+        return self.caminho_socket
+
+    def parar(self):
+        """Para de atender, tranca o cofre e apaga o socket"""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        with self._trava:
+            self._bloquear()
+        try:
+            os.remove(self.caminho_socket)
+        except OSError:
+            pass
+        logging.info(f"Agente encerrado após {self.pedidos} pedidos")
+
+# === Cliente ===
+class ClienteAgente:
+    """Conexão com o agente; a mesma conexão é reaproveitada entre pedidos"""
+    def __init__(self, caminho_socket=None):
+        self.caminho_socket = caminho_socket or os.environ.get(VARIAVEL_AGENTE) or caminho_socket_padrao()
+        self._conexao = None
+        self._leitor = None
+
+    def _conectar(self):
+        if self._conexao is None:
+            self._conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self._conexao.connect(self.caminho_socket)
+            except OSError:
+                self.fechar()
+                raise
+            self._leitor = self._conexao.makefile('rb')
+
+    def pedir(self, op, **campos):
+        """Envia um pedido e retorna a resposta; levanta ErroCofre (ou AgenteBloqueado) se ok for false"""
+        self._conectar()
+        self._conexao.sendall(json.dumps(dict(campos, op=op), ensure_ascii=False).encode('utf-8') + b"\n")
+        linha = self._leitor.readline()
+        if not linha:
+            self.fechar()
+            raise ErroCofre("O agente encerrou a conexão")
+        resposta = json.loads(linha)
+        if not resposta.pop('ok', False):
+            erro = resposta.get('erro', "Erro desconhecido no agente")
+            raise (AgenteBloqueado if resposta.get('bloqueado') else ErroCofre)(erro)
+        return resposta
+
+    def disponivel(self):
+        """Indica se há um agente atendendo no socket"""
+        try:
+            self.pedir('estado')
+            return True
+        except (OSError, ErroCofre):
+            return False
+
+    def obter(self, site, usuario):
+        """(senha, conta pública)"""
+        resposta = self.pedir('obter', site=site, usuario=usuario)
+        return resposta['senha'], resposta['conta']
+
+    def listar(self, ordenar='site', decrescente=False):
+        return self.pedir('listar', ordenar=ordenar, decrescente=decrescente)['contas']
+
+    def buscar(self, texto, limite=LIMITE_BUSCA_AGENTE):
+        resposta = self.pedir('buscar', texto=texto, limite=limite)
+        return resposta['contas'], resposta['total'], resposta['exato']
+
+    def fechar(self):
+        if self._leitor is not None:
+            self._leitor.close()
+            self._leitor = None
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+def medir_desempenho(cliente, site, usuario, quantidade=10000):
+    """Faz quantidade pedidos 'obter' pela mesma conexão; retorna um relatório com µs por pedido"""
+    cliente.obter(site, usuario)
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        cliente.obter(site, usuario)
+    segundos = time.perf_counter() - inicio
+    relatorio = {'pedidos': quantidade, 'segundos': segundos, 'us_por_pedido': segundos / quantidade * 1e6}
+    logging.info(f"Agente: {quantidade} pedidos em {segundos:.2f}s ({relatorio['us_por_pedido']:.1f}µs por pedido)")
+    return relatorio
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantém o cofre desbloqueado e atende pedidos por um socket Unix")
+    parser.add_argument("-C", "--pasta", help="pasta do cofre (padrão: a atual)")
+    parser.add_argument("--socket", help="caminho do socket (padrão: config.json 'agente' ou pasta do usuário)")
+    parser.add_argument("--ocioso", type=float, help="segundos sem pedidos até bloquear o cofre")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s - %(levelname)s - %(message)s")
+    if argumentos.pasta:
+        os.chdir(argumentos.pasta)
+    config_agente = Configuracao(ARQUIVO_CONFIG).secao('agente', {})
+    try:
+        cofre = criar_cofre().abrir(ler_senha_mestre(), sob_demanda=True)
+        agente = AgenteCofre(cofre, argumentos.socket or config_agente.get('socket'),
+                             argumentos.ocioso or config_agente.get('tempo_ocioso', TEMPO_OCIOSO_AGENTE))
+        caminho = agente.iniciar()
+    except (ErroCofre, OSError) as e:
+        print(f"erro: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    # Como o ssh-agent: a linha impressa pode ser colada no shell que vai usar o agente
+    print(f"{VARIAVEL_AGENTE}={caminho}; export {VARIAVEL_AGENTE};", flush=True)
+
+    parado = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parado.set())
+    signal.signal(signal.SIGINT, lambda *_: parado.set())
+    parado.wait()
+    agente.parar()
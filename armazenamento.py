@@ -0,0 +1,413 @@
+import json
+import os
+import logging
+import threading
+from dominios import normalizar_conta
+
+ARQUIVO_DADOS = "contas.json"
+
+# === Modos de armazenamento ===
+MODO_JSON = "json"
+MODO_DIARIO = "diario"
+MODO_SQLITE = "sqlite"
+MODO_CIFRADO = "cifrado"
+
+# Compacta quando o diário passa desta fração do snapshot (e de um tamanho mínimo)
+PROPORCAO_COMPACTACAO = 0.5
+TAMANHO_MINIMO_COMPACTACAO = 64 * 1024
+
+# === Funções auxiliares de arquivo ===
+def assinatura_arquivo(caminho):
+    """Retorna (mtime, tamanho, inode) do arquivo, ou None se ele não existir"""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def arquivo_sqlite_de(arquivo_dados):
+    """Caminho do banco SQLite correspondente ao arquivo de dados (contas.json -> contas.db)"""
+    return os.path.splitext(arquivo_dados)[0] + ".db"
+
+def arquivo_cifrado_de(arquivo_dados):
+    """Caminho do cofre cifrado por inteiro correspondente ao arquivo de dados (contas.json -> contas.vault)"""
+    return os.path.splitext(arquivo_dados)[0] + ".vault"
+
+def arquivo_diario_de(arquivo_dados):
+    """Caminho do diário de operações ao lado do arquivo de dados"""
+    return arquivo_dados + ".journal"
+
+def avisar_cofre_cifrado(arquivo_dados):
+    """Avisa quando há um cofre cifrado que os modos em texto puro não leem"""
+    arquivo_cifrado = arquivo_cifrado_de(arquivo_dados)
+    if os.path.exists(arquivo_cifrado):
+        logging.warning(f"Existe um cofre cifrado em {arquivo_cifrado}, que este modo não lê: as contas mostradas "
+                        f"vêm de {arquivo_dados} e podem estar desatualizadas ou vazias")
+
+def gravar_atomico(caminho, escrever, binario=False):
+    """Grava em um arquivo temporário, sincroniza e substitui o destino de uma vez"""
+    temporario = caminho + ".tmp"
+    with (open(temporario, "wb") if binario else open(temporario, "w", encoding='utf-8')) as f:
+        escrever(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+# === JSON Local ===
+def carregar_dados(arquivo_dados=ARQUIVO_DADOS):
+    logging.info("Tentando carregar dados do arquivo JSON...")
+    if os.path.exists(arquivo_dados):
+        try:
+            with open(arquivo_dados, "r") as f:
+                dados = json.load(f)
+                logging.info(f"Carregados {len(dados)} contas do arquivo JSON")
+                return dados
+        except Exception as e:
+            logging.error(f"Erro ao carregar dados: {str(e)}")
+            return []
+    logging.info("Nenhum arquivo de dados encontrado, retornando lista vazia")
+    return []
+
+def salvar_dados(dados, arquivo_dados=ARQUIVO_DADOS):
+    try:
+        logging.info(f"Salvando {len(dados)} contas no arquivo JSON...")
+        gravar_atomico(arquivo_dados, lambda f: json.dump(dados, f, indent=4))
+        logging.info("Dados salvos com sucesso")
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao salvar dados: {str(e)}")
+        return False
+
+# === Diário de operações ===
+def aplicar_diario(dados, arquivo_diario):
+    """Reaplica as operações do diário sobre o snapshot; retorna (contas, operações aplicadas)
+
+    Os registros trazem o id da conta e são reaplicados por ele (adição só se
+    o id estiver livre, exclusão remove o id, atualização substitui a conta do
+    id), então reaplicar um diário já incorporado ao snapshot não altera o
+    resultado. Contas de chave normalizada igual (ex.: após uma nova regra de
+    domínios equivalentes) continuam separadas. Registros antigos, sem id,
+    são reaplicados pela chave normalizada.
+    """
+    if not os.path.exists(arquivo_diario):
+        return dados, 0
+
+    por_id = {conta['id']: conta for conta in dados if conta.get('id')}
+    por_chave = None
+    removidas = set()
+    adicionadas = []
+    operacoes = 0
+
+    def localizar(registro):
+        nonlocal por_chave
+        if registro.get('id'):
+            return por_id.get(registro['id'])
+        if por_chave is None:
+            por_chave = {}
+            for conta in dados + adicionadas:
+                if id(conta) not in removidas:
+                    por_chave.setdefault(normalizar_conta(conta['site'], conta['usuario']), conta)
+        return por_chave.get(normalizar_conta(registro['site'], registro['usuario']))
+
+    with open(arquivo_diario, "r", encoding='utf-8') as f:
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                # Linha incompleta deixada por uma queda no meio da gravação
+                logging.warning(f"Registro inválido ignorado no diário (linha {numero})")
+                continue
+            conta = localizar(registro)
+            if registro['op'] == '+':
+                if conta is None:
+                    nova = registro['conta']
+                    adicionadas.append(nova)
+                    if nova.get('id'):
+                        por_id[nova['id']] = nova
+                    if por_chave is not None:
+                        por_chave.setdefault(normalizar_conta(nova['site'], nova['usuario']), nova)
+            elif registro['op'] == '-':
+                if conta is not None:
+                    removidas.add(id(conta))
+                    por_id.pop(conta.get('id'), None)
+                    if por_chave is not None:
+                        chave = normalizar_conta(conta['site'], conta['usuario'])
+                        if por_chave.get(chave) is conta:
+                            del por_chave[chave]
+            elif registro['op'] == '=':
+                if conta is not None:
+                    conta.clear()
+                    conta.update(registro['conta'])
+            operacoes += 1
+
+    contas = [conta for conta in dados + adicionadas if id(conta) not in removidas]
+    logging.info(f"Diário reaplicado: {operacoes} operações")
+    return contas, operacoes
+
+# === Interface dos armazenamentos ===
+class Armazenamento:
+    """Interface comum dos armazenamentos usados pelo Cofre
+
+    carregar() devolve a lista de contas; salvar() grava a lista inteira;
+    adicionar()/excluir() registram uma única alteração já feita em memória.
+    Os modos com consulta_direta respondem buscar() sem carregar o cofre, e os
+    paginados também listar_pagina(); o Cofre aberto sob demanda usa os dois.
+    """
+    modo = None
+    # A assinatura identifica o conteúdo entre execuções (permite persistir o índice do Cofre)
+    assinatura_estavel = True
+    # Site e usuário não podem aparecer em texto puro em arquivos auxiliares (como o índice)
+    confidencial = False
+    # Cada gravação reescreve o arquivo inteiro, mesmo para poucas contas
+    regrava_tudo = True
+    # buscar() lê uma conta pela chave normalizada sem carregar as demais
+    consulta_direta = False
+    # listar_pagina() lê uma página em ordem de site sem carregar as demais
+    paginado = False
+
+    def __init__(self):
+        self._assinatura = None
+
+    def assinatura(self):
+        """Assinatura atual dos arquivos do armazenamento"""
+        raise NotImplementedError
+
+    def alterado_externamente(self):
+        """Indica se os arquivos mudaram desde a última leitura ou gravação deste processo"""
+        return self.assinatura() != self._assinatura
+
+    def carregar(self):
+        raise NotImplementedError
+
+    def salvar(self, dados):
+        raise NotImplementedError
+
+    def adicionar(self, dados, conta):
+        """Registra uma conta já incluída em dados"""
+        return self.salvar(dados)
+
+    def excluir(self, dados, conta):
+        """Registra uma conta já removida de dados"""
+        return self.salvar(dados)
+
+    def adicionar_varias(self, dados, contas):
+        """Registra várias contas já incluídas em dados em uma única gravação"""
+        return self.salvar(dados)
+
+    def usar_chave(self, fernet):
+        """Recebe a chave do cofre; só os modos que cifram o arquivo inteiro a usam"""
+
+    def excluir_varias(self, dados, contas):
+        """Registra várias contas já removidas de dados em uma única gravação"""
+        return self.salvar(dados)
+
+    def atualizar_varias(self, dados, contas):
+        """Registra várias contas de dados alteradas em memória (mesmo id) em uma única gravação"""
+        return self.salvar(dados)
+
+    def buscar(self, site, usuario):
+        """Conta com a chave normalizada de site e usuário, ou None (só nos modos com consulta_direta)"""
+        raise NotImplementedError
+
+    def listar_pagina(self, quantidade=100, depois_de=None):
+        """Página de contas em ordem de site e o cursor da seguinte (só nos modos paginados)"""
+        raise NotImplementedError
+
+    def fechar(self):
+        pass
+
+# === Armazenamento em arquivo JSON único ===
+class ArmazenamentoJSON(Armazenamento):
+    """Grava o cofre inteiro no arquivo JSON a cada alteração"""
+    modo = MODO_JSON
+
+    def __init__(self, arquivo_dados=ARQUIVO_DADOS):
+        super().__init__()
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_diario = arquivo_diario_de(arquivo_dados)
+
+    def assinatura(self):
+        return assinatura_arquivo(self.arquivo_dados)
+
+    def carregar(self):
+        avisar_cofre_cifrado(self.arquivo_dados)
+        dados = carregar_dados(self.arquivo_dados)
+        if os.path.exists(self.arquivo_diario):
+            # Diário deixado pelo modo diário: incorpora ao snapshot antes de usar o JSON puro
+            dados, _ = aplicar_diario(dados, self.arquivo_diario)
+            if salvar_dados(dados, self.arquivo_dados):
+                os.remove(self.arquivo_diario)
+        self._assinatura = self.assinatura()
+        return dados
+
+    def salvar(self, dados):
+        if not salvar_dados(dados, self.arquivo_dados):
+            return False
+        self._assinatura = self.assinatura()
+        return True
+
+# === Armazenamento com diário (append-only) e compactação em segundo plano ===
+class ArmazenamentoDiario(ArmazenamentoJSON):
+    """Anexa cada alteração ao diário com um fsync por operação
+
+    O snapshot (contas.json) só é reescrito na compactação, que roda em uma
+    thread quando o diário passa de PROPORCAO_COMPACTACAO do snapshot.
+    """
+    modo = MODO_DIARIO
+    regrava_tudo = False
+
+    def __init__(self, arquivo_dados=ARQUIVO_DADOS, proporcao=PROPORCAO_COMPACTACAO,
+                 tamanho_minimo=TAMANHO_MINIMO_COMPACTACAO):
+        super().__init__(arquivo_dados)
+        self.proporcao = proporcao
+        self.tamanho_minimo = tamanho_minimo
+        self._trava = threading.Lock()
+        self._arquivo = None
+        self._compactacao = None
+
+    def assinatura(self):
+        return (assinatura_arquivo(self.arquivo_dados) or ()) + (assinatura_arquivo(self.arquivo_diario) or ())
+
+    def carregar(self):
+        self.aguardar_compactacao()
+        avisar_cofre_cifrado(self.arquivo_dados)
+        with self._trava:
+            dados = carregar_dados(self.arquivo_dados)
+            dados, _ = aplicar_diario(dados, self.arquivo_diario)
+            self._assinatura = self.assinatura()
+        return dados
+
+    def salvar(self, dados):
+        """Grava um snapshot completo e esvazia o diário"""
+        self.aguardar_compactacao()
+        with self._trava:
+            self._fechar_arquivo()
+            if not salvar_dados(dados, self.arquivo_dados):
+                return False
+            try:
+                if os.path.exists(self.arquivo_diario):
+                    os.remove(self.arquivo_diario)
+            except OSError as e:
+                logging.error(f"Erro ao limpar diário: {str(e)}")
+            self._assinatura = self.assinatura()
+        return True
+
+    def _anexar(self, registro, dados):
+        return self._anexar_varios([registro], dados)
+
+    @staticmethod
+    def _registro(op, conta, com_conta=True):
+        """Registro do diário identificado pelo id da conta (site e usuário só para leitura humana)"""
+        registro = {'op': op, 'id': conta.get('id'), 'site': conta['site'], 'usuario': conta['usuario']}
+        if com_conta:
+            registro['conta'] = conta
+        return registro
+
+    def _anexar_varios(self, registros, dados):
+        """Anexa os registros ao diário com um único fsync"""
+        linha = "".join(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros).encode('utf-8')
+        try:
+            with self._trava:
+                if self._arquivo is None:
+                    self._arquivo = open(self.arquivo_diario, "ab")
+                self._arquivo.write(linha)
+                self._arquivo.flush()
+                os.fsync(self._arquivo.fileno())
+                self._assinatura = self.assinatura()
+        except Exception as e:
+            logging.error(f"Erro ao gravar no diário: {str(e)}")
+            return False
+        self._talvez_compactar(dados)
+        return True
+
+    def adicionar(self, dados, conta):
+        return self._anexar(self._registro('+', conta), dados)
+
+    def excluir(self, dados, conta):
+        return self._anexar(self._registro('-', conta, com_conta=False), dados)
+
+    def adicionar_varias(self, dados, contas):
+        return self._anexar_varios([self._registro('+', conta) for conta in contas], dados)
+
+    def excluir_varias(self, dados, contas):
+        return self._anexar_varios([self._registro('-', conta, com_conta=False) for conta in contas], dados)
+
+    def atualizar_varias(self, dados, contas):
+        return self._anexar_varios([self._registro('=', conta) for conta in contas], dados)
+
+    # === Compactação ===
+    def _talvez_compactar(self, dados):
+        if self._compactacao is not None and self._compactacao.is_alive():
+            return
+        tamanho_diario = os.path.getsize(self.arquivo_diario)
+        tamanho_snapshot = os.path.getsize(self.arquivo_dados) if os.path.exists(self.arquivo_dados) else 0
+        if tamanho_diario < max(self.tamanho_minimo, tamanho_snapshot * self.proporcao):
+            return
+        # Cópia rasa e posição do diário tiradas juntas: o snapshot cobre exatamente até aqui
+        with self._trava:
+            copia = list(dados)
+            posicao = self._arquivo.tell() if self._arquivo is not None else tamanho_diario
+        self._compactacao = threading.Thread(target=self._compactar, args=(copia, posicao),
+                                             name="compactacao-diario", daemon=True)
+        self._compactacao.start()
+
+    def _compactar(self, copia, posicao):
+        logging.info(f"Compactando diário ({posicao} bytes) em snapshot de {len(copia)} contas...")
+        try:
+            temporario = self.arquivo_dados + ".compactando"
+            with open(temporario, "w", encoding='utf-8') as f:
+                json.dump(copia, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._trava:
+                os.replace(temporario, self.arquivo_dados)
+                # Mantém só os registros anexados depois da cópia
+                self._fechar_arquivo()
+                with open(self.arquivo_diario, "rb") as f:
+                    f.seek(posicao)
+                    restante = f.read()
+                gravar_atomico(self.arquivo_diario, lambda f: f.write(restante), binario=True)
+                self._assinatura = self.assinatura()
+            logging.info("Compactação do diário concluída")
+        except Exception as e:
+            logging.error(f"Erro na compactação do diário: {str(e)}")
+
+    def aguardar_compactacao(self):
+        if self._compactacao is not None:
+            self._compactacao.join()
+            self._compactacao = None
+
+    def _fechar_arquivo(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def fechar(self):
+        self.aguardar_compactacao()
+        with self._trava:
+            self._fechar_arquivo()
+
+def migrar_json_para_sqlite(arquivo_dados, arquivo_sqlite=None):
+    """Copia as contas de um contas.json (e diário pendente) para o banco SQLite; retorna a quantidade
+
+    Atalho para armazenamento_sqlite.migrar_json_para_sqlite, que só é importado aqui.
+    """
+    from armazenamento_sqlite import migrar_json_para_sqlite as migrar
+    return migrar(arquivo_dados, arquivo_sqlite)
+
+def criar_armazenamento(modo=MODO_JSON, arquivo_dados=ARQUIVO_DADOS):
+    """Cria o armazenamento correspondente ao modo configurado"""
+    if modo == MODO_DIARIO:
+        return ArmazenamentoDiario(arquivo_dados)
+    # Os modos SQLite e cifrado ficam em módulos próprios, importados só quando escolhidos
+    if modo == MODO_SQLITE:
+        from armazenamento_sqlite import ArmazenamentoSQLite
+        return ArmazenamentoSQLite(arquivo_dados)
+    if modo == MODO_CIFRADO:
+        from armazenamento_cifrado import ArmazenamentoCifrado
+        return ArmazenamentoCifrado(arquivo_dados)
+    if modo != MODO_JSON:
+        logging.warning(f"Modo de armazenamento desconhecido '{modo}', usando JSON")
+    return ArmazenamentoJSON(arquivo_dados)
@@ -0,0 +1,245 @@
+import bisect
+import json
+import os
+import logging
+import struct
+import threading
+import zlib
+import dominios
+from dominios import normalizar_conta
+from armazenamento import (Armazenamento, ARQUIVO_DADOS, MODO_CIFRADO, arquivo_cifrado_de, arquivo_diario_de,
+                           aplicar_diario, carregar_dados, assinatura_arquivo, gravar_atomico)
+
+# Modo "cifrado" de armazenamento.criar_armazenamento, importado só quando escolhido
+
+# === Cofre cifrado por inteiro (envelope em blocos AES-GCM) ===
+MAGICO_CIFRADO = b"COFREAG1"
+VERSAO_CIFRADO = 1
+# Tamanho alvo de cada bloco antes da compressão
+TAMANHO_BLOCO = 64 * 1024
+TAMANHO_NONCE = 12
+
+class ArmazenamentoCifrado(Armazenamento):
+    """Guarda o cofre inteiro em contas.vault, cifrado em blocos AES-256-GCM
+
+    O arquivo tem um cabeçalho com a chave de dados embrulhada pela chave do
+    cofre (Fernet) e a posição de cada bloco. Cada bloco é uma lista de contas
+    comprimida e autenticada; o número do bloco e um identificador do arquivo
+    entram como dados associados, então blocos trocados de lugar ou de
+    arquivo não abrem. As contas ficam ordenadas pela chave normalizada e um
+    bloco de índice cifrado guarda a primeira chave de cada bloco, então
+    buscar() decifra só o índice e um bloco (é o caminho do Cofre aberto sob
+    demanda: obter da linha de comando e do agente). Site, usuário e apelido deixam de
+    ficar em texto puro no disco: a migração apaga o contas.json, o diário e
+    o índice em texto puro depois de gravar o cofre cifrado.
+    """
+    modo = MODO_CIFRADO
+    confidencial = True
+    consulta_direta = True
+
+    def __init__(self, arquivo_dados=ARQUIVO_DADOS, arquivo_cifrado=None, tamanho_bloco=TAMANHO_BLOCO):
+        super().__init__()
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_cifrado = arquivo_cifrado or arquivo_cifrado_de(arquivo_dados)
+        self.tamanho_bloco = tamanho_bloco
+        self._fernet = None
+        self._trava = threading.Lock()
+        # Cabeçalho, chave de dados e índice do arquivo lido por último
+        self._lido = None
+
+    def usar_chave(self, fernet):
+        self._fernet = fernet
+        self._lido = None
+
+    def assinatura(self):
+        return assinatura_arquivo(self.arquivo_cifrado)
+
+    # === Formato do arquivo ===
+    @staticmethod
+    def _dados_associados(identificador, numero):
+        return identificador + struct.pack(">I", numero)
+
+    def _ler_cabecalho(self, f):
+        if f.read(len(MAGICO_CIFRADO)) != MAGICO_CIFRADO:
+            raise ValueError(f"{self.arquivo_cifrado} não é um cofre cifrado")
+        (tamanho,) = struct.unpack(">I", f.read(4))
+        cabecalho = json.loads(f.read(tamanho).decode('utf-8'))
+        if cabecalho.get('versao') != VERSAO_CIFRADO:
+            raise ValueError(f"Versão de cofre cifrado não suportada: {cabecalho.get('versao')}")
+        return cabecalho
+
+    def _abrir_bloco(self, f, aead, identificador, numero, deslocamento, tamanho):
+        f.seek(deslocamento)
+        bruto = f.read(tamanho)
+        texto = aead.decrypt(bruto[:TAMANHO_NONCE], bruto[TAMANHO_NONCE:],
+                             self._dados_associados(identificador, numero))
+        return json.loads(zlib.decompress(texto).decode('utf-8'))
+
+    def _preparar_leitura(self, f):
+        """Lê o cabeçalho e o índice do arquivo atual, reaproveitando a leitura anterior"""
+        assinatura = self.assinatura()
+        if self._lido is not None and self._lido[0] == assinatura:
+            return self._lido[1:]
+        if self._fernet is None:
+            raise ValueError("A chave do cofre não foi informada ao armazenamento cifrado")
+        # cryptography só é importado quando o cofre cifrado é lido ou gravado
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        cabecalho = self._ler_cabecalho(f)
+        aead = AESGCM(self._fernet.decrypt(cabecalho['chave_dados'].encode()))
+        identificador = bytes.fromhex(cabecalho['identificador'])
+        deslocamento, tamanho = cabecalho['indice']
+        primeiras = self._abrir_bloco(f, aead, identificador, 0, deslocamento, tamanho)
+        self._lido = (assinatura, cabecalho, aead, identificador, primeiras)
+        return self._lido[1:]
+
+    def carregar(self):
+        if not os.path.exists(self.arquivo_cifrado):
+            if os.path.exists(self.arquivo_dados) or os.path.exists(arquivo_diario_de(self.arquivo_dados)):
+                # Primeira abertura neste modo: migra o contas.json (e diário pendente)
+                dados, _ = aplicar_diario(carregar_dados(self.arquivo_dados), arquivo_diario_de(self.arquivo_dados))
+                if self.salvar(dados):
+                    logging.info(f"Migradas {len(dados)} contas de {self.arquivo_dados} para {self.arquivo_cifrado}")
+                    self._apagar_texto_puro()
+                return dados
+            logging.info("Nenhum cofre cifrado encontrado, retornando lista vazia")
+            self._assinatura = self.assinatura()
+            return []
+
+        if os.path.exists(self.arquivo_dados):
+            logging.warning(f"{self.arquivo_dados} ainda existe ao lado de {self.arquivo_cifrado}: site, usuário e "
+                            f"apelido dele estão em texto puro e não são usados neste modo")
+        from cryptography.exceptions import InvalidTag
+        from cryptography.fernet import InvalidToken
+        logging.info("Carregando contas do cofre cifrado...")
+        with self._trava, open(self.arquivo_cifrado, "rb") as f:
+            try:
+                cabecalho, aead, identificador, _ = self._preparar_leitura(f)
+                dados = []
+                for numero, (deslocamento, tamanho) in enumerate(cabecalho['blocos'], 1):
+                    dados.extend(self._abrir_bloco(f, aead, identificador, numero, deslocamento, tamanho))
+            except (InvalidTag, InvalidToken):
+                # Não devolve lista vazia: a próxima gravação apagaria o cofre
+                logging.error(f"Falha de autenticação ao abrir {self.arquivo_cifrado}: arquivo alterado ou chave incorreta")
+                raise ValueError(f"Não foi possível decifrar {self.arquivo_cifrado}")
+            self._assinatura = self.assinatura()
+        logging.info(f"Carregados {len(dados)} contas de {len(cabecalho['blocos'])} blocos cifrados")
+        return dados
+
+    def _apagar_texto_puro(self):
+        """Apaga o contas.json, o diário e o índice (contas.json.idx) já copiados para o cofre cifrado"""
+        for caminho in (self.arquivo_dados, arquivo_diario_de(self.arquivo_dados), self.arquivo_dados + ".idx"):
+            try:
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            except OSError as e:
+                logging.warning(f"Não foi possível apagar {caminho}: {str(e)}")
+        # Apagar não sobrescreve o disco; backups antigos do contas.json também continuam legíveis
+        logging.warning(f"{self.arquivo_dados} em texto puro apagado após a migração; cópias e backups dele "
+                        f"feitos antes continuam legíveis")
+
+    def salvar(self, dados):
+        if self._fernet is None:
+            logging.error("Erro ao salvar dados: chave do cofre não informada ao armazenamento cifrado")
+            return False
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+            logging.info(f"Salvando {len(dados)} contas no cofre cifrado...")
+            chave_dados = AESGCM.generate_key(bit_length=256)
+            aead = AESGCM(chave_dados)
+            identificador = os.urandom(16)
+
+            # Agrupa as contas, ordenadas pela chave normalizada, em blocos de ~tamanho_bloco
+            ordenadas = sorted(((normalizar_conta(conta['site'], conta['usuario']), conta) for conta in dados),
+                               key=lambda par: par[0])
+            grupos, primeiras, atual, tamanho_atual = [], [], [], 0
+            for chave, conta in ordenadas:
+                linha = json.dumps(conta, ensure_ascii=False)
+                if atual and tamanho_atual + len(linha) > self.tamanho_bloco:
+                    grupos.append("[" + ",".join(atual) + "]")
+                    atual, tamanho_atual = [], 0
+                if not atual:
+                    primeiras.append(chave)
+                atual.append(linha)
+                tamanho_atual += len(linha) + 1
+            if atual:
+                grupos.append("[" + ",".join(atual) + "]")
+
+            def selar(numero, texto):
+                nonce = os.urandom(TAMANHO_NONCE)
+                return nonce + aead.encrypt(nonce, zlib.compress(texto.encode('utf-8')),
+                                            self._dados_associados(identificador, numero))
+
+            blocos = [selar(0, json.dumps(primeiras, ensure_ascii=False))]
+            blocos.extend(selar(numero, grupo) for numero, grupo in enumerate(grupos, 1))
+
+            def montar_cabecalho(inicio):
+                posicoes = []
+                for bloco in blocos:
+                    posicoes.append([inicio, len(bloco)])
+                    inicio += len(bloco)
+                return json.dumps({
+                    'versao': VERSAO_CIFRADO,
+                    'algoritmo': "AES-256-GCM",
+                    'compressao': "zlib",
+                    'identificador': identificador.hex(),
+                    'regras': dominios.mapa_ativo.assinatura(),
+                    'chave_dados': self._fernet.encrypt(chave_dados).decode(),
+                    'indice': posicoes[0],
+                    'blocos': posicoes[1:]
+                }).encode('utf-8')
+
+            # O tamanho do cabeçalho depende das posições, que dependem do tamanho do cabeçalho
+            cabecalho = montar_cabecalho(0)
+            while True:
+                inicio = len(MAGICO_CIFRADO) + 4 + len(cabecalho)
+                novo = montar_cabecalho(inicio)
+                if len(novo) == len(cabecalho):
+                    cabecalho = novo
+                    break
+                cabecalho = novo
+
+            def escrever(f):
+                f.write(MAGICO_CIFRADO)
+                f.write(struct.pack(">I", len(cabecalho)))
+                f.write(cabecalho)
+                for bloco in blocos:
+                    f.write(bloco)
+
+            with self._trava:
+                gravar_atomico(self.arquivo_cifrado, escrever, binario=True)
+                self._lido = None
+                self._assinatura = self.assinatura()
+            logging.info(f"Dados salvos com sucesso ({len(grupos)} blocos cifrados)")
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao salvar dados: {str(e)}")
+            return False
+
+    def fechar(self):
+        # Esquece a chave do cofre e a chave de dados decifrada
+        with self._trava:
+            self._fernet = None
+            self._lido = None
+
+    # === Consulta direta (decifra só o índice e um bloco) ===
+    def buscar(self, site, usuario):
+        """Busca pela chave normalizada decifrando apenas o bloco que pode contê-la"""
+        chave = normalizar_conta(site, usuario)
+        if not os.path.exists(self.arquivo_cifrado):
+            # Ainda não migrado: carregar() migra o contas.json (ou devolve a lista vazia)
+            return next((conta for conta in self.carregar()
+                         if normalizar_conta(conta['site'], conta['usuario']) == chave), None)
+        with self._trava, open(self.arquivo_cifrado, "rb") as f:
+            cabecalho, aead, identificador, primeiras = self._preparar_leitura(f)
+            if cabecalho.get('regras') == dominios.mapa_ativo.assinatura():
+                posicao = bisect.bisect_right(primeiras, chave) - 1
+                candidatos = [posicao] if posicao >= 0 else []
+            else:
+                # Gravado com outras regras de domínio: a ordem dos blocos não vale para esta chave
+                candidatos = range(len(cabecalho['blocos']))
+            for posicao in candidatos:
+                deslocamento, tamanho = cabecalho['blocos'][posicao]
+                for conta in self._abrir_bloco(f, aead, identificador, posicao + 1, deslocamento, tamanho):
+                    if normalizar_conta(conta['site'], conta['usuario']) == chave:
+                        return conta
+        return None
@@ -0,0 +1,217 @@
+import json
+import os
+import logging
+import threading
+import dominios
+from dominios import normalizar_conta
+from armazenamento import (Armazenamento, ARQUIVO_DADOS, MODO_SQLITE, arquivo_sqlite_de, arquivo_diario_de,
+                           aplicar_diario, carregar_dados)
+
+# Modo "sqlite" de armazenamento.criar_armazenamento, importado só quando escolhido
+
+# === Armazenamento em banco SQLite ===
+SQL_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS contas (
+    id INTEGER PRIMARY KEY,
+    conta_id TEXT,
+    site TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    conta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contas_site ON contas (site COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_contas_usuario ON contas (usuario COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_contas_chave ON contas (chave);
+CREATE TABLE IF NOT EXISTS meta (
+    nome TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+# Criado depois da coluna conta_id, que bancos antigos ganham por ALTER TABLE
+SQL_INDICE_CONTA_ID = "CREATE INDEX IF NOT EXISTS idx_contas_conta_id ON contas (conta_id)"
+SQL_INSERIR = "INSERT INTO contas (conta_id, site, usuario, chave, conta) VALUES (?, ?, ?, ?, ?)"
+SQL_EXCLUIR = "DELETE FROM contas WHERE conta_id = ?"
+SQL_ATUALIZAR = "UPDATE contas SET conta = ? WHERE conta_id = ?"
+SQL_BUSCAR = "SELECT conta FROM contas WHERE chave = ? ORDER BY id LIMIT 1"
+SQL_PAGINA = "SELECT id, site, conta FROM contas ORDER BY site COLLATE NOCASE, id LIMIT ?"
+SQL_PAGINA_APOS = ("SELECT id, site, conta FROM contas "
+                   "WHERE site COLLATE NOCASE >= :site AND NOT (site COLLATE NOCASE = :site AND id <= :id) "
+                   "ORDER BY site COLLATE NOCASE, id LIMIT :quantidade")
+SQL_TODAS = "SELECT conta FROM contas ORDER BY id"
+
+def _linha_conta(conta):
+    return (conta.get('id'), conta['site'], conta['usuario'], normalizar_conta(conta['site'], conta['usuario']),
+            json.dumps(conta, ensure_ascii=False))
+
+def _preparar_esquema(conexao):
+    """Cria as tabelas e acrescenta a coluna conta_id (id estável da conta) a bancos antigos"""
+    conexao.executescript(SQL_ESQUEMA)
+    colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(contas)")}
+    if 'conta_id' not in colunas:
+        with conexao:
+            conexao.execute("ALTER TABLE contas ADD COLUMN conta_id TEXT")
+            linhas = conexao.execute("SELECT id, conta FROM contas").fetchall()
+            conexao.executemany("UPDATE contas SET conta_id = ? WHERE id = ?",
+                                ((json.loads(conta).get('id'), id_) for id_, conta in linhas))
+        logging.info(f"Coluna conta_id adicionada ao banco SQLite ({len(linhas)} contas)")
+    conexao.execute(SQL_INDICE_CONTA_ID)
+
+class ArmazenamentoSQLite(Armazenamento):
+    """Guarda as contas em SQLite (modo WAL) com índices por id, site, usuário e chave normalizada
+
+    Cada adição ou exclusão é uma única instrução indexada, sem reescrever o
+    cofre; exclusões e atualizações localizam a linha pelo id da conta
+    (conta_id), nunca pela chave normalizada, que pode se repetir. Alterações feitas por outros processos são detectadas pelo
+    PRAGMA data_version, sem precisar reler o banco.
+    """
+    modo = MODO_SQLITE
+    regrava_tudo = False
+    consulta_direta = True
+    paginado = True
+    # data_version só vale dentro da mesma conexão
+    assinatura_estavel = False
+
+    def __init__(self, arquivo_dados=ARQUIVO_DADOS, arquivo_sqlite=None):
+        super().__init__()
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_sqlite = arquivo_sqlite or arquivo_sqlite_de(arquivo_dados)
+        self._conexao = None
+        self._trava = threading.Lock()
+
+    def _conectar(self):
+        if self._conexao is None:
+            novo = not os.path.exists(self.arquivo_sqlite)
+            # Importado só no modo SQLite (a linha de comando não paga por ele nos outros modos)
+            import sqlite3
+            self._conexao = sqlite3.connect(self.arquivo_sqlite, check_same_thread=False)
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("PRAGMA synchronous=NORMAL")
+            _preparar_esquema(self._conexao)
+            self._atualizar_chaves()
+            if novo and os.path.exists(self.arquivo_dados):
+                migrar_json_para_sqlite(self.arquivo_dados, self.arquivo_sqlite, conexao=self._conexao)
+        return self._conexao
+
+    def _atualizar_chaves(self):
+        """Recalcula a coluna chave quando as regras de domínio mudaram desde a última abertura"""
+        regras = dominios.mapa_ativo.assinatura()
+        linha = self._conexao.execute("SELECT valor FROM meta WHERE nome = 'regras'").fetchone()
+        if linha is not None and linha[0] == regras:
+            return
+        with self._conexao:
+            linhas = self._conexao.execute("SELECT id, site, usuario FROM contas").fetchall()
+            self._conexao.executemany("UPDATE contas SET chave = ? WHERE id = ?",
+                                      ((normalizar_conta(site, usuario), id_) for id_, site, usuario in linhas))
+            self._conexao.execute("INSERT OR REPLACE INTO meta (nome, valor) VALUES ('regras', ?)", (regras,))
+        if linhas:
+            logging.info(f"Chaves normalizadas recalculadas para {len(linhas)} contas")
+
+    def assinatura(self):
+        with self._trava:
+            return (self._conectar().execute("PRAGMA data_version").fetchone()[0],)
+
+    def carregar(self):
+        logging.info("Carregando contas do banco SQLite...")
+        with self._trava:
+            dados = [json.loads(conta) for (conta,) in self._conectar().execute(SQL_TODAS)]
+        self._assinatura = self.assinatura()
+        logging.info(f"Carregados {len(dados)} contas do banco SQLite")
+        return dados
+
+    def salvar(self, dados):
+        try:
+            logging.info(f"Salvando {len(dados)} contas no banco SQLite...")
+            with self._trava:
+                conexao = self._conectar()
+                with conexao:
+                    conexao.execute("DELETE FROM contas")
+                    conexao.executemany(SQL_INSERIR, (_linha_conta(conta) for conta in dados))
+            self._assinatura = self.assinatura()
+            logging.info("Dados salvos com sucesso")
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao salvar dados: {str(e)}")
+            return False
+
+    def _executar(self, sql, parametros, varios=False):
+        try:
+            with self._trava:
+                conexao = self._conectar()
+                with conexao:
+                    if varios:
+                        conexao.executemany(sql, parametros)
+                    else:
+                        conexao.execute(sql, parametros)
+            self._assinatura = self.assinatura()
+            return True
+        except Exception as e:
+            logging.error(f"Erro no banco SQLite: {str(e)}")
+            return False
+
+    def adicionar(self, dados, conta):
+        return self._executar(SQL_INSERIR, _linha_conta(conta))
+
+    def excluir(self, dados, conta):
+        return self._executar(SQL_EXCLUIR, (conta['id'],))
+
+    def adicionar_varias(self, dados, contas):
+        return self._executar(SQL_INSERIR, [_linha_conta(conta) for conta in contas], varios=True)
+
+    def atualizar_varias(self, dados, contas):
+        return self._executar(SQL_ATUALIZAR, [(json.dumps(conta, ensure_ascii=False), conta['id'])
+                                              for conta in contas], varios=True)
+
+    def excluir_varias(self, dados, contas):
+        return self._executar(SQL_EXCLUIR, [(conta['id'],) for conta in contas], varios=True)
+
+    # === Consultas diretas (sem carregar o cofre inteiro) ===
+    def buscar(self, site, usuario):
+        """Busca pela chave normalizada usando o índice"""
+        with self._trava:
+            linha = self._conectar().execute(SQL_BUSCAR, (normalizar_conta(site, usuario),)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def listar_pagina(self, quantidade=100, depois_de=None):
+        """Retorna (contas, cursor) de uma página ordenada por site
+
+        A paginação é por cursor (site, id) em vez de OFFSET, então o custo de
+        cada página não cresce com a posição no cofre. Passe o cursor
+        retornado para obter a página seguinte; None indica o fim.
+        """
+        with self._trava:
+            if depois_de is None:
+                linhas = self._conectar().execute(SQL_PAGINA, (quantidade,)).fetchall()
+            else:
+                site, id_ = depois_de
+                linhas = self._conectar().execute(SQL_PAGINA_APOS,
+                                                  {'site': site, 'id': id_, 'quantidade': quantidade}).fetchall()
+        cursor = (linhas[-1][1], linhas[-1][0]) if len(linhas) == quantidade else None
+        return [json.loads(conta) for _, _, conta in linhas], cursor
+
+    def fechar(self):
+        with self._trava:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+def migrar_json_para_sqlite(arquivo_dados, arquivo_sqlite=None, conexao=None):
+    """Copia as contas de um contas.json (e diário pendente) para o banco SQLite; retorna a quantidade"""
+    arquivo_sqlite = arquivo_sqlite or arquivo_sqlite_de(arquivo_dados)
+    dados, _ = aplicar_diario(carregar_dados(arquivo_dados), arquivo_diario_de(arquivo_dados))
+    propria = conexao is None
+    if propria:
+        import sqlite3
+        conexao = sqlite3.connect(arquivo_sqlite)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        _preparar_esquema(conexao)
+    try:
+        with conexao:
+            if conexao.execute("SELECT COUNT(*) FROM contas").fetchone()[0]:
+                logging.warning(f"Banco {arquivo_sqlite} já possui contas, migração ignorada")
+                return 0
+            conexao.executemany(SQL_INSERIR, (_linha_conta(conta) for conta in dados))
+        logging.info(f"Migradas {len(dados)} contas de {arquivo_dados} para {arquivo_sqlite}")
+        return len(dados)
+    finally:
+        if propria:
+            conexao.close()
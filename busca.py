@@ -0,0 +1,221 @@
+import bisect
+import heapq
+import itertools
+import re
+import dominios
+from dominios import extrair_host
+
+# Campos indexados: valor inteiro e palavras, do mais ao menos relevante
+CAMPO_SITE, PALAVRA_SITE, CAMPO_USUARIO, PALAVRA_USUARIO, CAMPO_APELIDO, PALAVRA_APELIDO = range(6)
+# Pontos somados quando o termo é só prefixo do token (exato vale o código do campo)
+PENALIDADE_PREFIXO = 10
+
+LIMITE_RESULTADOS = 200
+MINIMO_CARACTERES = 2
+# Acima desse número de ocorrências o total deixa de ser contado exatamente
+LIMITE_CONTAGEM = 20000
+# Listas de até esse tamanho são juntadas e ordenadas em vez de intercaladas
+LIMITE_LISTA_PEQUENA = 64
+
+_SEPARADORES = re.compile(r"[^0-9a-zà-ÿ]+")
+
+def _tokens(valor, campo, palavra):
+    """Valor inteiro em minúsculas mais cada palavra dele (sem repetir o valor)"""
+    valor = (valor or '').lower().strip()
+    if not valor:
+        return []
+    tokens = [(valor, campo)]
+    for parte in set(_SEPARADORES.split(valor)):
+        if parte and parte != valor:
+            tokens.append((parte, palavra))
+    return tokens
+
+def _campos(conta):
+    return ((conta['site'], CAMPO_SITE, PALAVRA_SITE),
+            (conta['usuario'], CAMPO_USUARIO, PALAVRA_USUARIO),
+            (conta.get('apelido'), CAMPO_APELIDO, PALAVRA_APELIDO))
+
+def _tokens_conta(conta):
+    return [token for valor, campo, palavra in _campos(conta) for token in _tokens(valor, campo, palavra)]
+
+def proximidade_dominio(site):
+    """Quão perto o site está do seu domínio normalizado (0 = idêntico)"""
+    site_lower = site.lower().strip()
+    host = extrair_host(site_lower)
+    dominio = dominios.mapa_ativo.equivalente(host) or host
+    if site_lower == dominio:
+        return 0
+    return 1 + abs(len(site_lower) - len(dominio))
+
+class IndiceBusca:
+    """Índice de prefixos sobre site, usuário e apelido para busca incremental
+
+    Cada conta contribui com o valor inteiro de cada campo e com suas
+    palavras. Cada token aponta para uma lista de contas já ordenada pelo
+    desempate (proximidade do site com o domínio normalizado, depois o site),
+    então os melhores resultados saem intercalando poucas listas, sem ordenar
+    todas as contas encontradas. Vários termos são combinados com E.
+    """
+    def __init__(self, contas=()):
+        self._contas = {}
+        self._postagens = {}
+        # id() desempata contas com o mesmo site e identifica a conta na exclusão
+        chaves = sorted((proximidade_dominio(conta['site']), conta['site'].lower(), id(conta), conta)
+                        for conta in contas)
+        for proximidade, site, identificador, conta in chaves:
+            chave = (proximidade, site, identificador)
+            self._contas[identificador] = conta
+            for token in _tokens_conta(conta):
+                self._postagens.setdefault(token, []).append(chave)
+        self._tokens = sorted(self._postagens)
+
+    def __len__(self):
+        return len(self._contas)
+
+    @staticmethod
+    def _chave(conta):
+        return (proximidade_dominio(conta['site']), conta['site'].lower(), id(conta))
+
+    def inserir(self, conta):
+        chave = self._chave(conta)
+        self._contas[chave[2]] = conta
+        for token in _tokens_conta(conta):
+            lista = self._postagens.get(token)
+            if lista is None:
+                self._postagens[token] = [chave]
+                bisect.insort(self._tokens, token)
+            else:
+                bisect.insort(lista, chave)
+
+    def remover(self, conta):
+        chave = self._chave(conta)
+        if self._contas.pop(chave[2], None) is None:
+            return False
+        for token in _tokens_conta(conta):
+            lista = self._postagens.get(token)
+            if lista is None:
+                continue
+            posicao = bisect.bisect_left(lista, chave)
+            if posicao < len(lista) and lista[posicao] == chave:
+                del lista[posicao]
+            if not lista:
+                del self._postagens[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+        return True
+
+    def _niveis(self, termo):
+        """Listas de contas que casam com o termo, agrupadas por pontuação"""
+        inicio = bisect.bisect_left(self._tokens, (termo,))
+        fim = bisect.bisect_left(self._tokens, (termo + "\uffff",))
+        niveis = {}
+        postagens = self._postagens
+        for par in self._tokens[inicio:fim]:
+            pontos = par[1] if par[0] == termo else PENALIDADE_PREFIXO + par[1]
+            listas = niveis.get(pontos)
+            if listas is None:
+                niveis[pontos] = [postagens[par]]
+            else:
+                listas.append(postagens[par])
+        return niveis
+
+    @staticmethod
+    def _tamanho(niveis):
+        return sum(sum(map(len, listas)) for listas in niveis.values())
+
+    @staticmethod
+    def _em_ordem(niveis):
+        """Gera (pontos, chave) em ordem de pontuação e desempate, sem repetir contas"""
+        vistos = set()
+        for pontos in sorted(niveis):
+            # Listas grandes são intercaladas; as pequenas viram uma só lista ordenada
+            grandes = [lista for lista in niveis[pontos] if len(lista) > LIMITE_LISTA_PEQUENA]
+            pequenas = [lista for lista in niveis[pontos] if len(lista) <= LIMITE_LISTA_PEQUENA]
+            for chave in heapq.merge(*grandes, sorted(itertools.chain.from_iterable(pequenas))):
+                if chave not in vistos:
+                    vistos.add(chave)
+                    yield pontos, chave
+
+    @staticmethod
+    def _pontos_termo(tokens, termo):
+        """Melhor pontuação do termo entre os tokens de uma conta, ou None"""
+        melhor = None
+        for token, campo in tokens:
+            if token.startswith(termo):
+                pontos = campo if token == termo else PENALIDADE_PREFIXO + campo
+                if melhor is None or pontos < melhor:
+                    melhor = pontos
+        return melhor
+
+    @classmethod
+    def _pontos_conta(cls, conta, termo):
+        """Melhor pontuação do termo na conta, ou None; só separa em palavras os campos que contêm o termo"""
+        melhor = None
+        for valor, campo, palavra in _campos(conta):
+            if not valor or termo not in valor.lower():
+                continue
+            pontos = cls._pontos_termo(_tokens(valor, campo, palavra), termo)
+            if pontos is not None and (melhor is None or pontos < melhor):
+                melhor = pontos
+        return melhor
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Retorna (contas ordenadas por relevância, total encontrado, se o total é exato)
+
+        Termos com menos de MINIMO_CARACTERES são ignorados. Quando as listas
+        envolvidas passam de LIMITE_CONTAGEM, o total é uma estimativa por
+        cima e, com vários termos, os resultados seguem a ordem do termo mais
+        raro em vez da soma das pontuações.
+        """
+        termos = [termo for termo in texto.lower().split() if len(termo) >= MINIMO_CARACTERES]
+        if not termos:
+            return [], 0, True
+        # Parte do termo com menos ocorrências e filtra pelos demais
+        por_termo = sorted(((self._tamanho(niveis), niveis, termo)
+                            for niveis, termo in ((self._niveis(termo), termo) for termo in termos)),
+                           key=lambda trio: trio[0])
+        tamanho, niveis, _ = por_termo[0]
+
+        if len(por_termo) == 1:
+            melhores = [chave for _, chave in itertools.islice(self._em_ordem(niveis), limite)]
+            if tamanho > LIMITE_CONTAGEM:
+                return [self._contas[chave[2]] for chave in melhores], tamanho, False
+            total = len(set().union(*(lista for listas in niveis.values() for lista in listas)))
+            return [self._contas[chave[2]] for chave in melhores], total, True
+
+        if tamanho > LIMITE_CONTAGEM:
+            # Muitas candidatas: percorre em ordem e confere os outros termos conta a conta
+            encontradas = []
+            for examinadas, (pontos, chave) in enumerate(self._em_ordem(niveis)):
+                if examinadas >= LIMITE_CONTAGEM:
+                    # Termos que quase não se cruzam: resolve pela filtragem abaixo
+                    break
+                conta = self._contas[chave[2]]
+                for _, _, termo in por_termo[1:]:
+                    outros = self._pontos_conta(conta, termo)
+                    if outros is None:
+                        break
+                    pontos += outros
+                else:
+                    encontradas.append((pontos, chave))
+                    if len(encontradas) >= limite:
+                        encontradas.sort()
+                        return [self._contas[chave[2]] for _, chave in encontradas], tamanho, False
+
+        # Filtra as contas do termo mais raro pelos próprios campos: o custo não depende de
+        # quantas contas casam com os termos comuns (ex.: "com")
+        candidatas = {}
+        for pontos in sorted(niveis, reverse=True):
+            for lista in niveis[pontos]:
+                candidatas.update(dict.fromkeys(lista, pontos))
+        pontuadas = []
+        for chave, pontos in candidatas.items():
+            conta = self._contas[chave[2]]
+            for _, _, termo in por_termo[1:]:
+                pontos_termo = self._pontos_conta(conta, termo)
+                if pontos_termo is None:
+                    break
+                pontos += pontos_termo
+            else:
+                pontuadas.append((pontos, chave))
+        melhores = heapq.nsmallest(limite, pontuadas)
+        return [self._contas[chave[2]] for _, chave in melhores], len(pontuadas), True
@@ -0,0 +1,115 @@
+import base64
+import json
+import math
+import os
+import logging
+import time
+
+# === Derivação da chave a partir da senha mestre (scrypt) ===
+VERSAO_PROTECAO = 1
+ALGORITMO_KDF = "scrypt"
+# Tempo de desbloqueio buscado pela calibração
+TEMPO_DESBLOQUEIO_PADRAO = 0.3
+# Custo mínimo aceito mesmo em máquinas lentas e teto de memória (2^20 * 128 * r bytes = 1 GiB)
+N_MINIMO = 2 ** 14
+N_MAXIMO = 2 ** 20
+R_KDF = 8
+TAMANHO_SAL = 16
+# Desbloqueios fora desta faixa em torno do alvo disparam uma nova calibração
+TOLERANCIA_CALIBRACAO = 2.0
+
+def _derivar(senha, sal, n, r, p):
+    # cryptography só é importado ao desbloquear (listar contas não precisa dele)
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+    chave = Scrypt(salt=sal, length=32, n=n, r=r, p=p).derive(senha.encode('utf-8'))
+    return base64.urlsafe_b64encode(chave)
+
+def derivar_chave(senha, kdf):
+    """Chave Fernet derivada da senha mestre com os parâmetros gravados no cabeçalho"""
+    if kdf.get('algoritmo') != ALGORITMO_KDF:
+        raise ValueError(f"Algoritmo de derivação não suportado: {kdf.get('algoritmo')}")
+    return _derivar(senha, base64.b64decode(kdf['sal']), kdf['n'], kdf['r'], kdf['p'])
+
+def calibrar_kdf(tempo_alvo=TEMPO_DESBLOQUEIO_PADRAO):
+    """Escolhe o custo do scrypt para que a derivação leve cerca de tempo_alvo nesta máquina
+
+    Mede o custo mínimo (o menor de duas medições) e, como o tempo do scrypt é
+    linear em n, escolhe a potência de dois mais próxima do alvo. Acima do teto
+    de memória o custo extra vai para p, que não aumenta a memória usada.
+    """
+    medicoes = []
+    for _ in range(2):
+        inicio = time.perf_counter()
+        _derivar("calibracao", os.urandom(TAMANHO_SAL), N_MINIMO, R_KDF, 1)
+        medicoes.append(time.perf_counter() - inicio)
+    por_n = min(medicoes) / N_MINIMO
+
+    expoente = round(math.log2(max(tempo_alvo / por_n, 1)))
+    n = min(max(2 ** expoente, N_MINIMO), N_MAXIMO)
+    p = max(1, round(tempo_alvo / (por_n * n)))
+    logging.info(f"KDF calibrado: scrypt n=2^{int(math.log2(n))}, r={R_KDF}, p={p} "
+                 f"(~{por_n * n * p * 1000:.0f}ms estimados para alvo de {tempo_alvo * 1000:.0f}ms)")
+    return {
+        'algoritmo': ALGORITMO_KDF,
+        'n': n,
+        'r': R_KDF,
+        'p': p,
+        'sal': base64.b64encode(os.urandom(TAMANHO_SAL)).decode()
+    }
+
+def conteudo_protegido(conteudo):
+    """Indica se o conteúdo do arquivo de chaves está protegido pela senha mestre"""
+    return conteudo.lstrip().startswith(b"{")
+
+class ProtecaoChave:
+    """Embrulha as chaves do cofre com uma chave derivada da senha mestre
+
+    O cabeçalho gravado em chave.key guarda os parâmetros do KDF e as chaves
+    do cofre criptografadas pela chave derivada. Trocar o custo do KDF (ou a
+    senha mestre) só regrava esse cabeçalho; as contas não são tocadas.
+    """
+    def __init__(self, kdf, chave_derivada, segundos=0.0):
+        from cryptography.fernet import Fernet
+        self.kdf = kdf
+        self._fernet = Fernet(chave_derivada)
+        # Tempo gasto na última derivação, comparado ao alvo para recalibrar
+        self.segundos = segundos
+
+    @classmethod
+    def criar(cls, senha, tempo_alvo=TEMPO_DESBLOQUEIO_PADRAO):
+        """Nova proteção com custo calibrado para esta máquina"""
+        kdf = calibrar_kdf(tempo_alvo)
+        inicio = time.perf_counter()
+        chave = derivar_chave(senha, kdf)
+        return cls(kdf, chave, time.perf_counter() - inicio)
+
+    @classmethod
+    def abrir(cls, senha, cabecalho):
+        """Deriva a chave com os parâmetros do cabeçalho; retorna (proteção, chaves do cofre)
+
+        Levanta cryptography.fernet.InvalidToken se a senha estiver errada.
+        """
+        if cabecalho.get('versao') != VERSAO_PROTECAO:
+            raise ValueError(f"Versão do arquivo de chaves não suportada: {cabecalho.get('versao')}")
+        inicio = time.perf_counter()
+        chave = derivar_chave(senha, cabecalho['kdf'])
+        protecao = cls(cabecalho['kdf'], chave, time.perf_counter() - inicio)
+        return protecao, protecao.desembrulhar(cabecalho)
+
+    def fora_do_alvo(self, tempo_alvo):
+        """Indica se a última derivação ficou longe demais do tempo alvo"""
+        return not (tempo_alvo / TOLERANCIA_CALIBRACAO <= self.segundos <= tempo_alvo * TOLERANCIA_CALIBRACAO)
+
+    def embrulhar(self, chaves):
+        """Cabeçalho com os parâmetros do KDF e as chaves do cofre criptografadas"""
+        return {
+            'versao': VERSAO_PROTECAO,
+            'kdf': self.kdf,
+            'chaves': self._fernet.encrypt(b"\n".join(chaves)).decode()
+        }
+
+    def desembrulhar(self, cabecalho):
+        return self._fernet.decrypt(cabecalho['chaves'].encode()).split(b"\n")
+
+    def serializar(self, chaves):
+        return json.dumps(self.embrulhar(chaves), indent=4).encode('utf-8')
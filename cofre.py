@@ -0,0 +1,919 @@
+import json
+import os
+import logging
+import threading
+import time
+import dominios
+from ordenacao import IndiceOrdenado
+from segredos import CacheSegredos
+from reuso import Impressor, IndiceReuso
+from chave_mestra import ProtecaoChave, conteudo_protegido, TEMPO_DESBLOQUEIO_PADRAO
+from dominios import normalizar_conta
+from armazenamento import gravar_atomico, criar_armazenamento, MODO_JSON
+
+# === Arquivos padrão ===
+ARQUIVO_CHAVE = "chave.key"
+ARQUIVO_DADOS = "contas.json"
+ARQUIVO_CONFIG = "config.json"
+
+# Contas criptografadas por lote na importação em massa
+TAMANHO_LOTE_IMPORTACAO = 500
+# Contas por página em Cofre.pagina (listagem da linha de comando)
+TAMANHO_PAGINA = 500
+# Acima disto, importações e exclusões em lote remontam as ordenações em vez de atualizá-las conta a conta
+LIMITE_ATUALIZACAO_ORDENADA = 1000
+
+# === Erros do cofre ===
+class ErroCofre(Exception):
+    """Erro base das operações do cofre"""
+
+class ContaDuplicada(ErroCofre):
+    """Já existe uma conta com o mesmo site e usuário"""
+
+class CofreFechado(ErroCofre):
+    """Operação executada antes de abrir o cofre"""
+
+class SenhaMestreInvalida(ErroCofre):
+    """Senha mestre ausente ou incorreta para o arquivo de chaves"""
+
+# === Chave de criptografia ===
+def chave_protegida(arquivo_chave=ARQUIVO_CHAVE):
+    """Indica se o arquivo de chaves existe e está protegido por senha mestre"""
+    if not os.path.exists(arquivo_chave):
+        return False
+    with open(arquivo_chave, "rb") as f:
+        return conteudo_protegido(f.read())
+
+def carregar_chave(arquivo_chave=ARQUIVO_CHAVE, senha_mestre=None):
+    """Carrega a chave de criptografia atual, gerando uma nova se não existir"""
+    return carregar_chaves(arquivo_chave, senha_mestre)[0][0]
+
+def carregar_chaves(arquivo_chave=ARQUIVO_CHAVE, senha_mestre=None, tempo_desbloqueio=TEMPO_DESBLOQUEIO_PADRAO):
+    """Carrega as chaves do arquivo (a atual primeiro), gerando uma se não existir; retorna (chaves, proteção)
+
+    Com senha mestre, as chaves ficam embrulhadas por uma chave derivada dela
+    (ver chave_mestra.py); um arquivo ainda sem proteção passa a ser protegido.
+    Se o desbloqueio levar muito mais ou muito menos que tempo_desbloqueio, o
+    custo do KDF é recalibrado e só o arquivo de chaves é regravado. Mais de
+    uma chave só aparece durante uma rotação (ver rotacao.py): as contas ainda
+    não recriptografadas continuam legíveis pelas antigas.
+    """
+    # cryptography só é importado quando uma senha é tocada (listar e buscar não precisam dele)
+    from cryptography.fernet import Fernet, InvalidToken
+    if not os.path.exists(arquivo_chave):
+        logging.info("Gerando nova chave de criptografia...")
+        chaves = [Fernet.generate_key()]
+        protecao = ProtecaoChave.criar(senha_mestre, tempo_desbloqueio) if senha_mestre is not None else None
+        salvar_chaves(chaves, arquivo_chave, protecao)
+        logging.info("Chave de criptografia gerada e salva com sucesso")
+        return chaves, protecao
+
+    with open(arquivo_chave, "rb") as f:
+        conteudo = f.read()
+    if conteudo_protegido(conteudo):
+        if senha_mestre is None:
+            raise SenhaMestreInvalida("O arquivo de chaves é protegido por senha mestre")
+        try:
+            protecao, chaves = ProtecaoChave.abrir(senha_mestre, json.loads(conteudo))
+        except InvalidToken:
+            raise SenhaMestreInvalida("Senha mestre incorreta")
+        logging.info(f"Chave de criptografia desbloqueada em {protecao.segundos * 1000:.0f}ms")
+        if protecao.fora_do_alvo(tempo_desbloqueio):
+            logging.info("Tempo de desbloqueio fora do alvo, recalibrando o KDF...")
+            protecao = ProtecaoChave.criar(senha_mestre, tempo_desbloqueio)
+            salvar_chaves(chaves, arquivo_chave, protecao)
+    else:
+        chaves = [linha.strip() for linha in conteudo.splitlines() if linha.strip()]
+        protecao = None
+        if senha_mestre is not None:
+            protecao = ProtecaoChave.criar(senha_mestre, tempo_desbloqueio)
+            salvar_chaves(chaves, arquivo_chave, protecao)
+            logging.info("Chave de criptografia protegida com a senha mestre")
+    if len(chaves) > 1:
+        logging.info(f"Chave de criptografia carregada com {len(chaves) - 1} chave(s) antiga(s) em rotação")
+    else:
+        logging.info("Chave de criptografia carregada com sucesso")
+    return chaves, protecao
+
+def salvar_chaves(chaves, arquivo_chave=ARQUIVO_CHAVE, protecao=None):
+    """Substitui o arquivo de chaves de uma vez (a atual primeiro), embrulhado pela proteção se houver"""
+    conteudo = protecao.serializar(chaves) if protecao else b"\n".join(chaves)
+    gravar_atomico(arquivo_chave, lambda f: f.write(conteudo), binario=True)
+
+def gerar_id():
+    """Identificador único e estável de uma conta"""
+    import uuid
+    return uuid.uuid4().hex
+
+def agora():
+    """Data e hora atuais no formato de data_criacao"""
+    from datetime import datetime
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# === Índice de chaves normalizadas ===
+VERSAO_INDICE = 1
+
+def arquivo_indice_de(arquivo_dados):
+    """Caminho do índice persistido ao lado do arquivo de dados"""
+    return arquivo_dados + ".idx"
+
+def carregar_indice(arquivo_indice, assinatura):
+    """Carrega as chaves persistidas se corresponderem ao arquivo de dados e às regras de domínio atuais"""
+    if assinatura is None or not os.path.exists(arquivo_indice):
+        return None
+    try:
+        with open(arquivo_indice, "r", encoding='utf-8') as f:
+            indice = json.load(f)
+        if (indice.get('versao') != VERSAO_INDICE or
+                tuple(indice.get('assinatura', ())) != assinatura or
+                indice.get('regras') != dominios.mapa_ativo.assinatura()):
+            logging.info("Índice persistido desatualizado, será reconstruído")
+            return None
+        return indice['chaves']
+    except Exception as e:
+        logging.warning(f"Erro ao carregar índice: {str(e)}")
+        return None
+
+def salvar_indice(arquivo_indice, assinatura, chaves):
+    """Persiste as chaves normalizadas na mesma ordem das contas; retorna False se a gravação falhar"""
+    try:
+        with open(arquivo_indice, "w", encoding='utf-8') as f:
+            json.dump({
+                'versao': VERSAO_INDICE,
+                'assinatura': list(assinatura),
+                'regras': dominios.mapa_ativo.assinatura(),
+                'chaves': chaves
+            }, f)
+        return True
+    except Exception as e:
+        logging.warning(f"Erro ao salvar índice: {str(e)}")
+        return False
+
+# === Motor do cofre (sem interface gráfica) ===
+class Cofre:
+    """Motor do cofre de senhas: dono dos dados e da chave, sem dependência do Tk
+
+    As contas ficam residentes em memória e são a cópia oficial; o arquivo só é
+    relido quando sua assinatura (mtime, tamanho, inode) muda fora do processo.
+    Um índice chave normalizada -> conta responde às verificações de duplicata
+    em tempo constante e pode ser persistido ao lado do arquivo de dados. Cada
+    conta tem um 'id' estável, indexado em memória para localizar e excluir.
+    A gravação fica a cargo do armazenamento do modo escolhido (JSON, diário,
+    SQLite ou cifrado por inteiro).
+
+    Aberto sob demanda (abrir/carregar com sob_demanda=True) sobre um
+    armazenamento com consulta direta, o cofre não carrega as contas: obter(),
+    as duplicatas de adicionar(), excluir() e pagina() consultam o disco, e
+    qualquer outra operação carrega o cofre inteiro na primeira vez.
+
+    Uma trava reentrante protege o estado em memória: a interface lê pela
+    thread do Tk enquanto as gravações rodam na fila de escrita de tarefas.py.
+    Ela só é segurada enquanto a memória muda; a escrita em disco acontece
+    depois, fora dela, sob uma segunda trava que põe as gravações em fila,
+    e desfaz a mudança na memória se falhar. Os índices de busca e de
+    ordenação também são montados sobre uma cópia, fora da trava.
+    """
+    def __init__(self, arquivo_dados=ARQUIVO_DADOS, arquivo_chave=ARQUIVO_CHAVE,
+                 arquivo_config=ARQUIVO_CONFIG, persistir_indice=False, modo_armazenamento=MODO_JSON,
+                 tempo_desbloqueio=TEMPO_DESBLOQUEIO_PADRAO):
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_chave = arquivo_chave
+        self.arquivo_config = arquivo_config
+        self.arquivo_indice = arquivo_indice_de(arquivo_dados)
+        self.armazenamento = criar_armazenamento(modo_armazenamento, arquivo_dados)
+        self.persistir_indice = (persistir_indice and self.armazenamento.assinatura_estavel and
+                                 not self.armazenamento.confidencial)
+        self.tempo_desbloqueio = tempo_desbloqueio
+        self.fernet = None
+        self.chaves = []
+        self.protecao = None
+        self.dados = None
+        # Aberto sem carregar as contas (ver abrir); dados fica None até alguém precisar delas
+        self._sob_demanda = False
+        # Chaves normalizadas -> conta; montado no primeiro uso (ver _indice)
+        self._chaves = {}
+        # Assinatura do arquivo de dados à qual o índice persistido corresponde
+        self._assinatura_indice = None
+        self._por_id = {}
+        self._ordens = {}
+        self._busca = None
+        # Senhas recém-reveladas (copiar/ver detalhes), zeradas ao vencer ou ao fechar o cofre
+        self.segredos = CacheSegredos()
+        # Impressões HMAC das senhas: reuso detectado sem descriptografar
+        self._impressor = None
+        self._reuso = IndiceReuso()
+        self.cache_acertos = 0
+        self.cache_falhas = 0
+        self._trava = threading.RLock()
+        # Enfileira as gravações (uma por vez, na ordem); a escrita em disco roda fora de _trava
+        self._trava_escrita = threading.RLock()
+        self._gravando = False
+
+    def abrir(self, senha_mestre=None, sob_demanda=False):
+        """Carrega a chave, as regras de domínio e as contas; retorna o próprio cofre
+
+        Levanta SenhaMestreInvalida se o arquivo de chaves for protegido e a
+        senha mestre faltar ou estiver errada. Com sob_demanda=True e um
+        armazenamento com consulta direta, as contas ficam no disco até uma
+        operação precisar de todas (ver a classe).
+        """
+        with self._trava:
+            inicio = time.perf_counter()
+            chaves, self.protecao = carregar_chaves(self.arquivo_chave, senha_mestre, self.tempo_desbloqueio)
+            self.usar_chaves(chaves)
+            dominios.configurar_dominios(dominios.carregar_regras(self.arquivo_config))
+            self._carregar_contas(sob_demanda)
+            segundos = time.perf_counter() - inicio
+            contas = len(self.dados or ())
+            if self.dados is None:
+                logging.info(f"Cofre aberto sob demanda em {segundos:.2f}s",
+                             extra={'operacao': 'abrir', 'duracao_ms': round(segundos * 1000, 1), 'contas': contas})
+            else:
+                logging.info(f"Cofre aberto com {contas} contas em {segundos:.2f}s",
+                             extra={'operacao': 'abrir', 'duracao_ms': round(segundos * 1000, 1), 'contas': contas})
+            return self
+
+    def _carregar_contas(self, sob_demanda):
+        """Lê as contas, ou só marca o cofre como aberto sob demanda se o armazenamento permitir"""
+        self._sob_demanda = sob_demanda and self.armazenamento.consulta_direta
+        if self._sob_demanda:
+            self.dados = None
+        else:
+            self._recarregar()
+
+    def carregar(self, sob_demanda=False):
+        """Carrega as regras de domínio e as contas sem desbloquear a chave; retorna o próprio cofre
+
+        Basta para listar, buscar e excluir, que não leem nenhuma senha: não
+        pede a senha mestre nem importa cryptography. Criptografar ou
+        descriptografar exige abrir(). No modo cifrado até site e usuário
+        estão criptografados, então levanta CofreFechado.
+        """
+        with self._trava:
+            if self.armazenamento.confidencial:
+                raise CofreFechado("O modo cifrado exige a senha mestre para ler as contas")
+            dominios.configurar_dominios(dominios.carregar_regras(self.arquivo_config))
+            self._carregar_contas(sob_demanda)
+            return self
+
+    def usar_chaves(self, chaves):
+        """Criptografa com a primeira chave e descriptografa com qualquer uma delas"""
+        with self._trava:
+            from cryptography.fernet import Fernet, MultiFernet
+            self.chaves = list(chaves)
+            self.fernet = MultiFernet([Fernet(chave) for chave in chaves])
+            self._impressor = Impressor(self.chaves[0])
+            self.segredos.limpar()
+            if self.dados is not None:
+                # Após uma rotação as impressões já foram recalculadas com a chave nova
+                self._reuso = IndiceReuso(self.dados)
+            self.armazenamento.usar_chave(self.fernet)
+
+    def trocar_senha_mestre(self, nova_senha):
+        """Protege as chaves com uma nova senha mestre (só o arquivo de chaves é regravado)"""
+        self._exigir_aberto()
+        self.protecao = ProtecaoChave.criar(nova_senha, self.tempo_desbloqueio)
+        salvar_chaves(self.chaves, self.arquivo_chave, self.protecao)
+        logging.info("Senha mestre alterada")
+
+    # === Rotação de chave (ver rotacao.py) ===
+    def trocar_chaves(self, chaves):
+        """Grava as chaves (a atual primeiro) no arquivo de chaves e passa a usá-las, entre duas gravações"""
+        with self._trava_escrita, self._trava:
+            self._exigir_aberto()
+            salvar_chaves(chaves, self.arquivo_chave, self.protecao)
+            self.usar_chaves(chaves)
+
+    def senhas_gravadas(self):
+        """Senhas cifradas como estão no armazenamento, relidas do disco e não da memória"""
+        with self._trava:
+            return [conta['senha'] for conta in self.armazenamento.carregar()]
+
+    def atualizar_senhas(self, trocas):
+        """Troca senha cifrada e impressão de várias contas com uma única gravação
+
+        trocas são pares (conta, (senha cifrada, impressão)); a conta residente
+        é localizada pelo id, e as excluídas nesse meio tempo são ignoradas.
+        Retorna False, com as contas como estavam, se a gravação falhar.
+        """
+        def aplicar(indice):
+            for alvo, *valores in alteradas:
+                self._reuso.remover(alvo)
+                alvo['senha'], alvo['impressao'] = valores[indice]
+                self._reuso.inserir(alvo)
+
+        with self._trava_escrita:
+            with self._trava:
+                dados = self._contas()
+                alteradas = []
+                for conta, (senha, impressao) in trocas:
+                    alvo = self._por_id.get(conta['id'])
+                    if alvo is not None:
+                        alteradas.append((alvo, (alvo['senha'], alvo.get('impressao')), (senha, impressao)))
+                aplicar(1)
+            if not self._gravar(lambda: self.armazenamento.atualizar_varias(dados, [alvo for alvo, *_ in alteradas])):
+                with self._trava:
+                    aplicar(0)
+                return False
+            return True
+
+    def fechar(self):
+        """Descarta a chave e as contas da memória (depois da gravação em andamento, se houver)"""
+        with self._trava_escrita, self._trava:
+            if self.dados is not None and self.persistir_indice:
+                self._persistir_indice()
+            self.armazenamento.fechar()
+            self.fernet = None
+            self.chaves = []
+            self.protecao = None
+            self._impressor = None
+            self._reuso = IndiceReuso()
+            self.dados = None
+            self._sob_demanda = False
+            self._chaves = {}
+            self._por_id = {}
+            self._ordens = {}
+            self._busca = None
+            self.registrar_cache()
+            self.segredos.limpar()
+            logging.info("Cofre fechado")
+
+    def __len__(self):
+        with self._trava:
+            return len(self._contas())
+
+    def _recarregar(self):
+        """Relê as contas do armazenamento e reconstrói o índice"""
+        self.dados = self.armazenamento.carregar()
+        self._atribuir_ids()
+        if self.aberto:
+            self._atribuir_impressoes()
+        self._reuso = IndiceReuso(self.dados)
+        # O índice de chaves só é montado quando alguém procura ou altera uma conta (a listagem não precisa dele)
+        self._chaves = None
+        # A ordem por site fica pronta desde a abertura; as demais são montadas sob demanda
+        self._ordens = {'site': IndiceOrdenado('site', self.dados)}
+        # O índice de busca só é montado na primeira busca
+        self._busca = None
+
+    def _atribuir_ids(self):
+        """Dá um id às contas gravadas antes da existência de ids e monta o índice por id"""
+        vistos = set()
+        sem_id = []
+        for conta in self.dados:
+            # Ids repetidos (contas copiadas à mão no arquivo) também recebem um novo
+            if not conta.get('id') or conta['id'] in vistos:
+                sem_id.append(conta)
+            else:
+                vistos.add(conta['id'])
+        for conta in sem_id:
+            conta['id'] = gerar_id()
+        self._por_id = {conta['id']: conta for conta in self.dados}
+        if sem_id:
+            logging.info(f"Ids atribuídos a {len(sem_id)} contas")
+            self.armazenamento.salvar(self.dados)
+
+    def _atribuir_impressoes(self):
+        """Calcula a impressão das senhas sem impressão ou com impressão de outra chave (uma gravação)"""
+        pendentes = [conta for conta in self.dados if not self._impressor.atual(conta.get('impressao'))]
+        if not pendentes:
+            return
+        from cryptography.fernet import InvalidToken
+        inicio = time.perf_counter()
+        atualizadas = []
+        for conta in pendentes:
+            try:
+                conta['impressao'] = self._impressor.impressao(self.descriptografar(conta['senha']))
+                atualizadas.append(conta)
+            except InvalidToken:
+                logging.warning(f"Senha ilegível, sem impressão: {conta['site']} - {conta['usuario']}")
+        if atualizadas:
+            self.armazenamento.atualizar_varias(self.dados, atualizadas)
+            logging.info(f"Impressões de senha calculadas para {len(atualizadas)} contas em "
+                         f"{time.perf_counter() - inicio:.2f}s")
+
+    @property
+    def _indice(self):
+        """Índice de chaves normalizadas, montado no primeiro uso depois de (re)carregar as contas"""
+        with self._trava:
+            if self._chaves is None and self.dados is not None:
+                self._construir_indice()
+            return self._chaves
+
+    def _construir_indice(self):
+        """Monta o índice de chaves normalizadas, reaproveitando o persistido quando válido"""
+        chaves = None
+        self._assinatura_indice = None
+        if self.persistir_indice:
+            assinatura = self.armazenamento.assinatura()
+            chaves = carregar_indice(self.arquivo_indice, assinatura)
+            if chaves is not None and len(chaves) == len(self.dados):
+                self._assinatura_indice = assinatura
+        if self._assinatura_indice is None:
+            chaves = [normalizar_conta(conta['site'], conta['usuario']) for conta in self.dados]
+            logging.info(f"Índice de contas construído com {len(chaves)} chaves")
+        self._chaves = {}
+        for chave, conta in zip(chaves, self.dados):
+            # Em caso de duplicatas antigas, prevalece a primeira conta
+            self._chaves.setdefault(chave, conta)
+        if self.persistir_indice:
+            # Só grava se o índice teve de ser reconstruído
+            self._persistir_indice()
+
+    def _persistir_indice(self):
+        """Grava o índice alinhado à ordem atual das contas (o arquivo é escrito fora da trava)"""
+        with self._trava:
+            if self._chaves is None:
+                # Índice nunca montado: nada mudou por este cofre desde a leitura
+                return
+            assinatura = self.armazenamento.assinatura()
+            if not assinatura or assinatura == self._assinatura_indice:
+                return
+            chave_por_conta = {id(conta): chave for chave, conta in self._indice.items()}
+            chaves = [chave_por_conta.get(id(conta)) or normalizar_conta(conta['site'], conta['usuario'])
+                      for conta in self.dados]
+        if salvar_indice(self.arquivo_indice, assinatura, chaves):
+            with self._trava:
+                self._assinatura_indice = assinatura
+
+    def _contas(self):
+        """Retorna as contas em memória, relendo o arquivo apenas se ele mudou externamente"""
+        if self.dados is None:
+            if not self._sob_demanda:
+                raise CofreFechado("O cofre precisa ser aberto antes do uso")
+            logging.info("Primeira operação sobre todas as contas, carregando o cofre...")
+            self._recarregar()
+            return self.dados
+        # Durante uma gravação deste processo a assinatura muda sem ser alteração externa
+        if self._gravando or not self.armazenamento.alterado_externamente():
+            self.cache_acertos += 1
+            logging.debug("Cache de contas válido")
+        else:
+            self.cache_falhas += 1
+            logging.info("Arquivo de dados alterado externamente, recarregando...")
+            self._recarregar()
+            self.registrar_cache()
+        return self.dados
+
+    def registrar_cache(self):
+        """Registra no log os acertos e falhas do cache de contas"""
+        logging.info(f"Cache de contas: {self.cache_acertos} acertos, {self.cache_falhas} falhas")
+        self.segredos.registrar()
+
+    @property
+    def aberto(self):
+        return self.fernet is not None
+
+    def _direto(self):
+        """Indica se as consultas devem ir ao armazenamento (aberto sob demanda e contas não carregadas)"""
+        return self.dados is None and self._sob_demanda
+
+    def _exigir_aberto(self):
+        if not self.aberto:
+            raise CofreFechado("O cofre precisa ser aberto antes do uso")
+
+    # === Criptografia ===
+    def criptografar(self, texto):
+        # Referência local: fechar() pode zerar self.fernet em outra thread
+        fernet = self.fernet
+        if fernet is None:
+            raise CofreFechado("O cofre precisa ser aberto antes do uso")
+        logging.debug("Criptografando texto...")
+        return fernet.encrypt(texto.encode()).decode()
+
+    def descriptografar(self, cripto):
+        fernet = self.fernet
+        if fernet is None:
+            raise CofreFechado("O cofre precisa ser aberto antes do uso")
+        logging.debug("Descriptografando texto...")
+        return fernet.decrypt(cripto.encode()).decode()
+
+    def revelar_senha(self, conta):
+        """Senha da conta em texto puro, reaproveitando o cache das senhas reveladas há pouco
+
+        Para copiar ou exibir uma conta; leituras em massa (exportação) usam
+        descriptografar direto para não tirar do cache as senhas mais usadas.
+        """
+        self._exigir_aberto()
+        return self.segredos.obter(conta['senha'], self.descriptografar)
+
+    # === Contas ===
+    def salvar(self):
+        """Grava as contas atuais no arquivo de dados"""
+        self._exigir_aberto()
+        with self._trava_escrita:
+            with self._trava:
+                dados = self._contas()
+            if not self._gravar(lambda: self.armazenamento.salvar(dados)):
+                return False
+            if self.persistir_indice:
+                self._persistir_indice()
+            return True
+
+    def _gravar(self, gravacao):
+        """Roda gravacao() (a escrita no armazenamento) sem a trava das leituras; retorna o resultado
+
+        Chamado sob a trava de escrita, depois de alterar a memória sob a trava.
+        Enquanto grava, a interface continua lendo as contas (já alteradas).
+        """
+        self._gravando = True
+        try:
+            return gravacao()
+        finally:
+            self._gravando = False
+
+    def _indexar(self, pares):
+        """Põe contas (pares chave, conta) já presentes em self.dados em todos os índices"""
+        for chave, conta in pares:
+            if self._indice.get(chave) is None:
+                self._indice[chave] = conta
+            self._por_id[conta['id']] = conta
+            self._reuso.inserir(conta)
+        if len(pares) > LIMITE_ATUALIZACAO_ORDENADA:
+            self._remontar_ordens()
+        else:
+            for _, conta in pares:
+                for ordem in self._ordens.values():
+                    ordem.inserir(conta)
+                if self._busca is not None:
+                    self._busca.inserir(conta)
+
+    def _desindexar(self, pares):
+        """Tira contas (pares chave, conta) já retiradas de self.dados de todos os índices"""
+        for chave, conta in pares:
+            if self._indice.get(chave) is conta:
+                del self._indice[chave]
+            if self._por_id.get(conta['id']) is conta:
+                del self._por_id[conta['id']]
+            self._reuso.remover(conta)
+        if len(pares) > LIMITE_ATUALIZACAO_ORDENADA:
+            self._remontar_ordens()
+        else:
+            for _, conta in pares:
+                for ordem in self._ordens.values():
+                    ordem.remover(conta)
+                if self._busca is not None:
+                    self._busca.remover(conta)
+
+    def _remontar_ordens(self):
+        # Lote grande: remonta só a ordem por site; as demais colunas e a busca voltam sob demanda
+        self._ordens = {'site': IndiceOrdenado('site', self.dados)}
+        self._busca = None
+
+    def existe(self, site, usuario):
+        """Indica se já existe uma conta equivalente (site e usuário normalizados)"""
+        return self.obter(site, usuario) is not None
+
+    def obter(self, site, usuario):
+        """Retorna a conta equivalente ao site e usuário informados, ou None"""
+        with self._trava:
+            if self._direto():
+                return self.armazenamento.buscar(site, usuario)
+            self._contas()
+            return self._indice.get(normalizar_conta(site, usuario))
+
+    def adicionar(self, site, usuario, senha, apelido=''):
+        """Adiciona uma nova conta e grava o cofre; levanta ContaDuplicada se já existir"""
+        with self._trava_escrita:
+            if self._direto() and not self.armazenamento.regrava_tudo:
+                # Sem as contas em memória: a duplicata é procurada e a conta gravada só no disco
+                if self.armazenamento.buscar(site, usuario) is not None:
+                    raise ContaDuplicada(f"Já existe uma conta para {site} - {usuario}")
+                nova_conta = self._nova_conta(site, usuario, senha, apelido)
+                if not self.armazenamento.adicionar(None, nova_conta):
+                    raise ErroCofre("Não foi possível salvar a conta")
+                logging.info(f"Nova conta adicionada: {site} - {usuario}")
+                return nova_conta
+
+            chave = normalizar_conta(site, usuario)
+            with self._trava:
+                dados = self._contas()
+                if chave in self._indice:
+                    raise ContaDuplicada(f"Já existe uma conta para {site} - {usuario}")
+                nova_conta = self._nova_conta(site, usuario, senha, apelido)
+                dados.append(nova_conta)
+                self._indexar([(chave, nova_conta)])
+            if not self._gravar(lambda: self.armazenamento.adicionar(dados, nova_conta)):
+                with self._trava:
+                    # Relido do disco nesse meio tempo: a lista nova já não tem a conta
+                    if self.dados is dados:
+                        dados.remove(nova_conta)
+                        self._desindexar([(chave, nova_conta)])
+                raise ErroCofre("Não foi possível salvar a conta")
+            logging.info(f"Nova conta adicionada: {site} - {usuario}")
+            return nova_conta
+
+    def _nova_conta(self, site, usuario, senha, apelido):
+        return {
+            'id': gerar_id(),
+            'site': site,
+            'usuario': usuario,
+            'senha': self.criptografar(senha),
+            'impressao': self._impressor.impressao(senha),
+            'apelido': apelido,
+            'data_criacao': agora()
+        }
+
+    def importar(self, linhas, tamanho_lote=TAMANHO_LOTE_IMPORTACAO, trabalhadores=1, progresso=None):
+        """Importa contas em massa com uma única gravação; retorna um relatório
+
+        linhas é um iterável de dicionários com 'site', 'usuario', 'senha' (texto
+        puro) e opcionalmente 'apelido' e 'data_criacao'. As duplicatas (contra o
+        cofre e dentro da própria importação) são descartadas em uma passada pelo
+        índice; as senhas são criptografadas em lotes, em paralelo quando
+        trabalhadores > 1. progresso(relatorio) é chamado a cada lote.
+
+        A trava só é segurada para reservar as chaves de cada lote e para a
+        gravação final, então a interface continua lendo o cofre enquanto as
+        senhas são criptografadas.
+        """
+        self._exigir_aberto()
+        with self._trava:
+            self._contas()
+        inicio = time.perf_counter()
+        relatorio = {'lidas': 0, 'importadas': 0, 'duplicadas': 0, 'invalidas': 0,
+                     'segundos': 0.0, 'linhas_por_segundo': 0.0}
+        novas = []
+        chaves_novas = []
+        lote = []
+        executor = None
+        if trabalhadores > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=trabalhadores)
+
+        def reservar_lote():
+            """Descarta as duplicatas do lote e reserva as chaves das demais contas"""
+            aceitas = []
+            with self._trava:
+                for linha in lote:
+                    chave = normalizar_conta(linha['site'], linha['usuario'])
+                    if chave in self._indice:
+                        relatorio['duplicadas'] += 1
+                        continue
+                    # A reserva também descarta as duplicatas dentro do próprio arquivo
+                    self._indice[chave] = None
+                    chaves_novas.append(chave)
+                    aceitas.append(linha)
+            return aceitas
+
+        def processar_lote():
+            aceitas = reservar_lote()
+            senhas = [linha['senha'] for linha in aceitas]
+            cifradas = executor.map(self.criptografar, senhas) if executor else map(self.criptografar, senhas)
+            criacao = agora()
+            for linha, senha in zip(aceitas, cifradas):
+                novas.append({
+                    'id': gerar_id(),
+                    'site': linha['site'],
+                    'usuario': linha['usuario'],
+                    'senha': senha,
+                    'impressao': self._impressor.impressao(linha['senha']),
+                    'apelido': linha.get('apelido') or '',
+                    'data_criacao': linha.get('data_criacao') or criacao
+                })
+            lote.clear()
+            relatorio['segundos'] = time.perf_counter() - inicio
+            relatorio['linhas_por_segundo'] = relatorio['lidas'] / relatorio['segundos'] if relatorio['segundos'] else 0.0
+            if progresso:
+                progresso(dict(relatorio, importadas=len(novas)))
+
+        try:
+            for linha in linhas:
+                relatorio['lidas'] += 1
+                site = (linha.get('site') or '').strip()
+                usuario = (linha.get('usuario') or '').strip()
+                senha = linha.get('senha') or ''
+                if not site or not usuario or not senha:
+                    relatorio['invalidas'] += 1
+                    continue
+                lote.append(dict(linha, site=site, usuario=usuario))
+                if len(lote) >= tamanho_lote:
+                    processar_lote()
+            if lote:
+                processar_lote()
+        except Exception:
+            with self._trava:
+                self._liberar_reservas(chaves_novas)
+            raise
+        finally:
+            if executor:
+                executor.shutdown()
+
+        with self._trava_escrita:
+            with self._trava:
+                # O arquivo pode ter sido relido durante a criptografia (e as reservas perdidas)
+                dados = self._contas()
+                aceitas = []
+                for chave, conta in zip(chaves_novas, novas):
+                    if self._indice.get(chave) is not None:
+                        relatorio['duplicadas'] += 1
+                        continue
+                    aceitas.append((chave, conta))
+                novas = [conta for _, conta in aceitas]
+                dados.extend(novas)
+                self._indexar(aceitas)
+            if novas and not self._gravar(lambda: self.armazenamento.adicionar_varias(dados, novas)):
+                with self._trava:
+                    if self.dados is dados:
+                        del dados[-len(novas):]
+                        self._desindexar(aceitas)
+                raise ErroCofre("Não foi possível salvar as contas importadas")
+            total = len(dados)
+
+        relatorio['importadas'] = len(novas)
+        relatorio['segundos'] = time.perf_counter() - inicio
+        relatorio['linhas_por_segundo'] = relatorio['lidas'] / relatorio['segundos'] if relatorio['segundos'] else 0.0
+        logging.info(f"Importação: {relatorio['importadas']} importadas, {relatorio['duplicadas']} duplicadas, "
+                     f"{relatorio['invalidas']} inválidas em {relatorio['segundos']:.2f}s "
+                     f"({relatorio['linhas_por_segundo']:.0f} linhas/s)",
+                     extra={'operacao': 'importar', 'duracao_ms': round(relatorio['segundos'] * 1000, 1),
+                            'contas': total})
+        return relatorio
+
+    def _liberar_reservas(self, chaves):
+        """Desfaz as chaves reservadas por uma importação que não chegou a gravar"""
+        for chave in chaves:
+            if chave in self._indice and self._indice[chave] is None:
+                del self._indice[chave]
+
+    def ordenadas(self, coluna='site'):
+        """Índice ordenado pela coluna, mantido entre chamadas (ver ordenacao.IndiceOrdenado)"""
+        self.preparar_ordem(coluna)
+        with self._trava:
+            self._contas()
+            ordem = self._ordens.get(coluna)
+            if ordem is None:
+                # Descartado por uma releitura do arquivo depois de montado
+                ordem = self._ordens[coluna] = IndiceOrdenado(coluna, self.dados)
+            return ordem
+
+    def preparar_ordem(self, coluna):
+        """Monta a ordenação pela coluna sem segurar a trava (ver _montar_fora_da_trava)"""
+        def instalar(ordem):
+            self._ordens[coluna] = ordem
+        self._montar_fora_da_trava(lambda: self._ordens.get(coluna), lambda dados: IndiceOrdenado(coluna, dados),
+                                   instalar)
+
+    def pagina(self, quantidade=TAMANHO_PAGINA, depois_de=None):
+        """Uma página de contas em ordem de site; retorna (contas, cursor da próxima página ou None)
+
+        Aberto sob demanda sobre um armazenamento paginado, a página vem direto
+        do disco e o cofre não é carregado; senão sai da ordenação por site.
+        """
+        with self._trava:
+            if self._direto() and self.armazenamento.paginado:
+                return self.armazenamento.listar_pagina(quantidade, depois_de)
+            inicio = depois_de or 0
+            ordem = self.ordenadas('site')
+            fim = inicio + quantidade
+            return ordem.fatia(inicio, fim), (fim if fim < len(ordem) else None)
+
+    def fatia(self, coluna, inicio, fim, decrescente=False):
+        """Contas nas posições [inicio, fim) da ordenação pela coluna (ver ordenacao.IndiceOrdenado)"""
+        with self._trava:
+            return self.ordenadas(coluna).fatia(inicio, fim, decrescente)
+
+    @property
+    def busca_pronta(self):
+        """Indica se o índice de busca já está montado (a primeira busca não vai esperar por ele)"""
+        return self._busca is not None
+
+    def preparar_busca(self):
+        """Monta o índice de busca sem segurar a trava; para rodar fora da thread da interface"""
+        def instalar(busca):
+            self._busca = busca
+        # busca só é importado na primeira busca (a linha de comando não paga por ele nos outros comandos)
+        from busca import IndiceBusca
+        total, segundos = self._montar_fora_da_trava(lambda: self._busca, IndiceBusca, instalar)
+        if segundos is not None:
+            logging.info(f"Índice de busca montado para {total} contas em {segundos:.2f}s",
+                         extra={'operacao': 'indice_busca', 'duracao_ms': round(segundos * 1000, 1), 'contas': total})
+
+    def _montar_fora_da_trava(self, atual, criar, instalar):
+        """Monta um índice com criar(contas) sobre uma cópia das contas, fora da trava
+
+        Já sob a trava, o índice recebe as contas adicionadas e perde as
+        excluídas nesse intervalo, e então é instalado com instalar(indice).
+        Retorna (contas, segundos), com segundos None se nada foi montado.
+        """
+        with self._trava:
+            if atual() is not None:
+                return len(self.dados or ()), None
+            copia = list(self._contas())
+        inicio = time.perf_counter()
+        indice = criar(copia)
+        with self._trava:
+            if atual() is not None or self.dados is None:
+                return len(self.dados or ()), None
+            atuais = {id(conta) for conta in self.dados}
+            for conta in copia:
+                if id(conta) not in atuais:
+                    indice.remover(conta)
+            montadas = {id(conta) for conta in copia}
+            for conta in self.dados:
+                if id(conta) not in montadas:
+                    indice.inserir(conta)
+            instalar(indice)
+            return len(self.dados), time.perf_counter() - inicio
+
+    def buscar(self, texto, limite=None):
+        """Busca incremental por site, usuário e apelido; retorna (contas, total, se o total é exato)
+
+        Sem limite, vale o padrão de busca.LIMITE_RESULTADOS.
+        """
+        from busca import LIMITE_RESULTADOS
+        limite = LIMITE_RESULTADOS if limite is None else limite
+        while True:
+            self.preparar_busca()
+            with self._trava:
+                self._contas()
+                # Uma releitura do arquivo entre a montagem e a busca descarta o índice
+                if self._busca is not None:
+                    return self._busca.buscar(texto, limite)
+
+    def listar(self, ordenar=True):
+        """Retorna as contas, ordenadas por site quando solicitado"""
+        with self._trava:
+            if ordenar:
+                return self.ordenadas('site').contas()
+            return list(self._contas())
+
+    # === Reuso de senhas ===
+    def contas_com_senha(self, senha):
+        """Contas que já usam essa senha, pela impressão (sem descriptografar nada)"""
+        with self._trava:
+            self._exigir_aberto()
+            self._contas()
+            ids = self._reuso.ids(self._impressor.impressao(senha))
+            return [self._por_id[id_conta] for id_conta in ids if id_conta in self._por_id]
+
+    def relatorio_reuso(self):
+        """Grupos de contas que compartilham a mesma senha, do maior para o menor"""
+        with self._trava:
+            self._contas()
+            return [[self._por_id[id_conta] for id_conta in ids if id_conta in self._por_id]
+                    for ids in self._reuso.grupos()]
+
+    def obter_por_id(self, id_conta):
+        """Retorna a conta com o id informado, ou None"""
+        with self._trava:
+            self._contas()
+            return self._por_id.get(id_conta)
+
+    def _localizar(self, conta):
+        """Conta residente correspondente à informada (pelo id ou, sem id, pela chave normalizada)"""
+        if conta.get('id'):
+            return self._por_id.get(conta['id'])
+        return self._indice.get(normalizar_conta(conta['site'], conta['usuario']))
+
+    def excluir(self, conta):
+        """Remove a conta informada e grava o cofre"""
+        return self.excluir_varias([conta]) == 1
+
+    def excluir_varias(self, contas):
+        """Remove as contas informadas com uma única gravação; retorna a quantidade excluída"""
+        with self._trava_escrita:
+            if self._direto() and not self.armazenamento.regrava_tudo:
+                # Sem as contas em memória: exclui pelo id direto no disco
+                removidas = [conta for conta in contas if conta.get('id')]
+                if removidas and not self.armazenamento.excluir_varias(None, removidas):
+                    raise ErroCofre("Não foi possível excluir as contas")
+                self.segredos.descartar(conta['senha'] for conta in removidas)
+                logging.info(f"{len(removidas)} conta(s) excluída(s) direto no armazenamento")
+                return len(removidas)
+
+            with self._trava:
+                dados = self._contas()
+                removidas = {}
+                for conta in contas:
+                    alvo = self._localizar(conta)
+                    if alvo is not None:
+                        removidas[alvo['id']] = alvo
+                if not removidas:
+                    return 0
+                pares = [(normalizar_conta(removida['site'], removida['usuario']), removida)
+                         for removida in removidas.values()]
+                anteriores = dados[:]
+                dados[:] = [conta for conta in dados if conta['id'] not in removidas]
+                self._desindexar(pares)
+            if not self._gravar(lambda: self.armazenamento.excluir_varias(dados, list(removidas.values()))):
+                with self._trava:
+                    if self.dados is dados:
+                        dados[:] = anteriores
+                        self._indexar(pares)
+                raise ErroCofre("Não foi possível excluir as contas")
+
+            self.segredos.descartar(removida['senha'] for removida in removidas.values())
+            if len(removidas) == 1:
+                removida = next(iter(removidas.values()))
+                logging.info(f"Conta excluída: {removida['site']} - {removida['usuario']}")
+            else:
+                logging.info(f"{len(removidas)} contas excluídas", extra={'operacao': 'excluir', 'contas': len(dados)})
+            return len(removidas)
+
+    def exportar_txt(self, pasta_destino, trabalhadores=None, progresso=None):
+        """Exporta todas as contas para arquivos TXT individuais; retorna a quantidade exportada"""
+        # Importado só aqui: a linha de comando não paga por zipfile/csv ao listar
+        import exportacao
+        return exportacao.exportar_txt(self, pasta_destino, trabalhadores or exportacao.TRABALHADORES_EXPORTACAO,
+                                       progresso)
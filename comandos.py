@@ -0,0 +1,371 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from cofre import (Cofre, ErroCofre, SenhaMestreInvalida, chave_protegida,
+                   ARQUIVO_CONFIG, MODO_JSON)
+from chave_mestra import TEMPO_DESBLOQUEIO_PADRAO
+
+# === Linha de comando do cofre (python -m comandos) ===
+# Só o necessário para ler contas é importado no início; cryptography, exportação,
+# importação e gerador entram apenas nos comandos que os usam.
+
+# Senha mestre para scripts sem terminal (se ausente, é pedida com getpass)
+VARIAVEL_SENHA_MESTRE = "COFRE_SENHA_MESTRE"
+# Socket do agente (python agente.py); obter, listar e buscar passam por ele quando definido
+VARIAVEL_AGENTE = "COFRE_AGENTE_SOCK"
+COLUNAS_LISTAGEM = ('site', 'usuario', 'apelido', 'data_criacao')
+
+def ler_senha_mestre():
+    """Senha mestre da variável de ambiente ou do terminal; no primeiro uso é digitada duas vezes"""
+    senha = os.environ.get(VARIAVEL_SENHA_MESTRE)
+    if senha:
+        return senha
+    import getpass
+    if chave_protegida():
+        return getpass.getpass("Senha mestre: ")
+    senha = getpass.getpass("Crie uma senha mestre para proteger o cofre: ")
+    if not senha or senha != getpass.getpass("Confirme a senha mestre: "):
+        raise SenhaMestreInvalida("As senhas não conferem")
+    return senha
+
+def ler_configuracoes():
+    """config.json só para leitura
+
+    A linha de comando nunca altera configurações, então dispensa a
+    configuracao.Configuracao (timer de gravação, atexit) a cada execução.
+    """
+    try:
+        with open(ARQUIVO_CONFIG, "r", encoding='utf-8') as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao carregar configurações: {str(e)}")
+        return {}
+    return dados if isinstance(dados, dict) else {}
+
+def criar_cofre():
+    """Cofre (ainda fechado) com o modo de armazenamento, o tempo de desbloqueio e o índice do config.json"""
+    configuracoes = ler_configuracoes()
+    tempo_desbloqueio = configuracoes.get('tempo_desbloqueio_ms', TEMPO_DESBLOQUEIO_PADRAO * 1000) / 1000
+    return Cofre(modo_armazenamento=configuracoes.get('armazenamento', MODO_JSON),
+                 tempo_desbloqueio=tempo_desbloqueio,
+                 persistir_indice=bool(configuracoes.get('persistir_indice', False)))
+
+def abrir_cofre(desbloquear, sob_demanda=False):
+    """Cofre com as contas carregadas; desbloqueia a chave só quando o comando lê ou grava senhas
+
+    sob_demanda deixa as contas no disco nos modos com consulta direta (ver Cofre.abrir).
+    """
+    cofre = criar_cofre()
+    # No modo cifrado até a lista de sites está criptografada
+    if desbloquear or cofre.armazenamento.confidencial:
+        return cofre.abrir(ler_senha_mestre(), sob_demanda)
+    return cofre.carregar(sob_demanda)
+
+def conta_publica(conta):
+    """Campos da conta que podem ser exibidos (sem a senha cifrada nem a impressão)"""
+    return {campo: conta.get(campo, '') for campo in ('id',) + COLUNAS_LISTAGEM}
+
+def _pelo_agente(op, **campos):
+    """Resposta do agente de COFRE_AGENTE_SOCK, ou None se não houver agente desbloqueado"""
+    caminho = os.environ.get(VARIAVEL_AGENTE)
+    if not caminho:
+        return None
+    from agente import ClienteAgente, AgenteBloqueado
+    cliente = ClienteAgente(caminho)
+    try:
+        return cliente.pedir(op, **campos)
+    except (OSError, AgenteBloqueado) as e:
+        logging.info(f"Agente indisponível ({str(e)}); lendo o cofre direto")
+        return None
+    finally:
+        cliente.fechar()
+
+def _imprimir_contas(contas, como_json):
+    if como_json:
+        linhas = (json.dumps(conta_publica(conta), ensure_ascii=False) for conta in contas)
+    else:
+        linhas = ("\t".join((conta['site'], conta['usuario'], conta.get('apelido') or '')) for conta in contas)
+    sys.stdout.write("".join(linha + "\n" for linha in linhas))
+
+def _consulta_vazamentos():
+    from vazamentos import abrir_consulta, ARQUIVO_VAZAMENTOS, ARQUIVO_BLOOM
+    vazamentos = ler_configuracoes().get('vazamentos', {})
+    return abrir_consulta(vazamentos.get('arquivo', ARQUIVO_VAZAMENTOS), vazamentos.get('bloom', ARQUIVO_BLOOM))
+
+# === Comandos ===
+def comando_adicionar(argumentos):
+    consulta = _consulta_vazamentos()
+    try:
+        if argumentos.gerar:
+            from gerador import GeradorSenhas, ESPECIAIS_PADRAO
+            recusar = consulta.contem if consulta is not None else None
+            senha = GeradorSenhas(argumentos.gerar, caracteres_especiais=ESPECIAIS_PADRAO, recusar=recusar).gerar()
+        elif argumentos.senha_stdin:
+            senha = sys.stdin.readline().rstrip("\r\n")
+        else:
+            import getpass
+            senha = getpass.getpass("Senha da conta: ")
+        if not senha:
+            raise ErroCofre("Senha vazia")
+        if consulta is not None and consulta.contem(senha):
+            raise ErroCofre("Esta senha aparece em vazamentos de dados conhecidos")
+    finally:
+        if consulta is not None:
+            consulta.fechar()
+
+    cofre = abrir_cofre(desbloquear=True)
+    try:
+        reusadas = cofre.contas_com_senha(senha)
+        if reusadas:
+            print(f"aviso: esta senha já é usada em {len(reusadas)} conta(s)", file=sys.stderr)
+        cofre.adicionar(argumentos.site, argumentos.usuario, senha, argumentos.apelido)
+    finally:
+        cofre.fechar()
+    # A senha gerada só existe aqui; o script que chamou precisa recebê-la
+    if argumentos.gerar:
+        print(senha)
+    return 0
+
+def comando_obter(argumentos):
+    resposta = _pelo_agente('obter', site=argumentos.site, usuario=argumentos.usuario)
+    if resposta is not None:
+        senha, conta = resposta['senha'], resposta['conta']
+    else:
+        cofre = abrir_cofre(desbloquear=True, sob_demanda=True)
+        try:
+            conta = cofre.obter(argumentos.site, argumentos.usuario)
+            if conta is None:
+                raise ErroCofre(f"Conta não encontrada: {argumentos.site} - {argumentos.usuario}")
+            senha = cofre.descriptografar(conta['senha'])
+        finally:
+            cofre.fechar()
+    if argumentos.json:
+        print(json.dumps(dict(conta_publica(conta), senha=senha), ensure_ascii=False))
+    else:
+        print(senha)
+    return 0
+
+def comando_listar(argumentos):
+    resposta = _pelo_agente('listar', ordenar=argumentos.ordenar, decrescente=argumentos.decrescente)
+    if resposta is not None:
+        _imprimir_contas(resposta['contas'], argumentos.json)
+        return 0
+    cofre = abrir_cofre(desbloquear=False, sob_demanda=True)
+    try:
+        if argumentos.ordenar != 'site' or argumentos.decrescente:
+            _imprimir_contas(cofre.ordenadas(argumentos.ordenar).contas(argumentos.decrescente), argumentos.json)
+            return 0
+        # Por site, página a página: no SQLite a listagem não carrega o cofre inteiro
+        contas, cursor = cofre.pagina()
+        _imprimir_contas(contas, argumentos.json)
+        while cursor is not None:
+            contas, cursor = cofre.pagina(depois_de=cursor)
+            _imprimir_contas(contas, argumentos.json)
+    finally:
+        cofre.fechar()
+    return 0
+
+def comando_buscar(argumentos):
+    resposta = _pelo_agente('buscar', texto=argumentos.texto, limite=argumentos.limite)
+    if resposta is not None:
+        contas, total, exato = resposta['contas'], resposta['total'], resposta['exato']
+    else:
+        cofre = abrir_cofre(desbloquear=False)
+        try:
+            contas, total, exato = cofre.buscar(argumentos.texto, argumentos.limite)
+        finally:
+            cofre.fechar()
+    _imprimir_contas(contas, argumentos.json)
+    if len(contas) < total:
+        print(f"{len(contas)} de {'' if exato else '~'}{total} resultados", file=sys.stderr)
+    return 0 if contas else 1
+
+def comando_excluir(argumentos):
+    cofre = abrir_cofre(desbloquear=False, sob_demanda=True)
+    try:
+        conta = cofre.obter(argumentos.site, argumentos.usuario)
+        if conta is None:
+            raise ErroCofre(f"Conta não encontrada: {argumentos.site} - {argumentos.usuario}")
+        cofre.excluir(conta)
+    finally:
+        cofre.fechar()
+    return 0
+
+def comando_importar(argumentos):
+    from importacao import importar_arquivo
+    cofre = abrir_cofre(desbloquear=True)
+    try:
+        relatorio = importar_arquivo(cofre, argumentos.arquivo, trabalhadores=argumentos.trabalhadores)
+    finally:
+        cofre.fechar()
+    print(f"{relatorio['importadas']} importadas, {relatorio['duplicadas']} duplicadas, "
+          f"{relatorio['invalidas']} inválidas ({relatorio['linhas_por_segundo']:.0f} linhas/s)")
+    return 0
+
+def comando_exportar(argumentos):
+    cofre = abrir_cofre(desbloquear=True)
+    try:
+        # Uma pasta recebe um TXT por conta; um arquivo .csv/.jsonl/.zip recebe todas
+        if os.path.isdir(argumentos.destino):
+            quantidade = cofre.exportar_txt(argumentos.destino)
+        else:
+            from exportacao import exportar_arquivo
+            quantidade = exportar_arquivo(cofre, argumentos.destino)
+    finally:
+        cofre.fechar()
+    print(f"{quantidade} contas exportadas para {argumentos.destino}")
+    return 0
+
+def comando_gerar(argumentos):
+    from gerador import GeradorSenhas, ESPECIAIS_PADRAO
+    especiais = ESPECIAIS_PADRAO if argumentos.especiais is None else argumentos.especiais
+    consulta = _consulta_vazamentos()
+    try:
+        gerador = GeradorSenhas(argumentos.comprimento, not argumentos.sem_maiusculas, not argumentos.sem_numeros,
+                                especiais, argumentos.minimo,
+                                recusar=consulta.contem if consulta is not None else None)
+        print('\n'.join(gerador.gerar_lote(argumentos.quantidade)))
+    finally:
+        if consulta is not None:
+            consulta.fechar()
+    return 0
+
+# === Tempo de partida ===
+def medir_partida(argumentos=("listar",), vezes=20):
+    """Roda python -m comandos <argumentos> em processos novos; retorna um relatório com a mediana em ms"""
+    import statistics
+    import subprocess
+    import time
+    tempos = []
+    for _ in range(vezes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "comandos", *argumentos],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    relatorio = {'comando': " ".join(argumentos), 'vezes': vezes,
+                 'mediana_ms': statistics.median(tempos), 'minimo_ms': min(tempos)}
+    logging.info(f"Partida de '{relatorio['comando']}': mediana {relatorio['mediana_ms']:.1f}ms, "
+                 f"mínimo {relatorio['minimo_ms']:.1f}ms em {vezes} execuções")
+    return relatorio
+
+# === Argumentos ===
+def _argumentos_adicionar(sub):
+    sub.add_argument("site")
+    sub.add_argument("usuario")
+    sub.add_argument("--apelido", default="")
+    origem = sub.add_mutually_exclusive_group()
+    origem.add_argument("--senha-stdin", action="store_true", help="lê a senha da primeira linha do stdin")
+    origem.add_argument("--gerar", type=int, metavar="COMPRIMENTO", help="gera a senha e a imprime")
+
+def _argumentos_obter(sub):
+    sub.add_argument("site")
+    sub.add_argument("usuario")
+    sub.add_argument("--json", action="store_true", help="imprime a conta inteira em JSON")
+
+def _argumentos_listar(sub):
+    sub.add_argument("--ordenar", choices=COLUNAS_LISTAGEM, default='site')
+    sub.add_argument("--decrescente", action="store_true")
+    sub.add_argument("--json", action="store_true", help="uma conta JSON por linha")
+
+def _argumentos_buscar(sub):
+    sub.add_argument("texto")
+    sub.add_argument("--limite", type=int, default=50)
+    sub.add_argument("--json", action="store_true", help="uma conta JSON por linha")
+
+def _argumentos_excluir(sub):
+    sub.add_argument("site")
+    sub.add_argument("usuario")
+
+def _argumentos_importar(sub):
+    sub.add_argument("arquivo")
+    sub.add_argument("--trabalhadores", type=int, default=4)
+
+def _argumentos_exportar(sub):
+    sub.add_argument("destino", help="pasta (um TXT por conta) ou arquivo .csv, .jsonl ou .zip")
+
+def _argumentos_gerar(sub):
+    sub.add_argument("-n", "--quantidade", type=int, default=1)
+    sub.add_argument("-c", "--comprimento", type=int, default=16)
+    sub.add_argument("--sem-maiusculas", action="store_true")
+    sub.add_argument("--sem-numeros", action="store_true")
+    sub.add_argument("--especiais", help="caracteres especiais ('' para nenhum; padrão: os do gerador)")
+    sub.add_argument("--minimo", type=int, default=1, help="mínimo de caracteres de cada classe")
+
+# nome, apelido em inglês, ajuda, argumentos e função de cada subcomando
+COMANDOS = (
+    ("adicionar", "add", "adiciona uma conta", _argumentos_adicionar, comando_adicionar),
+    ("obter", "get", "imprime a senha de uma conta", _argumentos_obter, comando_obter),
+    ("listar", "list", "lista as contas (sem senhas)", _argumentos_listar, comando_listar),
+    ("buscar", "search", "busca por site, usuário ou apelido", _argumentos_buscar, comando_buscar),
+    ("excluir", "delete", "exclui uma conta", _argumentos_excluir, comando_excluir),
+    ("importar", "import", "importa contas de CSV, JSON, JSONL ou ZIP", _argumentos_importar, comando_importar),
+    ("exportar", "export", "exporta as contas (senhas em texto puro) para uma pasta ou arquivo",
+     _argumentos_exportar, comando_exportar),
+    ("gerar", "generate", "gera senhas sem tocar no cofre", _argumentos_gerar, comando_gerar),
+)
+
+def _comando_pedido(argv):
+    """Primeiro argumento posicional (o subcomando), pulando as opções globais"""
+    argumentos = iter(argv)
+    for argumento in argumentos:
+        if argumento in ("-C", "--pasta"):
+            next(argumentos, None)
+        elif not argumento.startswith("-"):
+            return argumento
+    return None
+
+class FormatadorAjuda(argparse.HelpFormatter):
+    """HelpFormatter que lê a largura do terminal com os.get_terminal_size
+
+    O argparse cria um formatador a cada add_argument, e o padrão importa
+    shutil (que traz bz2 e lzma) só para saber a largura: 3 a 4 ms por execução.
+    """
+    def __init__(self, prog, **opcoes):
+        if opcoes.get('width') is None:
+            # Mesma regra de shutil.get_terminal_size: COLUMNS, o terminal ou 80
+            try:
+                colunas = int(os.environ.get('COLUMNS', 0)) or os.get_terminal_size(sys.__stdout__.fileno()).columns
+            except (AttributeError, ValueError, OSError):
+                colunas = 80
+            opcoes['width'] = colunas - 2
+        super().__init__(prog, **opcoes)
+
+def criar_parser(comando=None):
+    """Parser da linha de comando; com comando, só aquele subcomando é montado
+
+    Montar os oito subparsers custa cerca de 10 ms a cada execução, mais que
+    carregar um cofre pequeno; a ajuda geral (sem subcomando) monta todos.
+    """
+    parser = argparse.ArgumentParser(prog="python -m comandos", formatter_class=FormatadorAjuda,
+                                     description="Acesso ao cofre de senhas pela linha de comando")
+    parser.add_argument("-C", "--pasta", help="pasta do cofre (padrão: a atual)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostra os logs no stderr")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    conhecido = any(comando in (nome, apelido) for nome, apelido, *_ in COMANDOS)
+    for nome, apelido, ajuda, argumentos, funcao in COMANDOS:
+        if not conhecido or comando in (nome, apelido):
+            sub = subparsers.add_parser(nome, aliases=[apelido], help=ajuda, formatter_class=FormatadorAjuda)
+            argumentos(sub)
+            sub.set_defaults(funcao=funcao)
+    return parser
+
+def main(argv=None):
+    """Executa um comando; retorna o código de saída (0 sucesso, 1 erro)"""
+    argv = sys.argv[1:] if argv is None else argv
+    argumentos = criar_parser(_comando_pedido(argv)).parse_args(argv)
+    if argumentos.verbose:
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s - %(levelname)s - %(message)s")
+    if argumentos.pasta:
+        os.chdir(argumentos.pasta)
+    try:
+        return argumentos.funcao(argumentos)
+    except (ErroCofre, ValueError, OSError) as e:
+        print(f"erro: {str(e)}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
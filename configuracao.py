@@ -0,0 +1,134 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from armazenamento import gravar_atomico
+
+# === Configurações em memória com gravação adiada ===
+ARQUIVO_CONFIG = "config.json"
+# Silêncio (segundos) depois da última alteração antes de gravar o arquivo
+ATRASO_GRAVACAO_CONFIG = 1.0
+
+class Configuracao:
+    """config.json lido uma vez e mantido em memória, gravado em segundo plano
+
+    As alterações valem na hora para quem lê; o arquivo só é regravado
+    depois de ATRASO_GRAVACAO_CONFIG sem novas alterações (ou ao sair do
+    programa), por uma thread de timer e de forma atômica. Na gravação o
+    arquivo é relido e só as seções alteradas aqui são substituídas, então
+    edições externas em outras seções são preservadas.
+    """
+    def __init__(self, arquivo=ARQUIVO_CONFIG, atraso=ATRASO_GRAVACAO_CONFIG):
+        self.arquivo = arquivo
+        self.atraso = atraso
+        self._dados = None
+        self._alteradas = set()
+        self._timer = None
+        self._prazo = 0.0
+        self._trava = threading.RLock()
+        self.gravacoes = 0
+        atexit.register(self.descarregar)
+
+    def _ler_arquivo(self):
+        if not os.path.exists(self.arquivo):
+            return None
+        with open(self.arquivo, "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def _carregados(self):
+        if self._dados is None:
+            try:
+                self._dados = self._ler_arquivo()
+                if self._dados is None:
+                    logging.info("Arquivo de configurações não encontrado, criando novo")
+                else:
+                    logging.info("Configurações carregadas com sucesso")
+            except Exception as e:
+                logging.error(f"Erro ao carregar configurações: {str(e)}")
+            if not isinstance(self._dados, dict):
+                self._dados = {}
+        return self._dados
+
+    def obter(self):
+        """Cópia de todas as configurações"""
+        with self._trava:
+            return copy.deepcopy(self._carregados())
+
+    def secao(self, nome, padrao=None):
+        """Cópia de uma seção das configurações"""
+        with self._trava:
+            return copy.deepcopy(self._carregados().get(nome, padrao))
+
+    def definir(self, nome, valor):
+        """Troca uma seção e agenda a gravação; não grava se nada mudou"""
+        with self._trava:
+            dados = self._carregados()
+            if nome in dados and dados[nome] == valor:
+                return
+            dados[nome] = copy.deepcopy(valor)
+            self._alteradas.add(nome)
+            self._agendar()
+
+    def salvar(self, config):
+        """Substitui todas as configurações, agendando a gravação das seções que mudaram"""
+        with self._trava:
+            dados = self._carregados()
+            for nome in set(dados) - set(config):
+                del dados[nome]
+                self._alteradas.add(nome)
+            for nome, valor in config.items():
+                self.definir(nome, valor)
+            if self._alteradas:
+                self._agendar()
+
+    def _agendar(self):
+        # Um timer pendente só tem o prazo adiado, sem criar outra thread a cada alteração
+        self._prazo = time.monotonic() + self.atraso
+        if self._timer is None:
+            self._armar(self.atraso)
+
+    def _armar(self, espera):
+        self._timer = threading.Timer(espera, self._ao_vencer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _ao_vencer(self):
+        with self._trava:
+            restante = self._prazo - time.monotonic()
+            if restante > 0:
+                self._armar(restante)
+                return
+            self._timer = None
+        self.descarregar()
+
+    def descarregar(self):
+        """Grava já as alterações pendentes; retorna False se a gravação falhar"""
+        with self._trava:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._alteradas:
+                return True
+            try:
+                try:
+                    atual = self._ler_arquivo()
+                except ValueError:
+                    atual = None
+                if not isinstance(atual, dict):
+                    atual = {}
+                for nome in self._alteradas:
+                    if nome in self._dados:
+                        atual[nome] = self._dados[nome]
+                    else:
+                        atual.pop(nome, None)
+                gravar_atomico(self.arquivo, lambda f: json.dump(atual, f, indent=4, ensure_ascii=False))
+                self._alteradas.clear()
+                self.gravacoes += 1
+                logging.info("Configurações salvas com sucesso")
+                return True
+            except Exception as e:
+                logging.error(f"Erro ao salvar configurações: {str(e)}")
+                return False
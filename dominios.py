@@ -0,0 +1,133 @@
+import json
+import os
+import logging
+from functools import lru_cache
+
+# === Mapeamento padrão de domínios equivalentes ===
+DOMINIOS_EQUIVALENTES = {
+    'gmail.com': 'gmail.com',
+    'googlemail.com': 'gmail.com',
+    'google.com': 'gmail.com',
+    'google.com.br': 'gmail.com',
+    'hotmail.com': 'outlook.com',
+    'live.com': 'outlook.com',
+    'live.com.br': 'outlook.com',
+    'msn.com': 'outlook.com'
+}
+
+CHAVE_CONFIG = 'dominios_equivalentes'
+TAMANHO_CACHE = 4096
+
+# Marca de fim de regra dentro da trie (rótulos nunca são None)
+_FIM = None
+
+def _limpar_dominio(dominio):
+    """Normaliza a escrita de uma regra: minúsculas, sem espaços e sem curinga inicial"""
+    dominio = dominio.lower().strip()
+    if dominio.startswith("*."):
+        dominio = dominio[2:]
+    return dominio.strip(".")
+
+def extrair_host(site):
+    """Extrai o host de um site digitado (remove esquema, caminho, credenciais e porta)"""
+    host = site.lower().strip()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    host = host.rsplit("@", 1)[-1]
+    host = host.split(":", 1)[0]
+    return host.strip(".")
+
+# === Matcher compilado por sufixo de rótulos ===
+class MapaDominios:
+    """Resolve domínios equivalentes por busca de sufixo em uma trie de rótulos
+
+    Cada regra 'live.com' vale para o próprio host e seus subdomínios
+    ('login.live.com'), mas não para hosts que apenas contêm o texto
+    ('notlive.com'). Vence o sufixo mais longo; resultados ficam em um LRU.
+    """
+    def __init__(self, regras=None, tamanho_cache=TAMANHO_CACHE):
+        self.regras = {}
+        self._trie = {}
+        self._assinatura = None
+        for dominio, equivalente in (regras if regras is not None else DOMINIOS_EQUIVALENTES).items():
+            self.adicionar_regra(dominio, equivalente)
+        self.normalizar = lru_cache(maxsize=tamanho_cache)(self._normalizar)
+
+    def adicionar_regra(self, dominio, equivalente):
+        dominio = _limpar_dominio(dominio)
+        equivalente = _limpar_dominio(equivalente)
+        if not dominio or not equivalente:
+            return
+        self.regras[dominio] = equivalente
+        no = self._trie
+        for rotulo in reversed(dominio.split(".")):
+            no = no.setdefault(rotulo, {})
+        no[_FIM] = equivalente
+        self._assinatura = None
+        # Regras novas invalidam resultados memorizados
+        if hasattr(self, 'normalizar'):
+            self.normalizar.cache_clear()
+
+    def equivalente(self, host):
+        """Retorna o domínio equivalente do host, ou None se nenhuma regra se aplica"""
+        no = self._trie
+        encontrado = None
+        for rotulo in reversed(host.split(".")):
+            no = no.get(rotulo)
+            if no is None:
+                break
+            if _FIM in no:
+                encontrado = no[_FIM]
+        return encontrado
+
+    def _normalizar(self, site):
+        site_lower = site.lower().strip()
+        equivalente = self.equivalente(extrair_host(site_lower))
+        # Se não tem equivalente, retorna o próprio site
+        return equivalente if equivalente is not None else site_lower
+
+    def assinatura(self):
+        """Impressão digital das regras, usada para invalidar índices persistidos"""
+        if self._assinatura is None:
+            import hashlib
+            conteudo = json.dumps(sorted(self.regras.items()), ensure_ascii=False)
+            self._assinatura = hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+        return self._assinatura
+
+# === Regras vindas do config.json ===
+def carregar_regras(arquivo_config):
+    """Mescla as regras padrão com as definidas em 'dominios_equivalentes' no config.json"""
+    regras = dict(DOMINIOS_EQUIVALENTES)
+    if arquivo_config and os.path.exists(arquivo_config):
+        try:
+            with open(arquivo_config, "r", encoding='utf-8') as f:
+                extras = json.load(f).get(CHAVE_CONFIG, {})
+            if isinstance(extras, dict):
+                regras.update(extras)
+                if extras:
+                    logging.info(f"Carregadas {len(extras)} regras de domínios do arquivo de configurações")
+            else:
+                logging.warning(f"'{CHAVE_CONFIG}' no arquivo de configurações deve ser um objeto")
+        except Exception as e:
+            logging.error(f"Erro ao carregar regras de domínios: {str(e)}")
+    return regras
+
+mapa_ativo = MapaDominios()
+
+def configurar_dominios(regras):
+    """Substitui o mapa de domínios usado pela normalização"""
+    global mapa_ativo
+    mapa_ativo = MapaDominios(regras)
+    logging.info(f"Mapa de domínios compilado com {len(mapa_ativo.regras)} regras")
+    return mapa_ativo
+
+def normalizar_dominio(site):
+    """Normaliza domínios equivalentes para o mesmo domínio principal"""
+    return mapa_ativo.normalizar(site)
+
+def normalizar_conta(site, usuario):
+    """Normaliza site e usuário para verificação de duplicatas considerando domínios equivalentes"""
+    site_normalizado = normalizar_dominio(site)
+    usuario_normalizado = usuario.lower().strip()
+    return f"{site_normalizado}||{usuario_normalizado}"
@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import logging
+import time
+import zipfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+TRABALHADORES_EXPORTACAO = 8
+# Contas exportadas entre duas chamadas de progresso
+PASSO_PROGRESSO = 500
+
+# === Nomes de arquivo ===
+def nome_seguro(texto, padrao):
+    """Mantém apenas caracteres seguros para nome de arquivo"""
+    seguro = "".join(c for c in texto if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return seguro or padrao
+
+class PlanejadorNomes:
+    """Escolhe nomes de arquivo únicos em memória
+
+    Colisões são resolvidas com um contador por prefixo, na mesma forma de
+    antes (site_usuario_1.txt, ...). A comparação ignora maiúsculas, como nos
+    sistemas de arquivos do Windows.
+    """
+    def __init__(self, usados=()):
+        self.usados = {nome.lower() for nome in usados}
+        self.proximo_contador = {}
+
+    def proximo(self, conta):
+        # Cria um nome de arquivo seguro a partir do site e usuário
+        base = f"{nome_seguro(conta['site'], 'site_desconhecido')}_{nome_seguro(conta['usuario'], 'usuario_desconhecido')}"
+
+        nome_arquivo = f"{base}.txt"
+        # Se o nome já estiver em uso, adiciona um número
+        if nome_arquivo.lower() in self.usados:
+            contador = self.proximo_contador.get(base.lower(), 1)
+            while f"{base}_{contador}.txt".lower() in self.usados:
+                contador += 1
+            nome_arquivo = f"{base}_{contador}.txt"
+            self.proximo_contador[base.lower()] = contador + 1
+
+        self.usados.add(nome_arquivo.lower())
+        return nome_arquivo
+
+def planejar_nomes(contas, pasta_destino):
+    """Define o nome de cada arquivo antes de gravar, lendo a pasta uma única vez"""
+    planejador = PlanejadorNomes(os.listdir(pasta_destino))
+    return [os.path.join(pasta_destino, planejador.proximo(conta)) for conta in contas]
+
+# === Conteúdo TXT ===
+def conteudo_txt(conta, senha_descriptografada, data_exportacao=None):
+    """Monta o conteúdo do arquivo TXT de uma conta exportada"""
+    data_exportacao = data_exportacao or datetime.now()
+    return f"""CONTA EXPORTADA - GERENCIADOR DE SENHAS
+Data da Exportação: {data_exportacao.strftime("%Y-%m-%d %H:%M:%S")}
+
+=== INFORMAÇÕES DA CONTA ===
+Site: {conta['site']}
+Usuário: {conta['usuario']}
+Senha: {senha_descriptografada}
+Apelido: {conta.get('apelido', 'Nenhum')}
+Data de Criação: {conta.get('data_criacao', 'Desconhecida')}
+
+=== INSTRUÇÕES ===
+• Este arquivo contém informações sensíveis
+• Mantenha em local seguro
+• Não compartilhe com ninguém
+• Exclua quando não for mais necessário
+
+=== SISTEMA ===
+Exportado por: Gerenciador de Senhas
+Versão: 2.0
+Data: {data_exportacao.strftime("%d/%m/%Y")}
+"""
+
+# === Exportação em arquivos TXT individuais ===
+def exportar_txt(cofre, pasta_destino, trabalhadores=TRABALHADORES_EXPORTACAO, progresso=None):
+    """Exporta todas as contas para arquivos TXT individuais; retorna a quantidade exportada
+
+    Os nomes são planejados antes; a descriptografia e a gravação de cada
+    arquivo rodam em um pool limitado de threads. progresso(feitas, total) é
+    chamado a cada PASSO_PROGRESSO contas; se ele levantar uma exceção (ex.:
+    cancelamento), os arquivos já gravados por esta exportação são apagados.
+    """
+    inicio = time.perf_counter()
+    contas = cofre.listar(ordenar=False)
+    caminhos = planejar_nomes(contas, pasta_destino)
+    data_exportacao = datetime.now()
+    criados = []
+
+    def exportar_conta(conta, caminho_arquivo):
+        senha_descriptografada = cofre.descriptografar(conta['senha'])
+        # 'x' nunca sobrescreve um arquivo criado depois do planejamento
+        with open(caminho_arquivo, 'x', encoding='utf-8') as f:
+            criados.append(caminho_arquivo)
+            f.write(conteudo_txt(conta, senha_descriptografada, data_exportacao))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, trabalhadores))
+    try:
+        for feitas, _ in enumerate(executor.map(exportar_conta, contas, caminhos), 1):
+            if progresso and feitas % PASSO_PROGRESSO == 0:
+                progresso(feitas, len(contas))
+    except Exception:
+        # Não deixa metade das senhas em texto puro para trás
+        executor.shutdown(cancel_futures=True)
+        _apagar(criados)
+        raise
+    finally:
+        executor.shutdown()
+
+    segundos = time.perf_counter() - inicio
+    contas_exportadas = len(contas)
+    taxa = contas_exportadas / segundos if segundos else 0.0
+    logging.info(f"Exportação TXT: {contas_exportadas} contas exportadas para {pasta_destino} "
+                 f"em {segundos:.2f}s ({taxa:.0f} contas/s)",
+                 extra={'operacao': 'exportar_txt', 'duracao_ms': round(segundos * 1000, 1), 'contas': contas_exportadas})
+    return contas_exportadas
+
+def _apagar(caminhos):
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+# === Exportação em arquivo único (streaming) ===
+CAMPOS_EXPORTACAO = ('site', 'usuario', 'senha', 'apelido', 'data_criacao')
+
+def _contas_descriptografadas(cofre, progresso=None):
+    """Gera (conta, senha) descriptografando cada conta só no momento de gravá-la"""
+    contas = cofre.listar(ordenar=False)
+    for feitas, conta in enumerate(contas):
+        if progresso and feitas % PASSO_PROGRESSO == 0:
+            progresso(feitas, len(contas))
+        yield conta, cofre.descriptografar(conta['senha'])
+
+def _registro(conta, senha):
+    return {
+        'site': conta['site'],
+        'usuario': conta['usuario'],
+        'senha': senha,
+        'apelido': conta.get('apelido', ''),
+        'data_criacao': conta.get('data_criacao', '')
+    }
+
+def _exportar_csv(cofre, caminho, progresso=None):
+    quantidade = 0
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=CAMPOS_EXPORTACAO)
+        escritor.writeheader()
+        for conta, senha in _contas_descriptografadas(cofre, progresso):
+            escritor.writerow(_registro(conta, senha))
+            quantidade += 1
+    return quantidade
+
+def _exportar_jsonl(cofre, caminho, progresso=None):
+    quantidade = 0
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for conta, senha in _contas_descriptografadas(cofre, progresso):
+            f.write(json.dumps(_registro(conta, senha), ensure_ascii=False) + "\n")
+            quantidade += 1
+    return quantidade
+
+def _exportar_zip(cofre, caminho, progresso=None):
+    """Um TXT por conta (mesmo conteúdo de exportar_txt) dentro de um único ZIP"""
+    quantidade = 0
+    data_exportacao = datetime.now()
+    planejador = PlanejadorNomes()
+    with zipfile.ZipFile(caminho, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for conta, senha in _contas_descriptografadas(cofre, progresso):
+            arquivo_zip.writestr(planejador.proximo(conta), conteudo_txt(conta, senha, data_exportacao))
+            quantidade += 1
+    return quantidade
+
+EXPORTADORES = {
+    '.csv': _exportar_csv,
+    '.jsonl': _exportar_jsonl,
+    '.zip': _exportar_zip,
+}
+
+def exportar_arquivo(cofre, caminho, progresso=None):
+    """Exporta todas as contas para um único arquivo CSV, JSONL ou ZIP; retorna a quantidade exportada
+
+    As contas são gravadas uma a uma, então a memória usada não cresce com o
+    tamanho do cofre. O formato é escolhido pela extensão do caminho.
+    progresso(feitas, total) é chamado a cada PASSO_PROGRESSO contas; se ele
+    levantar uma exceção, o arquivo incompleto é apagado.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao not in EXPORTADORES:
+        raise ValueError(f"Formato de exportação não suportado: {extensao}")
+    inicio = time.perf_counter()
+    try:
+        quantidade = EXPORTADORES[extensao](cofre, caminho, progresso)
+    except Exception:
+        _apagar([caminho])
+        raise
+    segundos = time.perf_counter() - inicio
+    taxa = quantidade / segundos if segundos else 0.0
+    logging.info(f"Exportação {extensao[1:].upper()}: {quantidade} contas exportadas para {caminho} "
+                 f"em {segundos:.2f}s ({taxa:.0f} contas/s)",
+                 extra={'operacao': f'exportar_{extensao[1:]}', 'duracao_ms': round(segundos * 1000, 1), 'contas': quantidade})
+    return quantidade
@@ -0,0 +1,173 @@
+import argparse
+import logging
+import os
+import secrets
+import string
+import time
+from armazenamento import gravar_atomico
+
+# === Gerador de senhas (CSPRNG) ===
+ESPECIAIS_PADRAO = "!@#$%&*()_+-=[]{}|;:,.<>?"
+# Bytes lidos de os.urandom de uma vez
+TAMANHO_BUFFER = 64 * 1024
+# Senhas sorteadas por inteiro antes de montar uma que cumpra a política à força
+TENTATIVAS_POLITICA = 64
+# Senhas recusadas seguidas (ex.: encontradas na base de vazamentos) antes de desistir
+TENTATIVAS_RECUSA = 100
+
+class PoliticaInvalida(ValueError):
+    """Comprimento ou classes de caracteres que não permitem gerar a senha"""
+
+class GeradorSenhas:
+    """Gera senhas com os.urandom em lotes, sem viés e com mínimo por classe
+
+    Os bytes aleatórios viram caracteres por rejeição: só bytes abaixo do
+    maior múltiplo do tamanho do alfabeto são aproveitados, então todos os
+    caracteres têm a mesma chance. A conversão é feita por bytes.translate
+    sobre o buffer inteiro, sem laço em Python por caractere. Uma senha que
+    não tem o mínimo de cada classe é descartada e sorteada de novo, o que
+    mantém a distribuição uniforme entre as senhas que cumprem a política.
+    """
+    def __init__(self, comprimento=16, maiusculas=True, numeros=True, caracteres_especiais="",
+                 minimo_por_classe=1, recusar=None):
+        classes = [string.ascii_lowercase]
+        if maiusculas:
+            classes.append(string.ascii_uppercase)
+        if numeros:
+            classes.append(string.digits)
+        # Especiais repetidos ou que já são letras/números não contam duas vezes
+        vistos = set(''.join(classes))
+        especiais = ''.join(dict.fromkeys(c for c in caracteres_especiais if c not in vistos and not c.isspace()))
+        if especiais:
+            classes.append(especiais)
+        if comprimento < minimo_por_classe * len(classes):
+            raise PoliticaInvalida(f"Comprimento {comprimento} não comporta {minimo_por_classe} caractere(s) "
+                                   f"de cada uma das {len(classes)} classes")
+        self.comprimento = comprimento
+        # recusar(senha) -> True descarta a senha sorteada (ex.: senha vazada)
+        self.recusar = recusar
+        self.minimo_por_classe = minimo_por_classe
+        self.classes = [frozenset(classe) for classe in classes]
+        self.alfabeto = ''.join(classes)
+        if len(self.alfabeto) > 256:
+            raise PoliticaInvalida("Alfabeto com mais de 256 caracteres")
+        self._tabelas = {}
+        self._buffer = ""
+        self._posicao = 0
+
+    def _tabela(self, alfabeto):
+        """Tabela byte -> caractere e bytes rejeitados para sortear em alfabeto"""
+        if alfabeto not in self._tabelas:
+            limite = 256 - 256 % len(alfabeto)
+            rejeitados = bytes(range(limite, 256))
+            if all(ord(c) < 256 for c in alfabeto):
+                tabela = bytes(ord(alfabeto[b % len(alfabeto)]) if b < limite else 0 for b in range(256))
+                self._tabelas[alfabeto] = (tabela, rejeitados, None)
+            else:
+                # Alfabetos fora do latin-1: o byte vira índice e o índice vira caractere
+                tabela = bytes(b % len(alfabeto) if b < limite else 0 for b in range(256))
+                self._tabelas[alfabeto] = (tabela, rejeitados, alfabeto)
+        return self._tabelas[alfabeto]
+
+    def _sortear(self, alfabeto, quantidade):
+        """quantidade caracteres uniformes de alfabeto"""
+        tabela, rejeitados, indices = self._tabela(alfabeto)
+        partes = []
+        obtidos = 0
+        while obtidos < quantidade:
+            bloco = os.urandom(max(TAMANHO_BUFFER, quantidade - obtidos)).translate(tabela, rejeitados)
+            partes.append(bloco.decode('latin-1') if indices is None else ''.join(indices[b] for b in bloco))
+            obtidos += len(bloco)
+        return ''.join(partes)[:quantidade]
+
+    def _caracteres(self, quantidade):
+        """Caracteres do alfabeto completo, guardando a sobra do buffer para as próximas senhas"""
+        if len(self._buffer) - self._posicao < quantidade:
+            self._buffer = self._buffer[self._posicao:] + self._sortear(self.alfabeto, max(quantidade, TAMANHO_BUFFER))
+            self._posicao = 0
+        inicio = self._posicao
+        self._posicao += quantidade
+        return self._buffer[inicio:self._posicao]
+
+    def _cumpre(self, senha):
+        if self.minimo_por_classe == 1:
+            return all(not classe.isdisjoint(senha) for classe in self.classes)
+        return all(sum(c in classe for c in senha) >= self.minimo_por_classe for classe in self.classes)
+
+    def _montar(self):
+        """Senha com o mínimo de cada classe colocado à força e embaralhado (políticas apertadas)"""
+        caracteres = []
+        for classe in self.classes:
+            caracteres += self._sortear(''.join(sorted(classe)), self.minimo_por_classe)
+        caracteres += self._caracteres(self.comprimento - len(caracteres))
+        # Fisher-Yates; caminho raro, então randbelow por posição basta
+        for i in range(len(caracteres) - 1, 0, -1):
+            j = secrets.randbelow(i + 1)
+            caracteres[i], caracteres[j] = caracteres[j], caracteres[i]
+        return ''.join(caracteres)
+
+    def _sortear_senha(self):
+        for _ in range(TENTATIVAS_POLITICA):
+            senha = self._caracteres(self.comprimento)
+            if self._cumpre(senha):
+                return senha
+        return self._montar()
+
+    def gerar(self):
+        """Uma senha que cumpre a política e não é recusada"""
+        for _ in range(TENTATIVAS_RECUSA):
+            senha = self._sortear_senha()
+            if self.recusar is None or not self.recusar(senha):
+                return senha
+        raise PoliticaInvalida(f"{TENTATIVAS_RECUSA} senhas sorteadas seguidas foram recusadas")
+
+    def gerar_lote(self, quantidade):
+        """Lista com quantidade senhas"""
+        return [self.gerar() for _ in range(quantidade)]
+
+    def gravar_lote(self, quantidade, caminho):
+        """Grava quantidade senhas, uma por linha, de forma atômica; retorna a quantidade"""
+        senhas = self.gerar_lote(quantidade)
+        gravar_atomico(caminho, lambda f: f.write('\n'.join(senhas) + '\n'))
+        logging.info(f"{quantidade} senhas geradas em {caminho}")
+        return quantidade
+
+def gerar_senha(comprimento=12, usar_maiusculas=True, usar_numeros=True, caracteres_especiais=""):
+    """Uma senha com ao menos um caractere de cada classe pedida"""
+    return GeradorSenhas(comprimento, usar_maiusculas, usar_numeros, caracteres_especiais).gerar()
+
+def medir_desempenho(quantidade=100000, comprimento=16, caracteres_especiais=ESPECIAIS_PADRAO):
+    """Gera quantidade senhas e retorna um relatório com senhas por segundo"""
+    gerador = GeradorSenhas(comprimento, caracteres_especiais=caracteres_especiais)
+    inicio = time.perf_counter()
+    gerador.gerar_lote(quantidade)
+    segundos = time.perf_counter() - inicio
+    relatorio = {'senhas': quantidade, 'comprimento': comprimento, 'segundos': segundos,
+                 'senhas_por_segundo': quantidade / segundos if segundos else 0.0}
+    logging.info(f"Gerador: {quantidade} senhas de {comprimento} caracteres em {segundos:.2f}s "
+                 f"({relatorio['senhas_por_segundo']:.0f} senhas/s)")
+    return relatorio
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera senhas em lote com os.urandom")
+    parser.add_argument("-n", "--quantidade", type=int, default=1)
+    parser.add_argument("-c", "--comprimento", type=int, default=16)
+    parser.add_argument("--sem-maiusculas", action="store_true")
+    parser.add_argument("--sem-numeros", action="store_true")
+    parser.add_argument("--especiais", default=ESPECIAIS_PADRAO, help="caracteres especiais ('' para nenhum)")
+    parser.add_argument("--minimo", type=int, default=1, help="mínimo de caracteres de cada classe")
+    parser.add_argument("--saida", help="arquivo de saída (padrão: stdout)")
+    parser.add_argument("--benchmark", action="store_true", help="mede senhas/s gerando --quantidade senhas")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if argumentos.benchmark:
+        relatorio = medir_desempenho(argumentos.quantidade, argumentos.comprimento, argumentos.especiais)
+        print(f"{relatorio['senhas_por_segundo']:.0f} senhas/s")
+    else:
+        gerador = GeradorSenhas(argumentos.comprimento, not argumentos.sem_maiusculas, not argumentos.sem_numeros,
+                                argumentos.especiais, argumentos.minimo)
+        if argumentos.saida:
+            gerador.gravar_lote(argumentos.quantidade, argumentos.saida)
+        else:
+            print('\n'.join(gerador.gerar_lote(argumentos.quantidade)))
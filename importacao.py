@@ -0,0 +1,118 @@
+import csv
+import json
+import os
+import logging
+import zipfile
+
+# === Nomes de colunas aceitos (exportações deste sistema e de navegadores) ===
+COLUNAS = {
+    'site': ('site', 'url', 'website', 'origin', 'login_uri', 'name'),
+    'usuario': ('usuario', 'usuário', 'username', 'user', 'login', 'email', 'login_username'),
+    'senha': ('senha', 'password', 'pass', 'login_password'),
+    'apelido': ('apelido', 'nickname', 'title'),
+    'data_criacao': ('data_criacao', 'created', 'date_created'),
+}
+
+def _mapear_colunas(cabecalho):
+    """Relaciona cada campo do cofre com a primeira coluna equivalente do arquivo"""
+    nomes = {nome.strip().lower(): nome for nome in cabecalho if nome}
+    mapa = {}
+    for campo, alternativas in COLUNAS.items():
+        for alternativa in alternativas:
+            if alternativa in nomes:
+                mapa[campo] = nomes[alternativa]
+                break
+    return mapa
+
+def _normalizar_linha(registro, mapa):
+    return {campo: registro.get(coluna) for campo, coluna in mapa.items()}
+
+# === Leitores em streaming ===
+def ler_csv(caminho):
+    """Gera as contas de um CSV linha a linha"""
+    with open(caminho, "r", encoding='utf-8-sig', newline='') as f:
+        leitor = csv.DictReader(f)
+        mapa = _mapear_colunas(leitor.fieldnames or [])
+        if 'site' not in mapa or 'senha' not in mapa:
+            raise ValueError("O CSV precisa ter colunas de site e senha")
+        for registro in leitor:
+            yield _normalizar_linha(registro, mapa)
+
+def ler_json(caminho):
+    """Gera as contas de um JSON com uma lista de objetos
+
+    O módulo json não lê listas de forma incremental, então o arquivo é
+    carregado de uma vez; as linhas seguem adiante uma a uma.
+    """
+    with open(caminho, "r", encoding='utf-8') as f:
+        registros = json.load(f)
+    if isinstance(registros, dict):
+        registros = registros.get('contas', registros.get('items', []))
+    mapa = None
+    for registro in registros:
+        if mapa is None:
+            mapa = _mapear_colunas(registro.keys())
+        yield _normalizar_linha(registro, mapa)
+
+def ler_jsonl(caminho):
+    """Gera as contas de um arquivo JSON Lines (um objeto por linha)"""
+    mapa = None
+    with open(caminho, "r", encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            if mapa is None:
+                mapa = _mapear_colunas(registro.keys())
+            yield _normalizar_linha(registro, mapa)
+
+# Rótulos do TXT gerado por exportacao.conteudo_txt
+ROTULOS_TXT = {
+    'Site': 'site',
+    'Usuário': 'usuario',
+    'Senha': 'senha',
+    'Apelido': 'apelido',
+    'Data de Criação': 'data_criacao',
+}
+
+def ler_txt_exportado(texto):
+    """Extrai a conta do bloco 'INFORMAÇÕES DA CONTA' de um TXT exportado"""
+    conta = {}
+    dentro = False
+    for linha in texto.splitlines():
+        if linha.startswith("=== "):
+            if dentro:
+                break
+            dentro = linha == "=== INFORMAÇÕES DA CONTA ==="
+            continue
+        if dentro and ": " in linha:
+            rotulo, valor = linha.split(": ", 1)
+            if rotulo in ROTULOS_TXT:
+                conta[ROTULOS_TXT[rotulo]] = valor
+    return conta
+
+def ler_zip(caminho):
+    """Gera as contas de um ZIP de TXTs exportados, abrindo um arquivo por vez"""
+    with zipfile.ZipFile(caminho) as arquivo_zip:
+        for nome in arquivo_zip.namelist():
+            if nome.lower().endswith(".txt"):
+                yield ler_txt_exportado(arquivo_zip.read(nome).decode('utf-8'))
+
+LEITORES = {
+    '.csv': ler_csv,
+    '.json': ler_json,
+    '.jsonl': ler_jsonl,
+    '.zip': ler_zip,
+}
+
+def ler_arquivo(caminho):
+    """Escolhe o leitor pela extensão do arquivo"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao not in LEITORES:
+        raise ValueError(f"Formato de importação não suportado: {extensao}")
+    return LEITORES[extensao](caminho)
+
+def importar_arquivo(cofre, caminho, trabalhadores=1, progresso=None):
+    """Importa um arquivo CSV/JSON/JSONL/ZIP para o cofre com uma única gravação"""
+    logging.info(f"Importando contas de {caminho}...")
+    return cofre.importar(ler_arquivo(caminho), trabalhadores=trabalhadores, progresso=progresso)
@@ -1,134 +1,97 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog, scrolledtext, simpledialog
-import json
-import os
+from tkinter import messagebox, filedialog, scrolledtext, simpledialog, ttk
+import tkinter.font as tkfont
 import base64
-from cryptography.fernet import Fernet
 from collections import defaultdict
 import logging
-from datetime import datetime
-import random
-import string
-import sys
+import time
+from cofre import (Cofre, ContaDuplicada, SenhaMestreInvalida, chave_protegida,
+                   ARQUIVO_CONFIG, MODO_JSON)
+from importacao import importar_arquivo
+from exportacao import exportar_arquivo
+from configuracao import Configuracao
+from tarefas import ExecutorTarefas
+from gerador import GeradorSenhas, PoliticaInvalida
+from vazamentos import abrir_consulta, ARQUIVO_VAZAMENTOS, ARQUIVO_BLOOM
+from registro import (ConsoleHandler, configurar_logging, LIMITE_LINHAS_CONSOLE, FORMATO_TEXTO,
+                      TAMANHO_MAXIMO_LOG_MB, SEGMENTOS_LOG, DIAS_LOG)
 
 # === Configuração do Log Avançada ===
-class ConsoleHandler(logging.Handler):
-    """Handler personalizado para enviar logs para o console do TKinter"""
-    def __init__(self, text_widget):
-        super().__init__()
-        self.text_widget = text_widget
-
-    def emit(self, record):
-        msg = self.format(record)
-        self.text_widget.configure(state='normal')
-        self.text_widget.insert(tk.END, msg + '\n')
-        self.text_widget.configure(state='disabled')
-        self.text_widget.see(tk.END)
+# Intervalo em que o console de logs drena as linhas pendentes
+INTERVALO_CONSOLE_MS = 100
 
 def configurar_logging_com_console():
     """Configura o sistema de logging com console integrado"""
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-    
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    
-    file_handler = logging.FileHandler(f'logs/password_manager_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-    file_handler.setFormatter(formatter)
-    
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[file_handler, console_handler]
-    )
+    global console_handler_global
+    console_handler_global = ConsoleHandler()
+    console_handler_global.setLevel(logging.INFO)
+    log = configuracao.secao('log', {})
+    configurar_logging(console_handler_global,
+                       formato=log.get('formato', FORMATO_TEXTO),
+                       tamanho_maximo_mb=log.get('tamanho_maximo_mb', TAMANHO_MAXIMO_LOG_MB),
+                       segmentos=log.get('segmentos', SEGMENTOS_LOG),
+                       dias=log.get('dias', DIAS_LOG))
     
     logging.info("=== SISTEMA DE GERENCIAMENTO DE SENHAS INICIADO ===")
 
-configurar_logging_com_console()
-
-# === Criptografia ===
-ARQUIVO_CHAVE = "chave.key"
-ARQUIVO_DADOS = "contas.json"
-ARQUIVO_CONFIG = "config.json"
-SENHA_MESTRE = "admin"
-
-if not os.path.exists(ARQUIVO_CHAVE):
-    logging.info("Gerando nova chave de criptografia...")
-    chave = Fernet.generate_key()
-    with open(ARQUIVO_CHAVE, "wb") as f:
-        f.write(chave)
-    logging.info("Chave de criptografia gerada e salva com sucesso")
-else:
-    with open(ARQUIVO_CHAVE, "rb") as f:
-        chave = f.read()
-    logging.info("Chave de criptografia carregada com sucesso")
+# === Senha mestre ===
+# Tempo de desbloqueio buscado na calibração do KDF (config.json: "tempo_desbloqueio_ms")
+TEMPO_DESBLOQUEIO_MS = 300
 
-fernet = Fernet(chave)
+def pedir_senha_mestre():
+    """Pede a senha mestre; no primeiro uso pede para criar uma (digitada duas vezes)"""
+    if chave_protegida():
+        return simpledialog.askstring("Senha Mestre", "Digite a senha mestre:", show="*")
+    while True:
+        senha = simpledialog.askstring("Senha Mestre", "Crie uma senha mestre para proteger o cofre:", show="*")
+        if not senha:
+            return None
+        if senha == simpledialog.askstring("Senha Mestre", "Confirme a senha mestre:", show="*"):
+            return senha
+        messagebox.showwarning("Senha Mestre", "As senhas não conferem. Tente novamente.")
 
-# === Mapeamento de domínios equivalentes ===
-DOMINIOS_EQUIVALENTES = {
-    'gmail.com': 'gmail.com',
-    'googlemail.com': 'gmail.com',
-    'google.com': 'gmail.com',
-    'google.com.br': 'gmail.com',
-    'hotmail.com': 'outlook.com',
-    'live.com': 'outlook.com',
-    'live.com.br': 'outlook.com',
-    'msn.com': 'outlook.com'
-}
+# === Cofre (motor sem interface, criado na inicialização) ===
+cofre = None
+# Base offline de senhas vazadas (None se não houver; ver vazamentos.py)
+consulta_vazamentos = None
+# Intervalo da limpeza das senhas vencidas no cache de senhas reveladas
+INTERVALO_EXPIRACAO_SENHAS_MS = 30000
+# Executor das operações pesadas fora da thread do Tk (criado com a janela; ver tarefas.py)
+tarefas = None
 
 # === Variáveis globais para console ===
 janela_console_global = None
 console_handler_global = None
 
 # === Funções para salvar/recuperar configurações ===
+# config.json fica em memória; as alterações são gravadas em segundo plano após um breve silêncio
+configuracao = Configuracao(ARQUIVO_CONFIG)
+
 def carregar_config():
     """Carrega as configurações da janela"""
-    if os.path.exists(ARQUIVO_CONFIG):
-        try:
-            with open(ARQUIVO_CONFIG, "r", encoding='utf-8') as f:
-                config = json.load(f)
-                logging.info("Configurações carregadas com sucesso")
-                return config
-        except Exception as e:
-            logging.error(f"Erro ao carregar configurações: {str(e)}")
-    else:
-        logging.info("Arquivo de configurações não encontrado, criando novo")
-    return {}
+    return configuracao.obter()
 
 def salvar_config(config):
     """Salva as configurações da janela"""
-    try:
-        with open(ARQUIVO_CONFIG, "w", encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
-        logging.info("Configurações salvas com sucesso")
-    except Exception as e:
-        logging.error(f"Erro ao salvar configurações: {str(e)}")
+    configuracao.salvar(config)
 
 def salvar_posicao_console(janela):
     """Salva a posição e tamanho apenas do console"""
     try:
-        config = carregar_config()
-        config['console'] = {
+        configuracao.definir('console', {
             'x': janela.winfo_x(),
             'y': janela.winfo_y(),
             'width': janela.winfo_width(),
             'height': janela.winfo_height()
-        }
-        salvar_config(config)
+        })
     except Exception as e:
         logging.error(f"Erro ao salvar posição do console: {str(e)}")
 
 def restaurar_posicao_console(janela, largura_padrao=700, altura_padrao=400):
     """Restaura a posição e tamanho apenas do console"""
     try:
-        config = carregar_config()
-        if 'console' in config:
-            pos = config['console']
+        pos = configuracao.secao('console')
+        if pos:
             x = pos.get('x', 100)
             y = pos.get('y', 100)
             width = pos.get('width', largura_padrao)
@@ -149,8 +112,7 @@ def restaurar_posicao_console(janela, largura_padrao=700, altura_padrao=400):
 # === Funções para salvar/recuperar configurações do gerador de senhas ===
 def carregar_config_gerador():
     """Carrega as configurações do gerador de senhas"""
-    config = carregar_config()
-    gerador_config = config.get('gerador_senhas', {})
+    gerador_config = configuracao.secao('gerador_senhas', {})
     
     # Valores padrão
     config_padrao = {
@@ -176,93 +138,36 @@ def carregar_config_gerador():
 def salvar_config_gerador(comprimento, maiusculas, numeros, especiais, caracteres_especiais):
     """Salva as configurações do gerador de senhas"""
     try:
-        config = carregar_config()
-        config['gerador_senhas'] = {
+        configuracao.definir('gerador_senhas', {
             'comprimento': comprimento,
             'maiusculas': maiusculas,
             'numeros': numeros,
             'especiais': especiais,
             'caracteres_especiais': caracteres_especiais
-        }
-        salvar_config(config)
+        })
         logging.info(f"Configurações do gerador SALVAS: comprimento={comprimento}, especiais={especiais}, caracteres='{caracteres_especiais}'")
     except Exception as e:
         logging.error(f"Erro ao salvar configurações do gerador: {str(e)}")
 
-# === Função para normalizar domínio ===
-def normalizar_dominio(site):
-    """Normaliza domínios equivalentes para o mesmo domínio principal"""
-    site_lower = site.lower().strip()
-    
-    # Verifica se é um domínio que tem equivalente
-    for dominio, equivalente in DOMINIOS_EQUIVALENTES.items():
-        if dominio in site_lower:
-            return equivalente
-    
-    # Se não tem equivalente, retorna o próprio site
-    return site_lower
-
-# === Função para normalizar conta ===
-def normalizar_conta(site, usuario):
-    """Normaliza site e usuário para verificação de duplicatas considerando domínios equivalentes"""
-    site_normalizado = normalizar_dominio(site)
-    usuario_normalizado = usuario.lower().strip()
-    return f"{site_normalizado}||{usuario_normalizado}"
-
-# === JSON Local ===
-def carregar_dados():
-    logging.info("Tentando carregar dados do arquivo JSON...")
-    if os.path.exists(ARQUIVO_DADOS):
-        try:
-            with open(ARQUIVO_DADOS, "r") as f:
-                dados = json.load(f)
-                logging.info(f"Carregados {len(dados)} contas do arquivo JSON")
-                return dados
-        except Exception as e:
-            logging.error(f"Erro ao carregar dados: {str(e)}")
-            return []
-    logging.info("Nenhum arquivo de dados encontrado, retornando lista vazia")
-    return []
-
-def salvar_dados(dados):
-    try:
-        logging.info(f"Salvando {len(dados)} contas no arquivo JSON...")
-        with open(ARQUIVO_DADOS, "w") as f:
-            json.dump(dados, f, indent=4)
-        logging.info("Dados salvos com sucesso")
-        return True
-    except Exception as e:
-        logging.error(f"Erro ao salvar dados: {str(e)}")
-        messagebox.showerror("Erro", f"Erro ao salvar dados: {str(e)}")
-        return False
-
-# === Criptografia ===
-def criptografar(texto):
-    logging.debug("Criptografando texto...")
-    return fernet.encrypt(texto.encode()).decode()
+# === Gerador de Senhas ===
+def senha_vazada(senha):
+    """Indica se a senha está na base local de vazamentos (sempre False sem base)"""
+    return consulta_vazamentos is not None and consulta_vazamentos.contem(senha)
 
-def descriptografar(cripto):
-    logging.debug("Descriptografando texto...")
-    return fernet.decrypt(cripto.encode()).decode()
+# Maior lote aceito pelo botão "Gerar em Lote"
+LIMITE_LOTE_GERADOR = 1000000
 
-# === Gerador de Senhas ===
 def gerar_senha(comprimento=12, usar_maiusculas=True, usar_numeros=True, caracteres_especiais=""):
-    """Gera uma senha aleatória com os critérios especificados"""
+    """Gera uma senha aleatória com ao menos um caractere de cada classe pedida"""
     logging.info("Gerando nova senha...")
     
-    caracteres = string.ascii_lowercase
-    if usar_maiusculas:
-        caracteres += string.ascii_uppercase
-    if usar_numeros:
-        caracteres += string.digits
-    if caracteres_especiais:
-        caracteres += caracteres_especiais
-    
-    if not caracteres:
-        logging.warning("Nenhum critério selecionado para gerar senha")
+    try:
+        senha = GeradorSenhas(comprimento, usar_maiusculas, usar_numeros, caracteres_especiais,
+                              recusar=senha_vazada).gerar()
+    except PoliticaInvalida as e:
+        logging.warning(f"Não foi possível gerar a senha: {str(e)}")
         return ""
     
-    senha = ''.join(random.choice(caracteres) for _ in range(comprimento))
     logging.info(f"Senha gerada com {comprimento} caracteres")
     return senha
 
@@ -393,6 +298,39 @@ def mostrar_gerador_senha():
         else:
             messagebox.showwarning("Aviso", "Gere uma senha primeiro!")
     
+    def gerar_lote():
+        """Gera várias senhas com as configurações atuais para um arquivo ou a área de transferência"""
+        quantidade = simpledialog.askinteger("Gerar em Lote", "Quantidade de senhas:", parent=janela_gerador,
+                                             minvalue=1, maxvalue=LIMITE_LOTE_GERADOR)
+        if not quantidade:
+            return
+        caracteres_especiais = especiais_var_str.get() if especiais_var.get() else ""
+        try:
+            gerador = GeradorSenhas(comprimento_var.get(), maiusculas_var.get(), numeros_var.get(), caracteres_especiais,
+                                    recusar=senha_vazada)
+        except PoliticaInvalida as e:
+            messagebox.showerror("Erro", str(e))
+            return
+        
+        destino = messagebox.askyesnocancel("Gerar em Lote", "Salvar as senhas em um arquivo?\n"
+                                            "(Não = copiar para a área de transferência)", parent=janela_gerador)
+        if destino is None:
+            return
+        inicio = time.perf_counter()
+        if destino:
+            caminho = filedialog.asksaveasfilename(parent=janela_gerador, title="Salvar senhas geradas",
+                                                   defaultextension=".txt", filetypes=[("Texto", "*.txt")])
+            if not caminho:
+                return
+            gerador.gravar_lote(quantidade, caminho)
+        else:
+            janela_gerador.clipboard_clear()
+            janela_gerador.clipboard_append('\n'.join(gerador.gerar_lote(quantidade)))
+        segundos = time.perf_counter() - inicio
+        logging.info(f"Lote de {quantidade} senhas gerado em {segundos:.2f}s")
+        messagebox.showinfo("Gerar em Lote", f"{quantidade} senhas geradas "
+                            f"{'no arquivo' if destino else 'na área de transferência'}!", parent=janela_gerador)
+    
     def restaurar_config_padrao():
         """Restaura as configurações padrão"""
         comprimento_var.set(16)
@@ -534,6 +472,9 @@ def mostrar_gerador_senha():
     tk.Button(frame_botoes_linha2, text="✅ Usar e Fechar", command=usar_senha_e_fechar,
               bg="#28a745", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
     
+    tk.Button(frame_botoes_linha2, text="📦 Gerar em Lote", command=gerar_lote,
+              bg="#17a2b8", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+    
     # Botão fechar
     tk.Button(frame_botoes_linha2, text="❌ Fechar", command=janela_gerador.destroy,
               bg="#6c757d", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
@@ -555,12 +496,66 @@ def mostrar_gerador_senha():
     # Executa a inicialização após um breve delay
     janela_gerador.after(200, inicializacao_final)
 
+# === Janela de progresso das tarefas em segundo plano ===
+def executar_com_progresso(titulo, funcao, ao_concluir, ao_falhar=None, escrita=False, cancelavel=True):
+    """Roda funcao(tarefa) em segundo plano com uma janela de progresso e botão Cancelar
+
+    A janela não é modal: o resto da interface continua respondendo. Ao
+    terminar, a janela fecha e ao_concluir(resultado) ou ao_falhar(erro) roda
+    na thread do Tk. Retorna a Tarefa.
+    """
+    janela_progresso = tk.Toplevel(janela)
+    janela_progresso.title(titulo)
+    janela_progresso.geometry("380x140")
+    janela_progresso.configure(bg="#1e1e2f")
+    janela_progresso.resizable(False, False)
+    
+    label_progresso = tk.Label(janela_progresso, text=f"{titulo}...", bg="#1e1e2f", fg="white",
+                               font=("Arial", 10))
+    label_progresso.pack(pady=(15, 5))
+    
+    barra = ttk.Progressbar(janela_progresso, length=320, mode='indeterminate')
+    barra.pack(pady=5)
+    
+    def cancelar():
+        tarefa.cancelar()
+        btn_cancelar.config(state='disabled', text="Cancelando...")
+    
+    btn_cancelar = tk.Button(janela_progresso, text="Cancelar", command=cancelar,
+                             bg="#dc3545", fg="white", font=("Arial", 10))
+    if cancelavel:
+        btn_cancelar.pack(pady=10)
+    janela_progresso.protocol("WM_DELETE_WINDOW", cancelar if cancelavel else lambda: None)
+    
+    def mostrar_progresso(tarefa):
+        if tarefa.total:
+            barra.config(mode='determinate', maximum=tarefa.total, value=tarefa.feito)
+            texto = f"{titulo}... {tarefa.feito}/{tarefa.total}"
+        else:
+            barra.step(2)
+            texto = f"{titulo}..."
+        label_progresso.config(text=tarefa.texto or texto)
+    
+    def fechar():
+        if janela_progresso.winfo_exists():
+            janela_progresso.destroy()
+    
+    def concluir(resultado):
+        fechar()
+        ao_concluir(resultado)
+    
+    def falhar(erro):
+        fechar()
+        if ao_falhar:
+            ao_falhar(erro)
+    
+    tarefa = tarefas.executar(titulo, funcao, concluir, falhar, mostrar_progresso, fechar, escrita)
+    return tarefa
+
 # === Função para exportar contas em TXT ===
 def exportar_contas_txt():
     """Exporta todas as contas para arquivos TXT individuais"""
-    dados = carregar_dados()
-    
-    if not dados:
+    if len(cofre) == 0:
         messagebox.showinfo("Exportar", "Nenhuma conta para exportar.")
         return
     
@@ -570,71 +565,82 @@ def exportar_contas_txt():
     if not pasta_destino:
         return
     
-    try:
-        contas_exportadas = 0
-        
-        for conta in dados:
-            # Cria um nome de arquivo seguro a partir do site e usuário
-            site_seguro = "".join(c for c in conta['site'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            usuario_seguro = "".join(c for c in conta['usuario'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            
-            # Se o nome ficar vazio, usa um nome padrão
-            if not site_seguro:
-                site_seguro = "site_desconhecido"
-            if not usuario_seguro:
-                usuario_seguro = "usuario_desconhecido"
-            
-            nome_arquivo = f"{site_seguro}_{usuario_seguro}.txt"
-            caminho_arquivo = os.path.join(pasta_destino, nome_arquivo)
-            
-            # Se o arquivo já existir, adiciona um número
-            contador = 1
-            while os.path.exists(caminho_arquivo):
-                nome_arquivo = f"{site_seguro}_{usuario_seguro}_{contador}.txt"
-                caminho_arquivo = os.path.join(pasta_destino, nome_arquivo)
-                contador += 1
-            
-            # Descriptografa a senha
-            senha_descriptografada = descriptografar(conta['senha'])
-            
-            # Cria o conteúdo do arquivo
-            conteudo = f"""CONTA EXPORTADA - GERENCIADOR DE SENHAS
-Data da Exportação: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-=== INFORMAÇÕES DA CONTA ===
-Site: {conta['site']}
-Usuário: {conta['usuario']}
-Senha: {senha_descriptografada}
-Apelido: {conta.get('apelido', 'Nenhum')}
-Data de Criação: {conta.get('data_criacao', 'Desconhecida')}
-
-=== INSTRUÇÕES ===
-• Este arquivo contém informações sensíveis
-• Mantenha em local seguro
-• Não compartilhe com ninguém
-• Exclua quando não for mais necessário
-
-=== SISTEMA ===
-Exportado por: Gerenciador de Senhas
-Versão: 2.0
-Data: {datetime.now().strftime("%d/%m/%Y")}
-"""
-            
-            # Salva o arquivo
-            with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-                f.write(conteudo)
-            
-            contas_exportadas += 1
-        
+    def concluir(contas_exportadas):
         messagebox.showinfo("Exportação Concluída", 
                            f"Exportação realizada com sucesso!\n"
                            f"Contas exportadas: {contas_exportadas}\n"
                            f"Pasta: {pasta_destino}")
-        logging.info(f"Exportação TXT: {contas_exportadas} contas exportadas para {pasta_destino}")
-        
-    except Exception as e:
+    
+    def falhar(e):
         messagebox.showerror("Erro na Exportação", f"Erro ao exportar contas: {str(e)}")
         logging.error(f"Erro na exportação TXT: {str(e)}")
+    
+    # Descriptografia e gravação rodam fora da thread do Tk
+    executar_com_progresso("Exportando contas",
+                           lambda tarefa: cofre.exportar_txt(pasta_destino, progresso=tarefa.progresso),
+                           concluir, falhar)
+
+# === Função para exportar contas em um único arquivo ===
+def exportar_contas_arquivo():
+    """Exporta todas as contas para um único arquivo CSV, JSONL ou ZIP"""
+    if len(cofre) == 0:
+        messagebox.showinfo("Exportar", "Nenhuma conta para exportar.")
+        return
+    
+    caminho = filedialog.asksaveasfilename(
+        title="Salvar exportação como",
+        defaultextension=".csv",
+        filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("ZIP de TXTs", "*.zip")]
+    )
+    
+    if not caminho:
+        return
+    
+    def concluir(contas_exportadas):
+        messagebox.showinfo("Exportação Concluída", 
+                           f"Exportação realizada com sucesso!\n"
+                           f"Contas exportadas: {contas_exportadas}\n"
+                           f"Arquivo: {caminho}")
+    
+    def falhar(e):
+        messagebox.showerror("Erro na Exportação", f"Erro ao exportar contas: {str(e)}")
+        logging.error(f"Erro na exportação para arquivo: {str(e)}")
+    
+    executar_com_progresso("Exportando contas",
+                           lambda tarefa: exportar_arquivo(cofre, caminho, progresso=tarefa.progresso),
+                           concluir, falhar)
+
+# === Função para importar contas de CSV/JSON ===
+def importar_contas():
+    """Importa contas em massa de um arquivo CSV ou JSON"""
+    caminho = filedialog.askopenfilename(
+        title="Selecione o arquivo para importar",
+        filetypes=[("Arquivos suportados", "*.csv *.json *.jsonl *.zip"), ("CSV", "*.csv"),
+                   ("JSON", "*.json"), ("JSON Lines", "*.jsonl"), ("ZIP de TXTs", "*.zip")]
+    )
+    
+    if not caminho:
+        return
+    
+    def importar(tarefa):
+        # Cancelar no meio desfaz a importação inteira (nada é gravado)
+        def progresso(relatorio):
+            tarefa.progresso(relatorio['lidas'], texto=f"Importando... {relatorio['lidas']} lidas | "
+                                                       f"{relatorio['linhas_por_segundo']:.0f} linhas/s")
+        return importar_arquivo(cofre, caminho, trabalhadores=4, progresso=progresso)
+    
+    def concluir(relatorio):
+        messagebox.showinfo("Importação Concluída",
+                           f"Contas importadas: {relatorio['importadas']}\n"
+                           f"Duplicadas ignoradas: {relatorio['duplicadas']}\n"
+                           f"Linhas inválidas: {relatorio['invalidas']}\n"
+                           f"Velocidade: {relatorio['linhas_por_segundo']:.0f} linhas/s")
+    
+    def falhar(e):
+        messagebox.showerror("Erro na Importação", f"Erro ao importar contas: {str(e)}")
+        logging.error(f"Erro na importação: {str(e)}")
+    
+    executar_com_progresso("Importando contas", importar, concluir, falhar, escrita=True)
 
 # === Funções para gerenciamento de contas ===
 def adicionar_conta():
@@ -648,28 +654,26 @@ def adicionar_conta():
         messagebox.showerror("Erro", "Preencha todos os campos obrigatórios (Site, Usuário e Senha)!")
         return
     
-    # Verifica se já existe uma conta com o mesmo site e usuário
-    dados = carregar_dados()
-    conta_normalizada = normalizar_conta(site, usuario)
+    if senha_vazada(senha):
+        logging.warning(f"Senha vazada recusada: {site} - {usuario}")
+        messagebox.showerror("Senha Vazada", "Esta senha aparece em vazamentos de dados conhecidos.\n"
+                                             "Escolha outra senha!")
+        return
     
-    for conta in dados:
-        conta_existente_normalizada = normalizar_conta(conta['site'], conta['usuario'])
-        if conta_existente_normalizada == conta_normalizada:
-            messagebox.showerror("Erro", "Já existe uma conta com este site e usuário!")
+    # Reuso verificado pela impressão da senha, sem descriptografar as outras contas
+    reusadas = cofre.contas_com_senha(senha)
+    if reusadas:
+        lista = "\n".join(f"• {conta['site']} - {conta['usuario']}" for conta in reusadas[:5])
+        if len(reusadas) > 5:
+            lista += f"\n... e mais {len(reusadas) - 5}"
+        if not messagebox.askyesno("Senha Reutilizada",
+                                   f"Esta senha já é usada em {len(reusadas)} conta(s):\n{lista}\n\n"
+                                   f"Adicionar mesmo assim?"):
+            logging.info(f"Adição cancelada por reuso de senha: {site} - {usuario}")
             return
     
-    # Adiciona a nova conta
-    nova_conta = {
-        'site': site,
-        'usuario': usuario,
-        'senha': criptografar(senha),
-        'apelido': apelido,
-        'data_criacao': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    dados.append(nova_conta)
-    
-    if salvar_dados(dados):
+    def concluir(_):
+        status_bar.config(text="Sistema Iniciado | Pronto para uso")
         # Limpa os campos
         entry_site.delete(0, tk.END)
         entry_usuario.delete(0, tk.END)
@@ -677,67 +681,291 @@ def adicionar_conta():
         entry_apelido.delete(0, tk.END)
         
         messagebox.showinfo("Sucesso", "Conta adicionada com sucesso!")
-        logging.info(f"Nova conta adicionada: {site} - {usuario}")
-    else:
-        messagebox.showerror("Erro", "Não foi possível salvar a conta!")
+    
+    def falhar(erro):
+        status_bar.config(text="Sistema Iniciado | Pronto para uso")
+        if isinstance(erro, ContaDuplicada):
+            messagebox.showerror("Erro", "Já existe uma conta com este site e usuário!")
+        else:
+            messagebox.showerror("Erro", "Não foi possível salvar a conta!")
+    
+    # A gravação entra na fila de escrita, depois de importações/exclusões em andamento
+    status_bar.config(text="Salvando conta...")
+    tarefas.executar("Adicionar conta", lambda tarefa: cofre.adicionar(site, usuario, senha, apelido),
+                     concluir, falhar, escrita=True)
 
 def ver_contas():
-    """Mostra uma janela com todas as contas salvas ORDENADAS POR SITE"""
-    dados = carregar_dados()
-    
-    if not dados:
+    """Mostra uma janela com todas as contas salvas, ordenadas por site por padrão"""
+    if len(cofre) == 0:
         messagebox.showinfo("Contas", "Nenhuma conta salva.")
         return
     
-    # ORDENA as contas por site (ordem alfabética)
-    dados_ordenados = sorted(dados, key=lambda x: x['site'].lower())
+    # Colunas disponíveis para ordenação (o cofre mantém cada ordem pronta)
+    ordenacoes = {"Site": 'site', "Usuário": 'usuario', "Apelido": 'apelido', "Data de Criação": 'data_criacao'}
+    
+    # Estado da lista virtualizada: só as linhas visíveis ficam no Listbox
+    # 'resultado' é a lista da busca atual (None sem busca); 'selecionadas' guarda ids de contas
+    estado = {'coluna': 'site', 'decrescente': False, 'topo': 0, 'linhas': 20,
+              'visiveis': [], 'selecionadas': set(), 'resultado': None, 'total_busca': 0,
+              'exato': True, 'agendada': None, 'indexando': False}
+    cofre.registrar_cache()
     
     janela_contas = tk.Toplevel(janela)
-    janela_contas.title("Contas Salvas - Ordenadas por Site")
+    janela_contas.title("Contas Salvas")
     janela_contas.geometry("700x500")
     janela_contas.configure(bg="#1e1e2f")
     
+    # Frame para busca
+    frame_busca = tk.Frame(janela_contas, bg="#1e1e2f")
+    frame_busca.pack(fill=tk.X, padx=10, pady=(10, 0))
+    
+    tk.Label(frame_busca, text="🔍 Buscar:", bg="#1e1e2f", fg="white",
+             font=("Arial", 10)).pack(side=tk.LEFT)
+    
+    entry_busca = tk.Entry(frame_busca, font=("Arial", 10), bg="#2b2b3d", fg="white",
+                           insertbackground="white")
+    entry_busca.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    
+    # Frame para ordenação
+    frame_ordem = tk.Frame(janela_contas, bg="#1e1e2f")
+    frame_ordem.pack(fill=tk.X, padx=10, pady=(10, 0))
+    
+    tk.Label(frame_ordem, text="Ordenar por:", bg="#1e1e2f", fg="white",
+             font=("Arial", 10)).pack(side=tk.LEFT)
+    
+    coluna_var = tk.StringVar(value="Site")
+    menu_coluna = tk.OptionMenu(frame_ordem, coluna_var, *ordenacoes, command=lambda _: trocar_coluna())
+    menu_coluna.configure(bg="#2b2b3d", fg="white", highlightthickness=0, font=("Arial", 9))
+    menu_coluna.pack(side=tk.LEFT, padx=5)
+    
+    btn_direcao = tk.Button(frame_ordem, text="⬆️ Crescente", command=lambda: inverter_direcao(),
+                            bg="#444", fg="white", font=("Arial", 9))
+    btn_direcao.pack(side=tk.LEFT, padx=5)
+    
+    label_total = tk.Label(frame_ordem, text="", bg="#1e1e2f", fg="#888", font=("Arial", 9))
+    label_total.pack(side=tk.RIGHT)
+    
     # Frame para a lista de contas
     frame_lista = tk.Frame(janela_contas, bg="#1e1e2f")
     frame_lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
-    # Listbox com scrollbar
+    # Listbox com scrollbar controlada manualmente
     scrollbar = tk.Scrollbar(frame_lista)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
-    lista_contas = tk.Listbox(frame_lista, yscrollcommand=scrollbar.set, 
-                             bg="#2b2b3d", fg="white", font=("Arial", 10), 
-                             selectmode=tk.SINGLE, width=80, height=20)
+    lista_contas = tk.Listbox(frame_lista, bg="#2b2b3d", fg="white", font=("Arial", 10), 
+                             selectmode=tk.EXTENDED, width=80, height=20, exportselection=False)
     lista_contas.pack(fill=tk.BOTH, expand=True)
     
-    scrollbar.config(command=lista_contas.yview)
+    altura_linha = tkfont.Font(font=lista_contas.cget('font')).metrics('linespace') + 1
     
-    # Preenche a lista com dados ORDENADOS
-    for i, conta in enumerate(dados_ordenados):
-        site = conta['site']
-        usuario = conta['usuario']
+    def texto_conta(conta):
         apelido = conta.get('apelido', '')
-        
         if apelido:
-            display_text = f"{site} - {usuario} ({apelido})"
+            return f"{conta['site']} - {conta['usuario']} ({apelido})"
+        return f"{conta['site']} - {conta['usuario']}"
+    
+    def total_linhas():
+        if estado['resultado'] is not None:
+            return len(estado['resultado'])
+        return len(cofre)
+    
+    def fatia(inicio, fim):
+        # Resultados da busca já vêm ordenados por relevância
+        if estado['resultado'] is not None:
+            return estado['resultado'][inicio:fim]
+        return cofre.fatia(estado['coluna'], inicio, fim, estado['decrescente'])
+    
+    def renderizar():
+        """Preenche o Listbox apenas com as contas da janela visível"""
+        total = total_linhas()
+        estado['topo'] = max(0, min(estado['topo'], total - estado['linhas']))
+        topo = estado['topo']
+        estado['visiveis'] = fatia(topo, topo + estado['linhas'])
+        
+        lista_contas.delete(0, tk.END)
+        for i, conta in enumerate(estado['visiveis']):
+            lista_contas.insert(tk.END, texto_conta(conta))
+            if conta['id'] in estado['selecionadas']:
+                lista_contas.selection_set(i)
+        
+        if total:
+            scrollbar.set(topo / total, min(1.0, (topo + estado['linhas']) / total))
         else:
-            display_text = f"{site} - {usuario}"
+            scrollbar.set(0.0, 1.0)
+        if estado['resultado'] is None:
+            texto = f"{total} contas"
+        elif estado['exato']:
+            texto = f"{total} de {estado['total_busca']} resultados"
+        else:
+            texto = f"{total} de ~{estado['total_busca']} resultados"
+        if len(estado['selecionadas']) > 1:
+            texto += f" · {len(estado['selecionadas'])} selecionadas"
+        label_total.config(text=texto)
+    
+    def rolar(*args):
+        if args[0] == 'moveto':
+            estado['topo'] = int(float(args[1]) * total_linhas())
+        elif args[0] == 'scroll':
+            passo = int(args[1])
+            if args[2] == 'pages':
+                passo *= estado['linhas']
+            estado['topo'] += passo
+        renderizar()
+    
+    def roda_mouse(event):
+        estado['topo'] += -3 if (event.num == 4 or event.delta > 0) else 3
+        renderizar()
+        return "break"
+    
+    def mover_selecao(passo):
+        """Move a seleção pelo teclado, rolando quando sai da área visível"""
+        selecionado = lista_contas.curselection()
+        if selecionado:
+            posicao = estado['topo'] + (selecionado[-1] if passo > 0 else selecionado[0]) + passo
+        else:
+            posicao = estado['topo']
+        posicao = max(0, min(posicao, total_linhas() - 1))
+        if posicao < estado['topo']:
+            estado['topo'] = posicao
+        elif posicao >= estado['topo'] + estado['linhas']:
+            estado['topo'] = posicao - estado['linhas'] + 1
+        indice = posicao - estado['topo']
+        if 0 <= indice < len(estado['visiveis']):
+            estado['selecionadas'] = {estado['visiveis'][indice]['id']}
+        renderizar()
+        return "break"
+    
+    def ao_selecionar(event):
+        # O Listbox só conhece as linhas visíveis; as seleções fora delas são mantidas
+        selecionado = set(lista_contas.curselection())
+        for i, conta in enumerate(estado['visiveis']):
+            if i in selecionado:
+                estado['selecionadas'].add(conta['id'])
+            else:
+                estado['selecionadas'].discard(conta['id'])
+        renderizar()
+    
+    def ao_clicar(event):
+        # Clique sem Ctrl/Shift começa uma seleção nova, inclusive fora da área visível
+        if not event.state & 0x0005:
+            estado['selecionadas'].clear()
+    
+    def selecionar_todas(event=None):
+        """Seleciona todas as contas da lista atual (todas ou o resultado da busca)"""
+        estado['selecionadas'] = {conta['id'] for conta in fatia(0, total_linhas())}
+        renderizar()
+        return "break"
+    
+    def ao_redimensionar(event):
+        linhas = max(1, (event.height - 4) // altura_linha)
+        if linhas != estado['linhas']:
+            estado['linhas'] = linhas
+            renderizar()
+    
+    def trocar_coluna():
+        nome = coluna_var.get()
+        coluna = ordenacoes[nome]
         
-        lista_contas.insert(tk.END, display_text)
+        def aplicar(_):
+            if not janela_contas.winfo_exists():
+                return
+            estado['coluna'] = coluna
+            estado['topo'] = 0
+            renderizar()
+            logging.info(f"Lista de contas ordenada por {nome}")
+        
+        # A primeira ordenação por uma coluna monta o índice fora da thread do Tk
+        # (e fora da trava do cofre); até lá a lista continua na ordem anterior
+        label_total.config(text="Ordenando...")
+        tarefas.executar(f"Ordenar por {nome}", lambda tarefa: cofre.preparar_ordem(coluna), aplicar)
+    
+    def inverter_direcao():
+        estado['decrescente'] = not estado['decrescente']
+        estado['topo'] = 0
+        btn_direcao.config(text="⬇️ Decrescente" if estado['decrescente'] else "⬆️ Crescente")
+        renderizar()
+    
+    def buscar():
+        """Refaz a busca com o texto atual; texto vazio volta à lista ordenada"""
+        estado['agendada'] = None
+        texto = entry_busca.get().strip()
+        if texto and not cofre.busca_pronta:
+            indexar_busca()
+            return
+        if texto:
+            inicio = time.perf_counter()
+            estado['resultado'], estado['total_busca'], estado['exato'] = cofre.buscar(texto)
+            logging.debug(f"Busca '{texto}': {estado['total_busca']} resultados em "
+                          f"{(time.perf_counter() - inicio) * 1000:.1f}ms")
+        else:
+            estado['resultado'] = None
+        estado['topo'] = 0
+        renderizar()
+    
+    def indexar_busca():
+        """Monta o índice de busca fora da thread do Tk e refaz a busca quando ficar pronto"""
+        label_total.config(text="Indexando busca...")
+        if estado['indexando']:
+            return
+        estado['indexando'] = True
+        
+        def pronto(_):
+            estado['indexando'] = False
+            if janela_contas.winfo_exists():
+                buscar()
+        
+        def falhou(_):
+            estado['indexando'] = False
+            if janela_contas.winfo_exists():
+                renderizar()
+        
+        tarefas.executar("Indexar busca", lambda tarefa: cofre.preparar_busca(), pronto, falhou)
+    
+    def ao_digitar(event):
+        # Espera uma pausa na digitação antes de buscar
+        if estado['agendada'] is not None:
+            janela_contas.after_cancel(estado['agendada'])
+        estado['agendada'] = janela_contas.after(150, buscar)
+    
+    entry_busca.bind('<KeyRelease>', ao_digitar)
+    entry_busca.bind('<Down>', lambda e: (lista_contas.focus_set(), mover_selecao(0)))
+    
+    scrollbar.config(command=rolar)
+    lista_contas.bind('<<ListboxSelect>>', ao_selecionar)
+    lista_contas.bind('<Configure>', ao_redimensionar)
+    lista_contas.bind('<MouseWheel>', roda_mouse)
+    lista_contas.bind('<Button-4>', roda_mouse)
+    lista_contas.bind('<Button-5>', roda_mouse)
+    lista_contas.bind('<Up>', lambda e: mover_selecao(-1))
+    lista_contas.bind('<Down>', lambda e: mover_selecao(1))
+    lista_contas.bind('<Prior>', lambda e: mover_selecao(-estado['linhas']))
+    lista_contas.bind('<Next>', lambda e: mover_selecao(estado['linhas']))
+    lista_contas.bind('<ButtonPress-1>', ao_clicar)
+    lista_contas.bind('<Control-a>', selecionar_todas)
+    
+    renderizar()
+    entry_busca.focus_set()
+    
+    def conta_selecionada():
+        """Única conta selecionada na lista, ou None (com aviso)"""
+        if not estado['selecionadas']:
+            messagebox.showwarning("Aviso", "Selecione uma conta!")
+            return None
+        if len(estado['selecionadas']) > 1:
+            messagebox.showwarning("Aviso", "Selecione apenas uma conta!")
+            return None
+        return cofre.obter_por_id(next(iter(estado['selecionadas'])))
     
     # Frame para botões
     frame_botoes = tk.Frame(janela_contas, bg="#1e1e2f")
     frame_botoes.pack(fill=tk.X, padx=10, pady=10)
     
     def ver_detalhes():
-        selecionado = lista_contas.curselection()
-        if not selecionado:
-            messagebox.showwarning("Aviso", "Selecione uma conta!")
+        conta = conta_selecionada()
+        if conta is None:
             return
         
-        indice = selecionado[0]
-        conta = dados_ordenados[indice]
-        
         # Mostra os detalhes em uma nova janela
         janela_detalhes = tk.Toplevel(janela_contas)
         janela_detalhes.title("Detalhes da Conta")
@@ -765,7 +993,7 @@ def ver_contas():
                 frame_senha = tk.Frame(frame_detalhes, bg="#1e1e2f")
                 frame_senha.grid(row=i, column=1, sticky="ew", pady=8)
                 
-                senha_real = descriptografar(conta['senha'])
+                senha_real = cofre.revelar_senha(conta)
                 entry_senha_detalhes = tk.Entry(frame_senha, show="*", font=("Arial", 10),
                                                bg="#2b2b3d", fg="white")
                 entry_senha_detalhes.insert(0, senha_real)
@@ -801,45 +1029,49 @@ def ver_contas():
                  bg="#6c757d", fg="white", font=("Arial", 10)).grid(row=len(campos), column=0, columnspan=2, pady=15)
     
     def copiar_senha():
-        selecionado = lista_contas.curselection()
-        if not selecionado:
-            messagebox.showwarning("Aviso", "Selecione uma conta!")
+        conta = conta_selecionada()
+        if conta is None:
             return
         
-        indice = selecionado[0]
-        conta = dados_ordenados[indice]
-        
-        senha = descriptografar(conta['senha'])
+        senha = cofre.revelar_senha(conta)
         janela_contas.clipboard_clear()
         janela_contas.clipboard_append(senha)
         messagebox.showinfo("Copiado", "Senha copiada para a área de transferência!")
         logging.info(f"Senha copiada para conta: {conta['site']} - {conta['usuario']}")
     
     def excluir_conta():
-        selecionado = lista_contas.curselection()
-        if not selecionado:
+        contas = [cofre.obter_por_id(id_conta) for id_conta in estado['selecionadas']]
+        contas = [conta for conta in contas if conta is not None]
+        if not contas:
             messagebox.showwarning("Aviso", "Selecione uma conta!")
             return
         
-        indice = selecionado[0]
-        conta = dados_ordenados[indice]
+        if len(contas) == 1:
+            pergunta = f"Tem certeza que deseja excluir a conta:\n{contas[0]['site']} - {contas[0]['usuario']}?"
+        else:
+            pergunta = f"Tem certeza que deseja excluir as {len(contas)} contas selecionadas?"
+        if not messagebox.askyesno("Confirmar", pergunta):
+            return
+        ids = {conta['id'] for conta in contas}
         
-        resposta = messagebox.askyesno("Confirmar", f"Tem certeza que deseja excluir a conta:\n{conta['site']} - {conta['usuario']}?")
-        if resposta:
-            # Remove do array original (não ordenado)
-            dados_original = carregar_dados()
-            for i, conta_original in enumerate(dados_original):
-                if (conta_original['site'] == conta['site'] and 
-                    conta_original['usuario'] == conta['usuario']):
-                    dados_original.pop(i)
-                    break
-            
-            if salvar_dados(dados_original):
-                lista_contas.delete(indice)
+        def concluir(excluidas):
+            if janela_contas.winfo_exists():
+                if estado['resultado'] is not None:
+                    estado['resultado'] = [c for c in estado['resultado'] if c['id'] not in ids]
+                    estado['total_busca'] -= excluidas
+                estado['selecionadas'] -= ids
+                renderizar()
+            if excluidas == 1:
                 messagebox.showinfo("Sucesso", "Conta excluída com sucesso!")
-                logging.info(f"Conta excluída: {conta['site']} - {conta['usuario']}")
             else:
-                messagebox.showerror("Erro", "Não foi possível excluir a conta!")
+                messagebox.showinfo("Sucesso", f"{excluidas} contas excluídas com sucesso!")
+        
+        def falhar(erro):
+            messagebox.showerror("Erro", "Não foi possível excluir as contas!")
+        
+        # Todas as contas selecionadas saem em uma única gravação, na fila de escrita
+        tarefas.executar("Excluir contas", lambda tarefa: cofre.excluir_varias(contas),
+                         concluir, falhar, escrita=True)
     
     # Botões
     tk.Button(frame_botoes, text="👁️ Ver Detalhes", command=ver_detalhes,
@@ -855,12 +1087,15 @@ def ver_contas():
     tk.Button(frame_botoes, text="📤 Exportar TXT", command=exportar_contas_txt,
              bg="#ff9800", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
     
+    tk.Button(frame_botoes, text="💾 Exportar Arquivo", command=exportar_contas_arquivo,
+             bg="#ff9800", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+    
     tk.Button(frame_botoes, text="Fechar", command=janela_contas.destroy,
              bg="#6c757d", fg="white", font=("Arial", 10)).pack(side=tk.RIGHT, padx=5)
 
 def mostrar_console():
     """Mostra o console de logs"""
-    global janela_console_global, console_handler_global
+    global janela_console_global
     
     logging.info("Abrindo console de logs...")
     
@@ -891,32 +1126,44 @@ def mostrar_console():
     frame_botoes = tk.Frame(main_frame, bg="#1e1e2f")
     frame_botoes.pack(fill=tk.X, pady=10)
     
-    # Handler personalizado para o console
-    console_handler = ConsoleHandler(text_logs)
-    console_handler.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(formatter)
+    janela_console_global = janela_console
     
-    # Adiciona o handler ao logger principal
-    logging.getLogger().addHandler(console_handler)
+    def exibir_linhas(linhas):
+        text_logs.configure(state='normal')
+        text_logs.insert(tk.END, '\n'.join(linhas) + '\n')
+        # Mantém só as últimas linhas no widget
+        excesso = int(text_logs.index('end-1c').split('.')[0]) - 1 - LIMITE_LINHAS_CONSOLE
+        if excesso > 0:
+            text_logs.delete('1.0', f'{excesso + 1}.0')
+        text_logs.configure(state='disabled')
+        text_logs.see(tk.END)
     
-    # Guarda referências globais
-    janela_console_global = janela_console
-    console_handler_global = console_handler
+    def drenar_console():
+        # As linhas chegam pela thread do log; aqui são inseridas de uma vez
+        lote = console_handler_global.drenar()
+        if lote:
+            exibir_linhas(lote)
+        estado['agendamento'] = janela_console.after(INTERVALO_CONSOLE_MS, drenar_console)
+    
+    estado = {'agendamento': None}
+    historico = console_handler_global.historico()
+    if historico:
+        exibir_linhas(historico)
+    drenar_console()
     
     def limpar_console():
         text_logs.configure(state='normal')
         text_logs.delete(1.0, tk.END)
         text_logs.configure(state='disabled')
+        console_handler_global.limpar()
         logging.info("Console limpo")
     
     def fechar_console():
-        global janela_console_global, console_handler_global
+        global janela_console_global
         
-        # Remove o handler do logger
-        if console_handler_global:
-            logging.getLogger().removeHandler(console_handler_global)
-            console_handler_global = None
+        if estado['agendamento'] is not None:
+            janela_console.after_cancel(estado['agendamento'])
+            estado['agendamento'] = None
         
         # Salva a posição antes de fechar
         salvar_posicao_console(janela_console)
@@ -937,6 +1184,36 @@ def mostrar_console():
     
     logging.info("Console de logs aberto com sucesso")
 
+def mostrar_reuso():
+    """Mostra os grupos de contas que compartilham a mesma senha"""
+    inicio = time.perf_counter()
+    grupos = cofre.relatorio_reuso()
+    logging.info(f"Relatório de reuso: {len(grupos)} senhas reutilizadas em "
+                 f"{sum(len(grupo) for grupo in grupos)} contas ({(time.perf_counter() - inicio) * 1000:.1f}ms)")
+    if not grupos:
+        messagebox.showinfo("Reuso de Senhas", "Nenhuma senha é usada em mais de uma conta.")
+        return
+    
+    janela_reuso = tk.Toplevel(janela)
+    janela_reuso.title("Reuso de Senhas")
+    janela_reuso.geometry("600x450")
+    janela_reuso.configure(bg="#1e1e2f")
+    
+    tk.Label(janela_reuso, text=f"♻️ {len(grupos)} senhas usadas em mais de uma conta",
+             font=("Arial", 12, "bold"), bg="#1e1e2f", fg="white").pack(pady=10)
+    
+    texto = scrolledtext.ScrolledText(janela_reuso, bg="#2b2b3d", fg="white", font=("Consolas", 10))
+    texto.pack(fill=tk.BOTH, expand=True, padx=10)
+    for numero, grupo in enumerate(grupos, 1):
+        texto.insert(tk.END, f"Senha {numero} ({len(grupo)} contas):\n")
+        for conta in sorted(grupo, key=lambda conta: conta['site'].lower()):
+            texto.insert(tk.END, f"    {conta['site']} - {conta['usuario']}\n")
+        texto.insert(tk.END, "\n")
+    texto.configure(state='disabled')
+    
+    tk.Button(janela_reuso, text="Fechar", command=janela_reuso.destroy,
+              bg="#6c757d", fg="white", font=("Arial", 10)).pack(pady=10)
+
 def mostrar_sobre():
     """Mostra informações sobre o sistema"""
     sobre_texto = """
@@ -973,108 +1250,159 @@ Versão 2.0 - Sistema Completo
     logging.info("Informações do sistema exibidas")
 
 # === Interface Principal ===
-janela = tk.Tk()
-janela.title("Gerenciador de Senhas")
-janela.geometry("500x600")
-janela.configure(bg="#1e1e2f")
-janela.resizable(False, False)
+if __name__ == "__main__":
+    configurar_logging_com_console()
+    
+    janela = tk.Tk()
+    janela.title("Gerenciador de Senhas")
+    janela.geometry("500x750")
+    janela.configure(bg="#1e1e2f")
+    janela.resizable(False, False)
+
+    # Verificação de senha mestre
+    senha_mestre = pedir_senha_mestre()
+    if not senha_mestre:
+        janela.destroy()
+        exit()
 
-# Verificação de senha mestre
-senha_mestre = simpledialog.askstring("Senha Mestre", "Digite a senha mestre:", show="*")
-if senha_mestre != SENHA_MESTRE:
-    messagebox.showerror("Acesso Negado", "Senha mestre incorreta.")
-    janela.destroy()
-    exit()
+    config = carregar_config()
+    tarefas = ExecutorTarefas(janela.after)
+    cofre = Cofre(modo_armazenamento=config.get('armazenamento', MODO_JSON),
+                  tempo_desbloqueio=config.get('tempo_desbloqueio_ms', TEMPO_DESBLOQUEIO_MS) / 1000,
+                  persistir_indice=bool(config.get('persistir_indice', False)))
+    # A derivação da chave e a leitura das contas rodam fora da thread do Tk
+    abertura = {}
+    cofre_pronto = tk.BooleanVar(value=False)
+    def ao_falhar_abertura(erro):
+        abertura['erro'] = erro
+        cofre_pronto.set(True)
+    executar_com_progresso("Abrindo cofre", lambda tarefa: cofre.abrir(senha_mestre),
+                           lambda _: cofre_pronto.set(True), ao_falhar_abertura,
+                           escrita=True, cancelavel=False)
+    janela.wait_variable(cofre_pronto)
+    if isinstance(abertura.get('erro'), SenhaMestreInvalida):
+        logging.warning("Acesso negado - Senha mestre incorreta")
+        messagebox.showerror("Acesso Negado", "Senha mestre incorreta.")
+        tarefas.encerrar()
+        janela.destroy()
+        exit()
+    if 'erro' in abertura:
+        messagebox.showerror("Erro", f"Não foi possível abrir o cofre: {str(abertura['erro'])}")
+        tarefas.encerrar()
+        janela.destroy()
+        exit()
+    logging.info("Acesso concedido - Senha mestre correta")
+    vazamentos = config.get('vazamentos', {})
+    consulta_vazamentos = abrir_consulta(vazamentos.get('arquivo', ARQUIVO_VAZAMENTOS),
+                                         vazamentos.get('bloom', ARQUIVO_BLOOM))
+
+    # Título
+    tk.Label(janela, text="🔐 Gerenciador de Senhas", font=("Arial", 18, "bold"), 
+             bg="#1e1e2f", fg="white").pack(pady=20)
 
-logging.info("Acesso concedido - Senha mestre correta")
+    # Frame principal para os CAMPOS DE ENTRADA
+    frame_campos = tk.Frame(janela, bg="#1e1e2f")
+    frame_campos.pack(fill=tk.BOTH, expand=True, padx=30, pady=10)
 
-# Título
-tk.Label(janela, text="🔐 Gerenciador de Senhas", font=("Arial", 18, "bold"), 
-         bg="#1e1e2f", fg="white").pack(pady=20)
+    # === CAMPOS DE ENTRADA VISÍVEIS ===
 
-# Frame principal para os CAMPOS DE ENTRADA
-frame_campos = tk.Frame(janela, bg="#1e1e2f")
-frame_campos.pack(fill=tk.BOTH, expand=True, padx=30, pady=10)
+    # Campo Site
+    tk.Label(frame_campos, text="Site:", bg="#1e1e2f", fg="white", 
+             font=("Arial", 10, "bold")).grid(row=0, column=0, sticky="w", pady=10)
+    entry_site = tk.Entry(frame_campos, font=("Arial", 12), width=30)
+    entry_site.grid(row=0, column=1, sticky="ew", pady=10, padx=(10, 0))
 
-# === CAMPOS DE ENTRADA VISÍVEIS ===
+    # Campo Usuário
+    tk.Label(frame_campos, text="Usuário:", bg="#1e1e2f", fg="white", 
+             font=("Arial", 10, "bold")).grid(row=1, column=0, sticky="w", pady=10)
+    entry_usuario = tk.Entry(frame_campos, font=("Arial", 12), width=30)
+    entry_usuario.grid(row=1, column=1, sticky="ew", pady=10, padx=(10, 0))
 
-# Campo Site
-tk.Label(frame_campos, text="Site:", bg="#1e1e2f", fg="white", 
-         font=("Arial", 10, "bold")).grid(row=0, column=0, sticky="w", pady=10)
-entry_site = tk.Entry(frame_campos, font=("Arial", 12), width=30)
-entry_site.grid(row=0, column=1, sticky="ew", pady=10, padx=(10, 0))
+    # Campo Senha
+    tk.Label(frame_campos, text="Senha:", bg="#1e1e2f", fg="white", 
+             font=("Arial", 10, "bold")).grid(row=2, column=0, sticky="w", pady=10)
 
-# Campo Usuário
-tk.Label(frame_campos, text="Usuário:", bg="#1e1e2f", fg="white", 
-         font=("Arial", 10, "bold")).grid(row=1, column=0, sticky="w", pady=10)
-entry_usuario = tk.Entry(frame_campos, font=("Arial", 12), width=30)
-entry_usuario.grid(row=1, column=1, sticky="ew", pady=10, padx=(10, 0))
+    frame_senha = tk.Frame(frame_campos, bg="#1e1e2f")
+    frame_senha.grid(row=2, column=1, sticky="ew", pady=10, padx=(10, 0))
 
-# Campo Senha
-tk.Label(frame_campos, text="Senha:", bg="#1e1e2f", fg="white", 
-         font=("Arial", 10, "bold")).grid(row=2, column=0, sticky="w", pady=10)
+    entry_senha = tk.Entry(frame_senha, show="*", font=("Arial", 12))
+    entry_senha.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-frame_senha = tk.Frame(frame_campos, bg="#1e1e2f")
-frame_senha.grid(row=2, column=1, sticky="ew", pady=10, padx=(10, 0))
+    # Botões para senha
+    frame_botoes_senha = tk.Frame(frame_senha, bg="#1e1e2f")
+    frame_botoes_senha.pack(side=tk.RIGHT, padx=(5, 0))
 
-entry_senha = tk.Entry(frame_senha, show="*", font=("Arial", 12))
-entry_senha.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    btn_mostrar = tk.Button(frame_botoes_senha, text="👁️", 
+                           command=lambda: entry_senha.config(show="" if entry_senha.cget('show') == '*' else "*"),
+                           bg="#444", fg="white", font=("Arial", 8), width=3)
+    btn_mostrar.pack(side=tk.LEFT, padx=2)
 
-# Botões para senha
-frame_botoes_senha = tk.Frame(frame_senha, bg="#1e1e2f")
-frame_botoes_senha.pack(side=tk.RIGHT, padx=(5, 0))
+    btn_gerar = tk.Button(frame_botoes_senha, text="🎲", 
+                         command=mostrar_gerador_senha,
+                         bg="#17a2b8", fg="white", font=("Arial", 8), width=3)
+    btn_gerar.pack(side=tk.LEFT, padx=2)
 
-btn_mostrar = tk.Button(frame_botoes_senha, text="👁️", 
-                       command=lambda: entry_senha.config(show="" if entry_senha.cget('show') == '*' else "*"),
-                       bg="#444", fg="white", font=("Arial", 8), width=3)
-btn_mostrar.pack(side=tk.LEFT, padx=2)
+    # Campo Apelido
+    tk.Label(frame_campos, text="Apelido (opcional):", bg="#1e1e2f", fg="white", 
+             font=("Arial", 10, "bold")).grid(row=3, column=0, sticky="w", pady=10)
+    entry_apelido = tk.Entry(frame_campos, font=("Arial", 12), width=30)
+    entry_apelido.grid(row=3, column=1, sticky="ew", pady=10, padx=(10, 0))
 
-btn_gerar = tk.Button(frame_botoes_senha, text="🎲", 
-                     command=mostrar_gerador_senha,
-                     bg="#17a2b8", fg="white", font=("Arial", 8), width=3)
-btn_gerar.pack(side=tk.LEFT, padx=2)
+    # Configurar peso da coluna para expansão
+    frame_campos.columnconfigure(1, weight=1)
 
-# Campo Apelido
-tk.Label(frame_campos, text="Apelido (opcional):", bg="#1e1e2f", fg="white", 
-         font=("Arial", 10, "bold")).grid(row=3, column=0, sticky="w", pady=10)
-entry_apelido = tk.Entry(frame_campos, font=("Arial", 12), width=30)
-entry_apelido.grid(row=3, column=1, sticky="ew", pady=10, padx=(10, 0))
+    # Frame para botões principais
+    frame_botoes = tk.Frame(janela, bg="#1e1e2f")
+    frame_botoes.pack(fill=tk.X, padx=30, pady=20)
 
-# Configurar peso da coluna para expansão
-frame_campos.columnconfigure(1, weight=1)
+    # Botões principais
+    tk.Button(frame_botoes, text="➕ Adicionar Conta", command=adicionar_conta, 
+              bg="#28a745", fg="white", font=("Arial", 12, "bold"), 
+              height=2).pack(fill=tk.X, pady=5)
 
-# Frame para botões principais
-frame_botoes = tk.Frame(janela, bg="#1e1e2f")
-frame_botoes.pack(fill=tk.X, padx=30, pady=20)
+    tk.Button(frame_botoes, text="📋 Ver Contas", command=ver_contas, 
+              bg="#17a2b8", fg="white", font=("Arial", 12, "bold"), 
+              height=2).pack(fill=tk.X, pady=5)
 
-# Botões principais
-tk.Button(frame_botoes, text="➕ Adicionar Conta", command=adicionar_conta, 
-          bg="#28a745", fg="white", font=("Arial", 12, "bold"), 
-          height=2).pack(fill=tk.X, pady=5)
+    tk.Button(frame_botoes, text="📤 Exportar TXT", command=exportar_contas_txt, 
+              bg="#ff9800", fg="white", font=("Arial", 12), 
+              height=2).pack(fill=tk.X, pady=5)
+    
+    tk.Button(frame_botoes, text="📥 Importar Contas", command=importar_contas, 
+              bg="#ff9800", fg="white", font=("Arial", 12), 
+              height=2).pack(fill=tk.X, pady=5)
 
-tk.Button(frame_botoes, text="📋 Ver Contas", command=ver_contas, 
-          bg="#17a2b8", fg="white", font=("Arial", 12, "bold"), 
-          height=2).pack(fill=tk.X, pady=5)
+    tk.Button(frame_botoes, text="♻️ Reuso de Senhas", command=mostrar_reuso, 
+              bg="#6c757d", fg="white", font=("Arial", 12), 
+              height=2).pack(fill=tk.X, pady=5)
 
-tk.Button(frame_botoes, text="📤 Exportar TXT", command=exportar_contas_txt, 
-          bg="#ff9800", fg="white", font=("Arial", 12), 
-          height=2).pack(fill=tk.X, pady=5)
+    tk.Button(frame_botoes, text="📊 Console", command=mostrar_console, 
+              bg="#6c757d", fg="white", font=("Arial", 12), 
+              height=2).pack(fill=tk.X, pady=5)
 
-tk.Button(frame_botoes, text="📊 Console", command=mostrar_console, 
-          bg="#6c757d", fg="white", font=("Arial", 12), 
-          height=2).pack(fill=tk.X, pady=5)
+    tk.Button(frame_botoes, text="ℹ️ Sobre", command=mostrar_sobre, 
+              bg="#6c757d", fg="white", font=("Arial", 12), 
+              height=2).pack(fill=tk.X, pady=5)
 
-tk.Button(frame_botoes, text="ℹ️ Sobre", command=mostrar_sobre, 
-          bg="#6c757d", fg="white", font=("Arial", 12), 
-          height=2).pack(fill=tk.X, pady=5)
+    # Status bar
+    status_bar = tk.Label(janela, text="Sistema Iniciado | Pronto para uso", 
+                         bg="#2b2b3d", fg="#00ff00", font=("Arial", 8), anchor="w")
+    status_bar.pack(fill=tk.X, side=tk.BOTTOM)
 
-# Status bar
-status_bar = tk.Label(janela, text="Sistema Iniciado | Pronto para uso", 
-                     bg="#2b2b3d", fg="#00ff00", font=("Arial", 8), anchor="w")
-status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+    logging.info("Interface principal carregada com sucesso")
+    logging.info("Sistema pronto para uso")
 
-logging.info("Interface principal carregada com sucesso")
-logging.info("Sistema pronto para uso")
+    # Zera as senhas vencidas do cache mesmo sem novos acessos
+    def expirar_senhas():
+        cofre.segredos.expirar()
+        janela.after(INTERVALO_EXPIRACAO_SENHAS_MS, expirar_senhas)
+    janela.after(INTERVALO_EXPIRACAO_SENHAS_MS, expirar_senhas)
 
-# Inicia a interface
-janela.mainloop()
\ No newline at end of file
+    # Inicia a interface
+    janela.mainloop()
+    # Exportações em andamento são canceladas (e seus arquivos apagados) antes de fechar o cofre
+    tarefas.encerrar()
+    cofre.fechar()
+    if consulta_vazamentos is not None:
+        consulta_vazamentos.fechar()
+    configuracao.descarregar()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import bisect
+
+# === Colunas ordenáveis da lista de contas ===
+COLUNAS_ORDENACAO = {
+    'site': lambda conta: conta['site'].lower(),
+    'usuario': lambda conta: conta['usuario'].lower(),
+    'apelido': lambda conta: (conta.get('apelido') or '').lower(),
+    'data_criacao': lambda conta: conta.get('data_criacao') or '',
+}
+
+class IndiceOrdenado:
+    """Contas mantidas em ordem por uma coluna, atualizadas a cada inclusão/exclusão
+
+    A ordem é montada uma vez e depois mantida com busca binária, então trocar
+    de coluna ou de direção não reordena o cofre. fatia() devolve apenas o
+    trecho pedido, o que permite listas virtualizadas.
+    """
+    def __init__(self, coluna, contas):
+        self.coluna = coluna
+        self._valor = COLUNAS_ORDENACAO[coluna]
+        pares = sorted(((self._chave(conta), conta) for conta in contas), key=lambda par: par[0])
+        self._chaves = [chave for chave, _ in pares]
+        self._contas = [conta for _, conta in pares]
+
+    def _chave(self, conta):
+        # id() desempata valores iguais e identifica a conta na exclusão
+        return (self._valor(conta), id(conta))
+
+    def __len__(self):
+        return len(self._contas)
+
+    def inserir(self, conta):
+        chave = self._chave(conta)
+        posicao = bisect.bisect_left(self._chaves, chave)
+        self._chaves.insert(posicao, chave)
+        self._contas.insert(posicao, conta)
+
+    def remover(self, conta):
+        chave = self._chave(conta)
+        posicao = bisect.bisect_left(self._chaves, chave)
+        if posicao < len(self._chaves) and self._chaves[posicao] == chave:
+            del self._chaves[posicao]
+            del self._contas[posicao]
+            return True
+        return False
+
+    def fatia(self, inicio, fim, decrescente=False):
+        """Contas nas posições [inicio, fim) na direção pedida"""
+        total = len(self._contas)
+        inicio = max(0, inicio)
+        fim = min(total, fim)
+        if inicio >= fim:
+            return []
+        if not decrescente:
+            return self._contas[inicio:fim]
+        return self._contas[total - inicio - 1:(total - fim - 1 if total - fim > 0 else None):-1]
+
+    def contas(self, decrescente=False):
+        return list(reversed(self._contas)) if decrescente else list(self._contas)
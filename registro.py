@@ -0,0 +1,184 @@
+import atexit
+import copy
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# === Configuração do Log ===
+PASTA_LOGS = "logs"
+ARQUIVO_LOG = "password_manager.log"
+FORMATO_LOG = '%(asctime)s - %(levelname)s - %(message)s'
+FORMATO_TEXTO = "texto"
+FORMATO_JSON = "json"
+# Rotação do arquivo de log: tamanho de cada segmento, segmentos comprimidos guardados e idade máxima
+TAMANHO_MAXIMO_LOG_MB = 5
+SEGMENTOS_LOG = 20
+DIAS_LOG = 30
+# Atributos passados em extra= que viram campos próprios no formato JSON
+CAMPOS_ESTRUTURADOS = ('operacao', 'duracao_ms', 'contas')
+# Linhas guardadas para o console de logs (as mais antigas são descartadas)
+LIMITE_LINHAS_CONSOLE = 5000
+
+class ConsoleHandler(logging.Handler):
+    """Guarda as linhas formatadas para o console do Tkinter, sem tocar no widget
+
+    Roda na thread do QueueListener: só acrescenta a linha a um buffer
+    circular e à fila de pendentes, que o console drena em lotes pelo
+    janela.after. Com o console fechado, as linhas continuam no buffer e
+    aparecem quando ele for aberto.
+    """
+    def __init__(self, capacidade=LIMITE_LINHAS_CONSOLE):
+        super().__init__()
+        self.linhas = deque(maxlen=capacidade)
+        self.pendentes = deque(maxlen=capacidade)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.linhas.append(msg)
+        self.pendentes.append(msg)
+
+    def drenar(self):
+        """Retira e retorna as linhas ainda não exibidas"""
+        lote = []
+        while True:
+            try:
+                lote.append(self.pendentes.popleft())
+            except IndexError:
+                return lote
+
+    def historico(self):
+        """Linhas guardadas no buffer; as pendentes passam a contar como exibidas"""
+        with self.lock:
+            self.pendentes.clear()
+            return list(self.linhas)
+
+    def limpar(self):
+        with self.lock:
+            self.linhas.clear()
+            self.pendentes.clear()
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro, com os campos estruturados passados em extra="""
+    def format(self, record):
+        linha = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'mensagem': record.getMessage()
+        }
+        for campo in CAMPOS_ESTRUTURADOS:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                linha[campo] = valor
+        # Vindo da fila, o traceback chega já formatado em exc_text (ver FilaRegistros)
+        excecao = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if excecao:
+            linha['excecao'] = excecao
+        return json.dumps(linha, ensure_ascii=False)
+
+class FilaRegistros(QueueHandler):
+    """QueueHandler que mantém o traceback separado da mensagem
+
+    O prepare() padrão junta o traceback à mensagem e zera exc_info e
+    exc_text; aqui a mensagem vai sozinha e o traceback segue formatado em
+    exc_text, que os formatadores de texto acrescentam à linha e o
+    FormatadorJson grava no campo 'excecao'.
+    """
+    def prepare(self, record):
+        excecao = record.exc_text
+        if record.exc_info:
+            excecao = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = excecao
+        return record
+
+def _nome_segmento(nome):
+    return nome + ".gz"
+
+def _comprimir_segmento(origem, destino):
+    """Comprime o segmento recém-rotacionado (roda na thread do listener)"""
+    with open(origem, "rb") as entrada, gzip.open(destino, "wb") as saida:
+        shutil.copyfileobj(entrada, saida)
+    os.remove(origem)
+
+def limpar_logs_antigos(pasta=PASTA_LOGS, dias=DIAS_LOG):
+    """Remove arquivos de log mais velhos que o limite; retorna quantos saíram
+
+    Inclui os arquivos de uma execução só (password_manager_<data>.log)
+    criados pelas versões anteriores.
+    """
+    limite = time.time() - dias * 86400
+    removidos = 0
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        if (nome.startswith("password_manager") and nome != ARQUIVO_LOG and
+                os.path.isfile(caminho) and os.path.getmtime(caminho) < limite):
+            try:
+                os.remove(caminho)
+                removidos += 1
+            except OSError:
+                pass
+    return removidos
+
+def configurar_logging(console_handler=None, nivel=logging.INFO, formato=FORMATO_TEXTO,
+                       tamanho_maximo_mb=TAMANHO_MAXIMO_LOG_MB, segmentos=SEGMENTOS_LOG, dias=DIAS_LOG):
+    """Envia os logs por uma fila para o arquivo, o stdout e o console
+
+    Quem registra só enfileira o registro; a escrita em disco, no stdout e no
+    buffer do console acontece na thread do QueueListener, parada ao sair do
+    programa. O arquivo logs/password_manager.log é rotacionado ao passar de
+    tamanho_maximo_mb, cada segmento antigo é comprimido com gzip e os que
+    passam de dias são apagados na inicialização. Com formato "json" o
+    arquivo recebe uma linha JSON por registro. Retorna o listener.
+    """
+    if not os.path.exists(PASTA_LOGS):
+        os.makedirs(PASTA_LOGS)
+    removidos = limpar_logs_antigos(PASTA_LOGS, dias)
+
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    formatter = logging.Formatter(FORMATO_LOG)
+
+    file_handler = RotatingFileHandler(os.path.join(PASTA_LOGS, ARQUIVO_LOG), encoding='utf-8',
+                                       maxBytes=int(tamanho_maximo_mb * 1024 * 1024), backupCount=segmentos)
+    file_handler.namer = _nome_segmento
+    file_handler.rotator = _comprimir_segmento
+    file_handler.setFormatter(FormatadorJson() if formato == FORMATO_JSON else formatter)
+
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(formatter)
+
+    handlers = [file_handler, stdout_handler]
+    if console_handler is not None:
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    fila = queue.SimpleQueue()
+    listener = QueueListener(fila, *handlers, respect_handler_level=True)
+    listener.start()
+    # Escreve o que ainda estiver na fila antes de encerrar
+    atexit.register(listener.stop)
+
+    # Na fila vai só a mensagem já montada; o formato completo é aplicado por cada handler
+    queue_handler = FilaRegistros(fila)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=nivel, handlers=[queue_handler])
+    if removidos:
+        logging.info(f"{removidos} arquivos de log com mais de {dias} dias removidos")
+    return listener
@@ -0,0 +1,64 @@
+
+# === Impressões de senha para detectar reuso ===
+CONTEXTO_IMPRESSAO = b"cofre/impressao-senha/v1"
+# Caracteres hexadecimais guardados do HMAC-SHA256 (128 bits)
+TAMANHO_IMPRESSAO = 32
+
+class Impressor:
+    """Calcula a impressão HMAC de uma senha com uma chave derivada da chave do cofre
+
+    A impressão tem a forma "<id da chave>:<hmac>"; o prefixo identifica a
+    chave que a gerou, então impressões feitas com uma chave anterior (antes
+    de uma rotação) são reconhecidas e recalculadas. Sem a chave do cofre a
+    impressão não permite testar senhas por força bruta.
+    """
+    def __init__(self, chave_cofre):
+        # Importados só ao desbloquear: listar contas não calcula impressões
+        import base64
+        import hashlib
+        import hmac
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+        material = base64.urlsafe_b64decode(chave_cofre)
+        chave = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                     info=CONTEXTO_IMPRESSAO).derive(material)
+        self.identificador = hashlib.sha256(chave).hexdigest()[:8]
+        # HMAC já com a chave processada; cada impressão parte de uma cópia dele
+        self._hmac = hmac.new(chave, digestmod=hashlib.sha256)
+
+    def impressao(self, senha):
+        calculo = self._hmac.copy()
+        calculo.update(senha.encode('utf-8'))
+        return f"{self.identificador}:{calculo.hexdigest()[:TAMANHO_IMPRESSAO]}"
+
+    def atual(self, impressao):
+        """Indica se a impressão foi calculada com esta chave"""
+        return bool(impressao) and impressao.startswith(self.identificador + ":")
+
+class IndiceReuso:
+    """Multimapa impressão -> ids das contas que usam a mesma senha"""
+    def __init__(self, contas=()):
+        self._ids = {}
+        for conta in contas:
+            self.inserir(conta)
+
+    def inserir(self, conta):
+        impressao = conta.get('impressao')
+        if impressao:
+            self._ids.setdefault(impressao, set()).add(conta['id'])
+
+    def remover(self, conta):
+        impressao = conta.get('impressao')
+        ids = self._ids.get(impressao)
+        if ids is not None:
+            ids.discard(conta['id'])
+            if not ids:
+                del self._ids[impressao]
+
+    def ids(self, impressao):
+        """Ids das contas com essa impressão (conjunto vazio se nenhuma)"""
+        return self._ids.get(impressao, frozenset())
+
+    def grupos(self):
+        """Conjuntos de ids que compartilham a mesma senha, do maior para o menor"""
+        return sorted((ids for ids in self._ids.values() if len(ids) > 1), key=len, reverse=True)
@@ -0,0 +1,190 @@
+import argparse
+import getpass
+import hashlib
+import json
+import os
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from armazenamento import gravar_atomico, MODO_JSON
+from reuso import Impressor
+from cofre import Cofre, ErroCofre, chave_protegida, ARQUIVO_CONFIG
+
+# Contas recriptografadas entre dois pontos de controle
+TAMANHO_LOTE_ROTACAO = 20000
+# Tokens enviados de uma vez a cada processo
+TAMANHO_PEDACO = 2000
+# Em armazenamentos que reescrevem tudo, limita quantas vezes o cofre é regravado
+MAXIMO_PONTOS_CONTROLE = 10
+VERSAO_PROGRESSO = 1
+
+def arquivo_progresso_de(arquivo_chave):
+    """Caminho do ponto de controle da rotação ao lado do arquivo de chaves"""
+    return arquivo_chave + ".rotacao"
+
+def impressao_chave(chave):
+    """Identifica uma chave sem revelá-la"""
+    return hashlib.sha256(chave).hexdigest()[:16]
+
+def _rotacionar_tokens(chaves, tokens):
+    """Recriptografa tokens com a primeira chave e refaz suas impressões (roda nos processos do pool)"""
+    fernet = MultiFernet([Fernet(chave) for chave in chaves])
+    nova = Fernet(chaves[0])
+    impressor = Impressor(chaves[0])
+    resultado = []
+    for token in tokens:
+        senha = fernet.decrypt(token.encode())
+        resultado.append((nova.encrypt(senha).decode(), impressor.impressao(senha.decode())))
+    return resultado
+
+def _ilegiveis(chave, tokens):
+    """Quantos tokens não abrem com a chave (roda nos processos do pool)"""
+    fernet = Fernet(chave)
+    ilegiveis = 0
+    for token in tokens:
+        try:
+            fernet.decrypt(token.encode())
+        except InvalidToken:
+            ilegiveis += 1
+    return ilegiveis
+
+def carregar_progresso(arquivo_progresso, chave_nova):
+    """Último id concluído da rotação para a chave nova, ou None se não houver progresso salvo"""
+    if not os.path.exists(arquivo_progresso):
+        return None
+    try:
+        with open(arquivo_progresso, "r", encoding='utf-8') as f:
+            progresso = json.load(f)
+        if progresso.get('versao') != VERSAO_PROGRESSO or progresso.get('chave_nova') != impressao_chave(chave_nova):
+            logging.warning("Ponto de controle da rotação não corresponde à chave atual, recomeçando")
+            return None
+        return progresso.get('ultimo_id')
+    except Exception as e:
+        logging.warning(f"Erro ao ler ponto de controle da rotação: {str(e)}")
+        return None
+
+def salvar_progresso(arquivo_progresso, chave_nova, ultimo_id, rotacionadas):
+    gravar_atomico(arquivo_progresso, lambda f: json.dump({
+        'versao': VERSAO_PROGRESSO,
+        'chave_nova': impressao_chave(chave_nova),
+        'ultimo_id': ultimo_id,
+        'rotacionadas': rotacionadas
+    }, f))
+
+def rotacionar_chave(cofre, tamanho_lote=TAMANHO_LOTE_ROTACAO, trabalhadores=None, progresso=None):
+    """Troca a chave do cofre e recriptografa todas as senhas; retorna um relatório
+
+    A chave nova é gravada antes da antiga em chave.key, então durante a
+    rotação o MultiFernet lê senhas das duas chaves e o cofre nunca fica
+    ilegível. As contas são percorridas em ordem de id e cada lote é gravado
+    com um ponto de controle; uma rotação interrompida continua do último lote
+    ao ser chamada de novo. Só ao final, depois de reler o armazenamento e
+    conferir que todas as senhas gravadas abrem com a chave nova, a chave
+    antiga sai do arquivo. progresso(relatorio) é chamado a cada lote.
+
+    Cada lote é trocado e gravado sob a trava do cofre (Cofre.atualizar_senhas)
+    e as chaves só mudam por Cofre.trocar_chaves, então outras threads podem
+    adicionar e excluir contas entre os lotes.
+    """
+    inicio = time.perf_counter()
+    arquivo_progresso = arquivo_progresso_de(cofre.arquivo_chave)
+    chaves = list(cofre.chaves)
+    ultimo_id = None
+    if len(chaves) > 1:
+        # Rotação interrompida: a chave nova já está na primeira linha
+        ultimo_id = carregar_progresso(arquivo_progresso, chaves[0])
+        logging.info(f"Retomando rotação de chave{' após o id ' + ultimo_id if ultimo_id else ''}")
+    else:
+        chaves = [Fernet.generate_key()] + chaves
+        logging.info("Nova chave gerada; rotação iniciada")
+    chave_nova = chaves[0]
+    cofre.trocar_chaves(chaves)
+
+    contas = sorted((conta for conta in cofre.listar(ordenar=False) if ultimo_id is None or conta['id'] > ultimo_id),
+                    key=lambda conta: conta['id'])
+    if cofre.armazenamento.regrava_tudo:
+        tamanho_lote = max(tamanho_lote, -(-len(contas) // MAXIMO_PONTOS_CONTROLE))
+    relatorio = {'total': len(contas), 'rotacionadas': 0, 'segundos': 0.0, 'contas_por_segundo': 0.0}
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=trabalhadores) if trabalhadores > 1 else None
+
+    try:
+        for posicao in range(0, len(contas), tamanho_lote):
+            lote = contas[posicao:posicao + tamanho_lote]
+            pedacos = [[conta['senha'] for conta in lote[i:i + TAMANHO_PEDACO]]
+                       for i in range(0, len(lote), TAMANHO_PEDACO)]
+            if executor:
+                resultados = executor.map(_rotacionar_tokens, [chaves] * len(pedacos), pedacos)
+            else:
+                resultados = (_rotacionar_tokens(chaves, pedaco) for pedaco in pedacos)
+            novas = [par for pedaco in resultados for par in pedaco]
+
+            # A troca e a gravação acontecem sob a trava do cofre, entre as operações de outras threads
+            if not cofre.atualizar_senhas(zip(lote, novas)):
+                raise ErroCofre("Não foi possível gravar as senhas recriptografadas; rode a rotação de novo para continuar")
+            salvar_progresso(arquivo_progresso, chave_nova, lote[-1]['id'], relatorio['rotacionadas'] + len(lote))
+
+            relatorio['rotacionadas'] += len(lote)
+            relatorio['segundos'] = time.perf_counter() - inicio
+            relatorio['contas_por_segundo'] = relatorio['rotacionadas'] / relatorio['segundos'] if relatorio['segundos'] else 0.0
+            if progresso:
+                progresso(dict(relatorio))
+
+        if cofre.armazenamento.confidencial and not cofre.salvar():
+            # A chave de dados do arquivo cifrado também precisa ser embrulhada pela chave nova
+            raise ErroCofre("Não foi possível regravar o cofre cifrado com a chave nova")
+        # Confere o que está no disco, não a memória: só então a chave antiga pode sair
+        tokens = cofre.senhas_gravadas()
+        pedacos = [tokens[i:i + TAMANHO_PEDACO] for i in range(0, len(tokens), TAMANHO_PEDACO)]
+        if executor:
+            ilegiveis = sum(executor.map(_ilegiveis, [chave_nova] * len(pedacos), pedacos))
+        else:
+            ilegiveis = sum(_ilegiveis(chave_nova, pedaco) for pedaco in pedacos)
+        if ilegiveis:
+            # A próxima rotação recomeça do início em vez de pular as contas já marcadas como feitas
+            if os.path.exists(arquivo_progresso):
+                os.remove(arquivo_progresso)
+            raise ErroCofre(f"{ilegiveis} senhas gravadas ainda não abrem com a chave nova; a chave antiga foi "
+                            f"mantida, rode a rotação de novo")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    # Tudo gravado com a chave nova (contas criadas durante a rotação também): a antiga pode sair do arquivo
+    cofre.trocar_chaves([chave_nova])
+    if os.path.exists(arquivo_progresso):
+        os.remove(arquivo_progresso)
+
+    relatorio['segundos'] = time.perf_counter() - inicio
+    relatorio['contas_por_segundo'] = relatorio['rotacionadas'] / relatorio['segundos'] if relatorio['segundos'] else 0.0
+    logging.info(f"Rotação de chave concluída: {relatorio['rotacionadas']} contas em {relatorio['segundos']:.2f}s "
+                 f"({relatorio['contas_por_segundo']:.0f} contas/s)",
+                 extra={'operacao': 'rotacionar_chave', 'duracao_ms': round(relatorio['segundos'] * 1000, 1),
+                        'contas': len(cofre)})
+    return relatorio
+
+def modo_configurado(arquivo_config=ARQUIVO_CONFIG):
+    """Modo de armazenamento definido no config.json"""
+    try:
+        with open(arquivo_config, "r", encoding='utf-8') as f:
+            return json.load(f).get('armazenamento', MODO_JSON)
+    except (OSError, ValueError):
+        return MODO_JSON
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Troca a chave do cofre e recriptografa todas as senhas")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_ROTACAO,
+                        help="contas por ponto de controle")
+    parser.add_argument("--trabalhadores", type=int, default=None,
+                        help="processos usados na recriptografia (padrão: um por CPU)")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    senha_mestre = getpass.getpass("Senha mestre: ") if chave_protegida() else None
+    cofre = Cofre(modo_armazenamento=modo_configurado()).abrir(senha_mestre)
+    try:
+        rotacionar_chave(cofre, argumentos.lote, argumentos.trabalhadores,
+                         progresso=lambda r: print(f"{r['rotacionadas']}/{r['total']} contas recriptografadas"))
+    finally:
+        cofre.fechar()
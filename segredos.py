@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# === Cache de senhas descriptografadas ===
+# Senhas mantidas ao mesmo tempo e por quanto tempo (segundos) cada uma vale
+CAPACIDADE_CACHE_SENHAS = 32
+VALIDADE_CACHE_SENHAS = 300
+
+def _zerar(buffer):
+    """Sobrescreve o conteúdo do buffer no próprio lugar"""
+    buffer[:] = bytes(len(buffer))
+
+class CacheSegredos:
+    """Cache LRU de senhas recém-descriptografadas, com validade e limite de tamanho
+
+    A chave é o token criptografado, então uma senha alterada ou
+    recriptografada nunca devolve o valor antigo. O texto fica guardado em um
+    bytearray que é zerado ao sair do cache (por tamanho, validade ou
+    limpeza); as strings já entregues a quem chamou continuam por conta do
+    coletor de lixo do Python.
+    """
+    def __init__(self, capacidade=CAPACIDADE_CACHE_SENHAS, validade=VALIDADE_CACHE_SENHAS):
+        self.capacidade = capacidade
+        self.validade = validade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, token, descriptografar):
+        """Senha do token, descriptografando com descriptografar(token) só quando não está no cache"""
+        agora = time.monotonic()
+        with self._trava:
+            item = self._itens.get(token)
+            if item is not None:
+                buffer, expira = item
+                if expira > agora:
+                    self._itens.move_to_end(token)
+                    self.acertos += 1
+                    return buffer.decode('utf-8')
+                del self._itens[token]
+                _zerar(buffer)
+                self.expiradas += 1
+            self.falhas += 1
+
+        senha = descriptografar(token)
+        with self._trava:
+            antigo = self._itens.pop(token, None)
+            if antigo is not None:
+                _zerar(antigo[0])
+            self._itens[token] = (bytearray(senha.encode('utf-8')), agora + self.validade)
+            while len(self._itens) > self.capacidade:
+                _, (buffer, _) = self._itens.popitem(last=False)
+                _zerar(buffer)
+        return senha
+
+    def descartar(self, tokens):
+        """Remove e zera as senhas dos tokens informados (contas excluídas)"""
+        with self._trava:
+            for token in tokens:
+                item = self._itens.pop(token, None)
+                if item is not None:
+                    _zerar(item[0])
+
+    def expirar(self):
+        """Remove e zera as senhas vencidas; retorna quantas saíram"""
+        agora = time.monotonic()
+        with self._trava:
+            vencidos = [token for token, (_, expira) in self._itens.items() if expira <= agora]
+            for token in vencidos:
+                _zerar(self._itens.pop(token)[0])
+            self.expiradas += len(vencidos)
+        return len(vencidos)
+
+    def limpar(self):
+        """Zera e descarta todas as senhas"""
+        with self._trava:
+            for buffer, _ in self._itens.values():
+                _zerar(buffer)
+            self._itens.clear()
+
+    @property
+    def taxa_acertos(self):
+        consultas = self.acertos + self.falhas
+        return self.acertos / consultas if consultas else 0.0
+
+    def registrar(self):
+        """Registra no log o uso do cache de senhas"""
+        logging.info(f"Cache de senhas: {self.acertos} acertos, {self.falhas} falhas "
+                     f"({self.taxa_acertos:.0%} de acerto), {self.expiradas} expiradas, {len(self)} em memória")
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# === Tarefas em segundo plano para a interface ===
+# Threads para tarefas de leitura (exportação); as de escrita têm uma fila só delas
+TRABALHADORES_TAREFAS = 2
+# Intervalo em que a thread da interface confere progresso e resultados (~60 quadros/s)
+INTERVALO_TAREFAS_MS = 16
+
+class TarefaCancelada(Exception):
+    """Levantada dentro da tarefa quando o usuário pede o cancelamento"""
+
+class Tarefa:
+    """Uma tarefa em andamento: progresso, cancelamento e resultado
+
+    A função da tarefa recebe este objeto e chama progresso(feito, total)
+    de tempos em tempos; é ali que o pedido de cancelamento vira
+    TarefaCancelada, então a função desfaz o que precisar no próprio
+    tratamento de exceções. feito, total e texto são só lidos pela thread
+    da interface, que mostra o valor mais recente a cada verificação.
+    """
+    def __init__(self, nome):
+        self.nome = nome
+        self.feito = 0
+        self.total = None
+        self.texto = ""
+        self.inicio = time.perf_counter()
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set()
+
+    @property
+    def concluida(self):
+        return self._futuro is not None and self._futuro.done()
+
+    def progresso(self, feito, total=None, texto=None):
+        """Registra o avanço; levanta TarefaCancelada se o cancelamento foi pedido"""
+        if self._cancelar.is_set():
+            raise TarefaCancelada(f"{self.nome} cancelada")
+        self.feito = feito
+        self.total = total
+        if texto is not None:
+            self.texto = texto
+
+class ExecutorTarefas:
+    """Roda trabalho pesado fora da thread do Tk e devolve os resultados nela
+
+    As tarefas de leitura vão para um pool de threads; as de escrita
+    (escrita=True) vão para uma fila de uma thread só, então operações que
+    alteram o cofre nunca se sobrepõem e rodam na ordem em que foram pedidas.
+    Nenhum callback roda nas threads de trabalho: enquanto houver tarefas
+    ativas, agendar(ms, funcao) (o janela.after) chama uma verificação a cada
+    INTERVALO_TAREFAS_MS, que entrega ao_progresso, ao_concluir, ao_falhar e
+    ao_cancelar na thread da interface.
+    """
+    def __init__(self, agendar, trabalhadores=TRABALHADORES_TAREFAS, intervalo_ms=INTERVALO_TAREFAS_MS):
+        self.agendar = agendar
+        self.intervalo_ms = intervalo_ms
+        self._leitura = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="tarefa")
+        self._escrita = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tarefa-escrita")
+        self._ativas = []
+        self._vigiando = False
+
+    def executar(self, nome, funcao, ao_concluir=None, ao_falhar=None, ao_progresso=None,
+                 ao_cancelar=None, escrita=False):
+        """Agenda funcao(tarefa) em segundo plano; retorna a Tarefa"""
+        tarefa = Tarefa(nome)
+        pool = self._escrita if escrita else self._leitura
+        tarefa._futuro = pool.submit(self._rodar, tarefa, funcao)
+        self._ativas.append((tarefa, ao_concluir, ao_falhar, ao_progresso, ao_cancelar))
+        if not self._vigiando:
+            self._vigiando = True
+            self.agendar(self.intervalo_ms, self._verificar)
+        return tarefa
+
+    def _rodar(self, tarefa, funcao):
+        # Cancelada enquanto esperava na fila: nem começa
+        tarefa.progresso(0)
+        tarefa.inicio = time.perf_counter()
+        return funcao(tarefa)
+
+    @property
+    def ocupado(self):
+        return bool(self._ativas)
+
+    def _verificar(self):
+        """Roda na thread da interface: entrega progresso e resultados das tarefas ativas"""
+        # Callbacks podem agendar novas tarefas; elas entram na lista nova
+        ativas, self._ativas = self._ativas, []
+        pendentes = []
+        for item in ativas:
+            tarefa, ao_concluir, ao_falhar, ao_progresso, ao_cancelar = item
+            if not tarefa.concluida:
+                pendentes.append(item)
+                if ao_progresso:
+                    self._chamar(ao_progresso, tarefa)
+                continue
+            segundos = time.perf_counter() - tarefa.inicio
+            erro = None if tarefa._futuro.cancelled() else tarefa._futuro.exception()
+            if tarefa._futuro.cancelled() or isinstance(erro, TarefaCancelada):
+                logging.info(f"Tarefa '{tarefa.nome}' cancelada após {segundos:.2f}s")
+                if ao_cancelar:
+                    self._chamar(ao_cancelar)
+            elif erro is None:
+                logging.debug(f"Tarefa '{tarefa.nome}' concluída em {segundos:.2f}s")
+                if ao_concluir:
+                    self._chamar(ao_concluir, tarefa._futuro.result())
+            else:
+                logging.error(f"Erro na tarefa '{tarefa.nome}': {str(erro)}")
+                if ao_falhar:
+                    self._chamar(ao_falhar, erro)
+        self._ativas = pendentes + self._ativas
+        if self._ativas:
+            self.agendar(self.intervalo_ms, self._verificar)
+        else:
+            self._vigiando = False
+
+    def _chamar(self, callback, *argumentos):
+        try:
+            callback(*argumentos)
+        except Exception as e:
+            logging.error(f"Erro ao tratar o resultado de uma tarefa: {str(e)}")
+
+    def encerrar(self):
+        """Cancela o que estiver pendente e espera as tarefas em andamento terminarem"""
+        for tarefa, *_ in self._ativas:
+            tarefa.cancelar()
+        self._leitura.shutdown(cancel_futures=True)
+        self._escrita.shutdown(cancel_futures=True)
+        self._ativas = []
@@ -0,0 +1,282 @@
+import argparse
+import getpass
+import hashlib
+import heapq
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+# === Consulta offline de senhas vazadas (SHA-1, formato Have I Been Pwned) ===
+ARQUIVO_VAZAMENTOS = "senhas_vazadas.bin"
+ARQUIVO_BLOOM = "senhas_vazadas.bloom"
+
+MAGICO_VAZAMENTOS = b"VAZASHA1"
+MAGICO_BLOOM = b"VAZABLOM"
+VERSAO_VAZAMENTOS = 1
+# Cabeçalho: mágico, versão, bits do prefixo da tabela, quantidade de hashes
+CABECALHO_VAZAMENTOS = struct.Struct("<8sIIQ")
+# Cabeçalho do Bloom: mágico, versão, funções de hash, bits
+CABECALHO_BLOOM = struct.Struct("<8sIIQ")
+TAMANHO_HASH = 20
+# A tabela guarda onde começa cada prefixo de 16 bits: a busca binária fica em ~n/65536 hashes
+BITS_PREFIXO = 16
+# Hashes ordenados em memória por vez na construção (20 bytes cada)
+TAMANHO_PEDACO = 5000000
+BITS_POR_ITEM_BLOOM = 10
+
+def hash_senha(senha):
+    return hashlib.sha1(senha.encode('utf-8')).digest()
+
+def _posicoes_bloom(digest, funcoes, bits):
+    """Bits do filtro para um SHA-1 (hash duplo sobre o próprio digest, que já é uniforme)"""
+    h1 = int.from_bytes(digest[4:12], 'little')
+    h2 = int.from_bytes(digest[12:20], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(funcoes)]
+
+class ConsultaVazamentos:
+    """Verifica senhas contra um arquivo ordenado de SHA-1 mapeado com mmap
+
+    Só as páginas tocadas pela busca são lidas do disco: a tabela de
+    prefixos limita a busca binária a um trecho pequeno do arquivo, e o
+    filtro de Bloom opcional responde "não vazada" (o caso comum) sem tocar
+    no arquivo de hashes.
+    """
+    def __init__(self, arquivo=ARQUIVO_VAZAMENTOS, arquivo_bloom=None):
+        self._arquivo = open(arquivo, "rb")
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, self._bits_prefixo, self.quantidade = CABECALHO_VAZAMENTOS.unpack_from(self._mapa, 0)
+        if magico != MAGICO_VAZAMENTOS or versao != VERSAO_VAZAMENTOS:
+            self.fechar()
+            raise ValueError(f"Arquivo de senhas vazadas inválido: {arquivo}")
+        self._tabela = CABECALHO_VAZAMENTOS.size
+        self._inicio = self._tabela + ((1 << self._bits_prefixo) + 1) * 8
+        self._bloom = None
+        if arquivo_bloom and os.path.exists(arquivo_bloom):
+            self._arquivo_bloom = open(arquivo_bloom, "rb")
+            self._bloom = mmap.mmap(self._arquivo_bloom.fileno(), 0, access=mmap.ACCESS_READ)
+            magico, versao, self._funcoes, self._bits = CABECALHO_BLOOM.unpack_from(self._bloom, 0)
+            if magico != MAGICO_BLOOM or versao != VERSAO_VAZAMENTOS:
+                self.fechar()
+                raise ValueError(f"Filtro de Bloom inválido: {arquivo_bloom}")
+        self.consultas = 0
+        self.descartadas_bloom = 0
+
+    @property
+    def com_bloom(self):
+        return self._bloom is not None
+
+    def _no_bloom(self, digest):
+        # Mesmas posições de _posicoes_bloom, paradas no primeiro bit zerado
+        h1 = int.from_bytes(digest[4:12], 'little')
+        h2 = int.from_bytes(digest[12:20], 'little') | 1
+        filtro = self._bloom
+        base = CABECALHO_BLOOM.size
+        for i in range(self._funcoes):
+            posicao = (h1 + i * h2) % self._bits
+            if not filtro[base + (posicao >> 3)] & (1 << (posicao & 7)):
+                return False
+        return True
+
+    def contem_hash(self, digest):
+        self.consultas += 1
+        if self._bloom is not None and not self._no_bloom(digest):
+            self.descartadas_bloom += 1
+            return False
+        prefixo = int.from_bytes(digest[:4], 'big') >> (32 - self._bits_prefixo)
+        baixo, alto = struct.unpack_from("<QQ", self._mapa, self._tabela + prefixo * 8)
+        mapa = self._mapa
+        inicio = self._inicio
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            posicao = inicio + meio * TAMANHO_HASH
+            atual = mapa[posicao:posicao + TAMANHO_HASH]
+            if atual < digest:
+                baixo = meio + 1
+            elif atual > digest:
+                alto = meio
+            else:
+                return True
+        return False
+
+    def contem(self, senha):
+        """Indica se a senha aparece na base de vazamentos"""
+        return self.contem_hash(hash_senha(senha))
+
+    def fechar(self):
+        for atributo in ('_bloom', '_mapa'):
+            mapa = getattr(self, atributo, None)
+            if mapa is not None:
+                mapa.close()
+                setattr(self, atributo, None)
+        for atributo in ('_arquivo_bloom', '_arquivo'):
+            arquivo = getattr(self, atributo, None)
+            if arquivo is not None:
+                arquivo.close()
+                setattr(self, atributo, None)
+
+def abrir_consulta(arquivo=ARQUIVO_VAZAMENTOS, arquivo_bloom=ARQUIVO_BLOOM):
+    """ConsultaVazamentos se a base existir, senão None (a verificação fica desligada)"""
+    if not os.path.exists(arquivo):
+        return None
+    try:
+        consulta = ConsultaVazamentos(arquivo, arquivo_bloom)
+        logging.info(f"Base de senhas vazadas carregada: {consulta.quantidade} hashes"
+                     f"{' com filtro de Bloom' if consulta.com_bloom else ''}")
+        return consulta
+    except Exception as e:
+        logging.error(f"Erro ao abrir base de senhas vazadas: {str(e)}")
+        return None
+
+# === Construção da base a partir do dump em texto ===
+def _ler_hashes(entrada):
+    """SHA-1s de um dump "HASH:CONTAGEM" ou de uma pasta de faixas (arquivo PREFIXO, linhas SUFIXO:CONTAGEM)"""
+    if os.path.isdir(entrada):
+        for nome in sorted(os.listdir(entrada)):
+            prefixo = os.path.splitext(nome)[0].upper()
+            if len(prefixo) != 5:
+                continue
+            with open(os.path.join(entrada, nome), "r", encoding='ascii', errors='ignore') as f:
+                for linha in f:
+                    sufixo = linha.split(':', 1)[0].strip()
+                    if len(sufixo) == 35:
+                        yield bytes.fromhex(prefixo + sufixo)
+    else:
+        with open(entrada, "r", encoding='ascii', errors='ignore') as f:
+            for linha in f:
+                valor = linha.split(':', 1)[0].strip()
+                if len(valor) == 40:
+                    yield bytes.fromhex(valor)
+
+def _ler_pedaco(caminho):
+    with open(caminho, "rb") as f:
+        while True:
+            digest = f.read(TAMANHO_HASH)
+            if len(digest) < TAMANHO_HASH:
+                return
+            yield digest
+
+def _ordenados(hashes, pasta_temporaria):
+    """Os hashes em ordem e sem repetição, ordenando por pedaços em disco quando não cabem na memória"""
+    pedacos = []
+    pedaco = []
+    for digest in hashes:
+        pedaco.append(digest)
+        if len(pedaco) >= TAMANHO_PEDACO:
+            pedaco.sort()
+            caminho = os.path.join(pasta_temporaria, f"pedaco_{len(pedacos)}")
+            with open(caminho, "wb") as f:
+                f.write(b"".join(pedaco))
+            pedacos.append(caminho)
+            pedaco = []
+    # Dumps já ordenados (o formato do HIBP) custam só uma passada do Timsort
+    pedaco.sort()
+    anterior = None
+    for digest in heapq.merge(*(_ler_pedaco(caminho) for caminho in pedacos), pedaco):
+        if digest != anterior:
+            yield digest
+            anterior = digest
+
+def construir_base(entrada, saida=ARQUIVO_VAZAMENTOS, arquivo_bloom=None, bits_por_item=BITS_POR_ITEM_BLOOM):
+    """Gera o arquivo binário ordenado (e opcionalmente o filtro de Bloom); retorna a quantidade de hashes"""
+    inicio = time.perf_counter()
+    contagem = [0] * (1 << BITS_PREFIXO)
+    quantidade = 0
+    temporario = saida + ".tmp"
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(saida))) as pasta, \
+            open(temporario, "wb") as f:
+        f.write(b"\0" * (CABECALHO_VAZAMENTOS.size + ((1 << BITS_PREFIXO) + 1) * 8))
+        buffer = []
+        for digest in _ordenados(_ler_hashes(entrada), pasta):
+            contagem[int.from_bytes(digest[:4], 'big') >> (32 - BITS_PREFIXO)] += 1
+            buffer.append(digest)
+            quantidade += 1
+            if len(buffer) >= 65536:
+                f.write(b"".join(buffer))
+                buffer = []
+        f.write(b"".join(buffer))
+
+        # Tabela de prefixos: posição inicial de cada prefixo e o total no fim
+        posicoes = [0]
+        for total in contagem:
+            posicoes.append(posicoes[-1] + total)
+        f.seek(0)
+        f.write(CABECALHO_VAZAMENTOS.pack(MAGICO_VAZAMENTOS, VERSAO_VAZAMENTOS, BITS_PREFIXO, quantidade))
+        f.write(struct.pack(f"<{len(posicoes)}Q", *posicoes))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, saida)
+    logging.info(f"Base de senhas vazadas gerada: {quantidade} hashes em {time.perf_counter() - inicio:.1f}s")
+
+    if arquivo_bloom:
+        construir_bloom(saida, arquivo_bloom, bits_por_item)
+    return quantidade
+
+def construir_bloom(arquivo=ARQUIVO_VAZAMENTOS, arquivo_bloom=ARQUIVO_BLOOM, bits_por_item=BITS_POR_ITEM_BLOOM):
+    """Gera o filtro de Bloom a partir do arquivo binário já construído"""
+    inicio = time.perf_counter()
+    consulta = ConsultaVazamentos(arquivo)
+    try:
+        quantidade = consulta.quantidade
+        bits = max(64, quantidade * bits_por_item)
+        # Número ótimo de funções: (m/n) ln 2
+        funcoes = max(1, round(bits_por_item * 0.693))
+        temporario = arquivo_bloom + ".tmp"
+        with open(temporario, "w+b") as f:
+            f.write(CABECALHO_BLOOM.pack(MAGICO_BLOOM, VERSAO_VAZAMENTOS, funcoes, bits))
+            f.truncate(CABECALHO_BLOOM.size + (bits + 7) // 8)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0) as filtro:
+                mapa = consulta._mapa
+                for indice in range(quantidade):
+                    posicao = consulta._inicio + indice * TAMANHO_HASH
+                    for bit in _posicoes_bloom(mapa[posicao:posicao + TAMANHO_HASH], funcoes, bits):
+                        filtro[CABECALHO_BLOOM.size + (bit >> 3)] |= 1 << (bit & 7)
+                filtro.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, arquivo_bloom)
+    finally:
+        consulta.fechar()
+    logging.info(f"Filtro de Bloom gerado: {bits // 8} bytes, {funcoes} funções, "
+                 f"em {time.perf_counter() - inicio:.1f}s")
+
+def medir_desempenho(consulta, quantidade=100000):
+    """Tempo médio por consulta (microssegundos) com senhas aleatórias, quase todas não vazadas"""
+    senhas = [os.urandom(12).hex() for _ in range(quantidade)]
+    inicio = time.perf_counter()
+    for senha in senhas:
+        consulta.contem(senha)
+    return (time.perf_counter() - inicio) / quantidade * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Base offline de senhas vazadas (SHA-1 do Have I Been Pwned)")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    construir = subcomandos.add_parser("construir", help="gera a base binária a partir do dump em texto")
+    construir.add_argument("entrada", help="arquivo HASH:CONTAGEM ou pasta com os arquivos de faixa")
+    construir.add_argument("--saida", default=ARQUIVO_VAZAMENTOS)
+    construir.add_argument("--bloom", default=ARQUIVO_BLOOM, help="filtro de Bloom ('' para não gerar)")
+    construir.add_argument("--bits", type=int, default=BITS_POR_ITEM_BLOOM, help="bits do Bloom por hash")
+    verificar = subcomandos.add_parser("verificar", help="verifica uma senha digitada")
+    verificar.add_argument("--base", default=ARQUIVO_VAZAMENTOS)
+    verificar.add_argument("--bloom", default=ARQUIVO_BLOOM)
+    medir = subcomandos.add_parser("benchmark", help="mede o tempo por consulta")
+    medir.add_argument("--base", default=ARQUIVO_VAZAMENTOS)
+    medir.add_argument("--bloom", default=ARQUIVO_BLOOM)
+    medir.add_argument("-n", "--quantidade", type=int, default=100000)
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if argumentos.comando == "construir":
+        construir_base(argumentos.entrada, argumentos.saida, argumentos.bloom or None, argumentos.bits)
+    else:
+        consulta = ConsultaVazamentos(argumentos.base, argumentos.bloom)
+        try:
+            if argumentos.comando == "verificar":
+                vazada = consulta.contem(getpass.getpass("Senha: "))
+                print("Senha encontrada em vazamentos" if vazada else "Senha não encontrada na base")
+            else:
+                print(f"{medir_desempenho(consulta, argumentos.quantidade):.2f} µs por consulta")
+        finally:
+            consulta.fechar()